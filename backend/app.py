@@ -1,32 +1,144 @@
+"""Application factory.
+
+``create_app(config)`` builds an app whose settings come from environment
+variables, overridden by ``config``. Blueprints listed in ``BLUEPRINTS`` (env
+``APP_BLUEPRINTS``, comma-separated; all by default) are imported only when
+selected, and Flask-Migrate, which loads Alembic, only when
+``MIGRATIONS_ENABLED`` is set. ``from app import app`` returns a default app,
+built on first access, for the ``flask`` CLI, scripts and the development
+server.
+"""
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from flask_migrate import Migrate
+from database import configure_engine, database_uri, engine_options
+from extensions import db
+from metrics import init_metrics
+from serialization import JSONProvider
+import importlib
 import os
+import threading
 
-app = Flask(__name__)
-CORS(app)
-
-# Database Configuration
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'co_planet.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# Blueprint name -> "module:attribute". Modules are imported only when selected.
+BLUEPRINTS = {
+    'trips': 'routes.trips:trips_bp',
+    'activities': 'routes.activities:activities_bp',
+    'places': 'routes.places:places_bp',
+    'spatial': 'routes.spatial:spatial_bp',
+    'calendar': 'routes.calendar:calendar_bp',
+    'routing': 'routes.routing:routing_bp',
+    'search': 'routes.search:search_bp',
+    'export': 'routes.export:export_bp',
+    'imports': 'routes.imports:imports_bp',
+    'events': 'routes.events:events_bp',
+    'metrics': 'routes.metrics:metrics_bp',
+}
+
 
-from models import Trip, Activity
-from routes.trips import trips_bp
-from routes.activities import activities_bp
-from routes.places import places_bp
+def load_config(app):
+    """Settings from environment variables."""
+    # Database Configuration
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(basedir)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-app.register_blueprint(trips_bp)
-app.register_blueprint(activities_bp)
-app.register_blueprint(places_bp)
+    # Place search cache (see place_cache.py)
+    app.config['PLACES_CACHE_PATH'] = os.environ.get('PLACES_CACHE_PATH', os.path.join(basedir, 'places_cache.db'))
+    app.config['PLACES_CACHE_TTL'] = int(os.environ.get('PLACES_CACHE_TTL', 86400))
+    app.config['PLACES_CACHE_MEMORY_SIZE'] = int(os.environ.get('PLACES_CACHE_MEMORY_SIZE', 1024))
+    app.config['PLACES_CACHE_MAX_ENTRIES'] = int(os.environ.get('PLACES_CACHE_MAX_ENTRIES', 100000))
+
+    # Mapbox HTTP client (see mapbox.py)
+    app.config['MAPBOX_GEOCODING_URL'] = os.environ.get('MAPBOX_GEOCODING_URL')
+    app.config['MAPBOX_POOL_SIZE'] = int(os.environ.get('MAPBOX_POOL_SIZE', 20))
+    app.config['MAPBOX_TIMEOUT'] = float(os.environ.get('MAPBOX_TIMEOUT', 10))
+    app.config['MAPBOX_RETRIES'] = int(os.environ.get('MAPBOX_RETRIES', 2))
+    app.config['MAPBOX_BACKOFF'] = float(os.environ.get('MAPBOX_BACKOFF', 0.2))
+    app.config['MAPBOX_BREAKER_THRESHOLD'] = int(os.environ.get('MAPBOX_BREAKER_THRESHOLD', 5))
+    app.config['MAPBOX_BREAKER_RESET'] = float(os.environ.get('MAPBOX_BREAKER_RESET', 30))
+    # POST /api/places/batch: concurrent lookups per process, and how long a batch waits for them
+    app.config['PLACES_BATCH_WORKERS'] = int(os.environ.get('PLACES_BATCH_WORKERS', 16))
+    app.config['PLACES_BATCH_TIMEOUT'] = float(os.environ.get('PLACES_BATCH_TIMEOUT', 10))
+
+    # Serialized trip detail payloads (see payload_cache.py)
+    app.config['TRIP_CACHE_MAX_BYTES'] = int(os.environ.get('TRIP_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+    # JSON encoding: 'auto' uses orjson when installed, 'stdlib' forces the json module (see serialization.py)
+    app.config['JSON_BACKEND'] = os.environ.get('JSON_BACKEND', 'auto')
+
+    # Live trip updates over Server-Sent Events (see events.py)
+    app.config['EVENTS_BACKEND'] = os.environ.get('EVENTS_BACKEND', 'local')
+    app.config['EVENTS_REDIS_URL'] = os.environ.get('EVENTS_REDIS_URL', 'redis://localhost:6379/0')
+    app.config['EVENTS_QUEUE_SIZE'] = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+    app.config['EVENTS_MAX_SUBSCRIBERS'] = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 1000))
+    app.config['EVENTS_HEARTBEAT'] = float(os.environ.get('EVENTS_HEARTBEAT', 15))
+    app.config['EVENTS_MAX_DURATION'] = float(os.environ.get('EVENTS_MAX_DURATION', 300))
+
+    # Request metrics at /metrics, Server-Timing headers, slow queries and profiling (see metrics.py)
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    app.config['METRICS_SERVER_TIMING'] = os.environ.get('METRICS_SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+    app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 0))
+    app.config['PROFILE_REQUESTS'] = os.environ.get('PROFILE_REQUESTS', 'false').lower() in ('1', 'true', 'yes')
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR') or os.path.join(basedir, 'profiles')
+
+    # Application structure (see create_app)
+    app.config['BLUEPRINTS'] = tuple(
+        name.strip() for name in (os.environ.get('APP_BLUEPRINTS') or ','.join(BLUEPRINTS)).split(',') if name.strip()
+    )
+    app.config['MIGRATIONS_ENABLED'] = os.environ.get('MIGRATIONS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+
+def create_app(config=None):
+    app = Flask(__name__)
+    load_config(app)
+    if config:
+        app.config.update(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    unknown = set(app.config['BLUEPRINTS']) - set(BLUEPRINTS)
+    if unknown:
+        raise ValueError(f"Unknown blueprints: {', '.join(sorted(unknown))}")
+
+    app.json = JSONProvider(app)
+    CORS(app)
+    db.init_app(app)
+    if app.config['MIGRATIONS_ENABLED']:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    with app.app_context():
+        configure_engine(db.engine)
+        if app.config['METRICS_ENABLED']:
+            init_metrics(app, db.engine)
+
+    import models  # noqa: F401 - registers the tables on db.metadata
+    import events  # noqa: F401 - publishes committed changes, with or without the events blueprint
+    for name in app.config['BLUEPRINTS']:
+        module_name, attribute = BLUEPRINTS[name].split(':')
+        app.register_blueprint(getattr(importlib.import_module(module_name), attribute))
+
+    from importer import import_itinerary_command
+    app.cli.add_command(import_itinerary_command)
+
+    @app.route('/')
+    def hello():
+        return "Co-Planet API is running!"
+
+    return app
+
+
+_app_lock = threading.Lock()
+
+
+def __getattr__(name):
+    # The default app is built on first access rather than on import.
+    if name != 'app':
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    with _app_lock:
+        if 'app' not in globals():
+            globals()['app'] = create_app()
+    return globals()['app']
 
-@app.route('/')
-def hello():
-    return "Co-Planet API is running!"
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,335 @@
+"""ASGI entry point for production serving::
+
+    uvicorn asgi:application --workers 4
+
+I/O-bound handlers with an async version (place search, trip event streams)
+run directly on the event loop, so a slow Mapbox lookup or an idle stream
+costs a coroutine instead of a thread. Every other request goes to the Flask
+app through a2wsgi's WSGI bridge, which runs it on a bounded thread pool of
+``ASGI_WSGI_WORKERS`` threads.
+
+Bridged requests keep the usual Flask-SQLAlchemy session handling: one session
+per app context, removed at teardown, so each pool thread works on its own
+session and connection. Keep ``ASGI_WSGI_WORKERS`` at or below
+``DB_POOL_SIZE + DB_MAX_OVERFLOW`` so threads never wait for a connection. The
+async handlers do not touch the database on the loop; the change log read
+that opens an event stream runs on a thread in its own app context.
+
+``python app.py`` still runs the synchronous development server.
+"""
+from urllib.parse import parse_qsl
+import asyncio
+import json
+import os
+import re
+import time
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.datastructures import Headers, MultiDict
+
+from app import create_app
+from events import get_event_broker, trip_channel
+from mapbox import AsyncMapboxClient, MapboxError, MapboxUnavailable, mapbox_client_options
+from metrics import RequestTimings, get_metrics
+from place_cache import get_place_cache
+from routes.events import (
+    RETRY_MS, STREAM_HEADERS, TOO_MANY_STREAMS, async_stream, opening_events, stream_since,
+)
+from routes.places import batch_args, batch_response, mapbox_token, search_args
+
+# Workers serve requests only; migrations run through ``flask db upgrade``.
+app = create_app({'MIGRATIONS_ENABLED': False})
+app.config['ASGI_WSGI_WORKERS'] = int(os.environ.get('ASGI_WSGI_WORKERS', 10))
+
+
+def get_async_mapbox_client():
+    client = app.extensions.get('async_mapbox_client')
+    if client is None:
+        # Only ever called from the event loop thread, so no lock is needed.
+        client = AsyncMapboxClient(**mapbox_client_options(app))
+        app.extensions['async_mapbox_client'] = client
+    return client
+
+
+def query_args(scope):
+    return MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+
+
+def in_app_context(function, *args):
+    with app.app_context():
+        return function(*args)
+
+
+async def search_places(scope, body, timings):
+    """Async ``GET /api/places/search``; same contract as ``routes.places.search_places``.
+
+    Returns ``(payload, status, headers)``.
+    """
+    try:
+        query, types, limit = search_args(query_args(scope))
+    except ValueError as e:
+        return {'error': str(e)}, 400, []
+
+    token = mapbox_token()
+    if not token:
+        return {'error': 'Mapbox access token is not configured on the server.'}, 500, []
+
+    # The cache may read and write its SQLite file, so it is used from a thread.
+    cache = get_place_cache(app)
+    features = await asyncio.to_thread(cache.get, query, types, limit)
+    if features is not None:
+        return {'features': features}, 200, [('X-Cache', 'HIT')]
+
+    try:
+        with timings.timer('mapbox'):
+            features = await get_async_mapbox_client().search(query, token, types, limit)
+    except MapboxUnavailable as e:
+        return {'error': str(e)}, 503, []
+    except MapboxError as e:
+        return {'error': f'Failed to fetch places from Mapbox: {str(e)}'}, 502, []
+    await asyncio.to_thread(cache.set, query, types, limit, features)
+    return {'features': features}, 200, [('X-Cache', 'MISS')]
+
+
+async def search_places_batch(scope, body, timings):
+    """Async ``POST /api/places/batch``; same contract as ``routes.places.search_places_batch``.
+
+    Cache misses are looked up concurrently, at most ``PLACES_BATCH_WORKERS``
+    at a time. ``PLACES_BATCH_TIMEOUT`` is one deadline for the whole batch,
+    as in the WSGI route. Lookups still running at the deadline are reported
+    as timed out; they keep running and warm the cache.
+    """
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    try:
+        queries, unique, types, limit = batch_args(data)
+    except ValueError as e:
+        return {'error': str(e)}, 400, []
+
+    token = mapbox_token()
+    if not token:
+        return {'error': 'Mapbox access token is not configured on the server.'}, 500, []
+
+    cache = get_place_cache(app)
+    client = get_async_mapbox_client()
+    slots = asyncio.Semaphore(app.config['PLACES_BATCH_WORKERS'])
+
+    async def resolve(query):
+        async with slots:
+            features = await client.search(query, token, types, limit)
+        await asyncio.to_thread(cache.set, query, types, limit, features)
+        return features
+
+    def cached_features():
+        return {key: cache.get(query, types, limit) for key, query in unique.items()}
+
+    outcomes, pending = {}, {}
+    # One thread hop for all the cache lookups, which may read SQLite.
+    cached = await asyncio.to_thread(cached_features)
+    for key, query in unique.items():
+        features = cached[key]
+        if features is not None:
+            outcomes[key] = {'features': features, 'cached': True}
+        else:
+            task = asyncio.ensure_future(resolve(query))
+            # Retrieved here for lookups that outlive the batch.
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            pending[task] = key
+
+    if pending:
+        with timings.timer('mapbox'):
+            done, _ = await asyncio.wait(pending, timeout=app.config['PLACES_BATCH_TIMEOUT'])
+    for task, key in pending.items():
+        if task not in done:
+            outcomes[key] = {'error': 'Timed out waiting for Mapbox.', 'status': 504}
+        elif isinstance(task.exception(), MapboxUnavailable):
+            outcomes[key] = {'error': str(task.exception()), 'status': 503}
+        elif isinstance(task.exception(), MapboxError):
+            outcomes[key] = {'error': f'Failed to fetch places from Mapbox: {task.exception()}', 'status': 502}
+        elif task.exception() is not None:
+            raise task.exception()
+        else:
+            outcomes[key] = {'features': task.result(), 'cached': False}
+    return batch_response(queries, outcomes), 200, []
+
+
+async def trip_events(scope, receive, send):
+    """Async ``GET /api/trips/<id>/events``; same stream as ``routes.events.trip_events``.
+
+    The broker feeds an ``AsyncSubscription`` on this event loop, so an open
+    stream waits as a coroutine instead of holding a bridge thread for up to
+    ``EVENTS_MAX_DURATION``. Only the change log read that opens the stream
+    runs on a thread.
+    """
+    started = time.perf_counter()
+    timings = RequestTimings()
+    id = scope['path_params']['id']
+    headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']])
+    try:
+        since = stream_since(headers, query_args(scope))
+    except ValueError:
+        return await respond(scope, send, started, timings, {'error': 'since must be an integer.'}, 400, [])
+
+    broker = get_event_broker(app)
+    # Subscribe before reading the log so nothing committed in between is lost.
+    subscription = broker.subscribe(trip_channel(id), loop=asyncio.get_running_loop())
+    if subscription is None:
+        headers = [('Retry-After', str(RETRY_MS // 1000))]
+        return await respond(scope, send, started, timings, {'error': TOO_MANY_STREAMS}, 503, headers)
+
+    dumps = app.json.dumps
+    try:
+        opened = await asyncio.to_thread(in_app_context, opening_events, id, since, dumps)
+    except BaseException:
+        broker.unsubscribe(subscription)
+        raise
+    if opened is None:
+        broker.unsubscribe(subscription)
+        return await respond(scope, send, started, timings, {'error': 'Trip not found.'}, 404, [])
+
+    first_events, version = opened
+    body = async_stream(
+        broker, subscription, first_events, version, dumps,
+        app.config['EVENTS_HEARTBEAT'], app.config['EVENTS_MAX_DURATION'],
+    )
+
+    async def pump():
+        async for frame in body:
+            await send({'type': 'http.response.body', 'body': frame.encode(), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    headers = list(STREAM_HEADERS.items())
+    observe(scope, started, timings, 200, headers)
+    streaming = disconnected = None
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': response_headers('text/event-stream; charset=utf-8', headers),
+        })
+        streaming = asyncio.ensure_future(pump())
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        await asyncio.wait({streaming, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        tasks = [task for task in (streaming, disconnected) if task is not None]
+        for task in tasks:
+            task.cancel()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        await body.aclose()
+        # A generator closed before its first frame skips its own cleanup.
+        broker.unsubscribe(subscription)
+    # Failing to send to a client that has gone away is expected.
+    if isinstance(outcomes[0], Exception) and disconnected.cancelled():
+        raise outcomes[0]
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def response_headers(content_type, headers):
+    return [
+        (b'content-type', content_type.encode()),
+        # Same policy as CORS(app) on the Flask side.
+        (b'access-control-allow-origin', b'*'),
+        *[(name.lower().encode(), value.encode()) for name, value in headers],
+    ]
+
+
+def observe(scope, started, timings, status, headers):
+    """Record request metrics, labelled by route, and add ``Server-Timing`` to ``headers``."""
+    seconds = time.perf_counter() - started
+    metrics = get_metrics(app)
+    if metrics is not None:
+        metrics.observe_request(scope['method'], scope['route'], status, seconds, timings)
+        if app.config['METRICS_SERVER_TIMING']:
+            headers.append(('Server-Timing', timings.header(seconds)))
+
+
+async def respond(scope, send, started, timings, payload, status, headers):
+    """Send a JSON response, with the same metrics and ``Server-Timing`` header as Flask requests get."""
+    with timings.timer('serialize'):
+        body = app.json.dumps_bytes(payload, separators=(',', ':')) + b'\n'
+    observe(scope, started, timings, status, headers)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-length', str(len(body)).encode()), *response_headers('application/json', headers)],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def json_endpoint(handler):
+    """ASGI handler for ``handler(scope, body, timings)``, which returns ``(payload, status, headers)``."""
+    async def endpoint(scope, receive, send):
+        started = time.perf_counter()
+        timings = RequestTimings()
+        body = await read_body(receive)
+        payload, status, headers = await handler(scope, body, timings)
+        await respond(scope, send, started, timings, payload, status, headers)
+    return endpoint
+
+
+# (method, URL rule) -> ASGI handler. Rules use Flask's syntax; ``<int:name>``
+# values are passed in ``scope['path_params']``.
+ASYNC_ROUTES = {
+    ('GET', '/api/places/search'): json_endpoint(search_places),
+    ('POST', '/api/places/batch'): json_endpoint(search_places_batch),
+    ('GET', '/api/trips/<int:id>/events'): trip_events,
+}
+
+
+def rule_pattern(rule):
+    parts = re.split(r'<int:(\w+)>', rule)
+    # re.split puts the captured names at odd indexes.
+    return re.compile(''.join(
+        f'(?P<{part}>[0-9]+)' if i % 2 else re.escape(part) for i, part in enumerate(parts)
+    ))
+
+
+class Application:
+    """Dispatches to the async handlers and bridges everything else to Flask."""
+
+    def __init__(self, wsgi_app, workers):
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=workers)
+        self.routes = [
+            (method, rule, rule_pattern(rule), handler) for (method, rule), handler in ASYNC_ROUTES.items()
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http':
+            for method, rule, pattern, handler in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match is not None and method == scope['method']:
+                    path_params = {name: int(value) for name, value in match.groupdict().items()}
+                    return await handler(dict(scope, route=rule, path_params=path_params), receive, send)
+        return await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                client = app.extensions.pop('async_mapbox_client', None)
+                if client is not None:
+                    await client.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = Application(app, app.config['ASGI_WSGI_WORKERS'])
@@ -0,0 +1 @@
+"""Benchmarks for the API. Each module runs with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,303 @@
+"""Load test for the main API endpoints.
+
+Seeds a throwaway SQLite database (see ``benchmarks.seed``), starts a local
+Mapbox stub (``benchmarks.mapbox_stub``) and drives ``get_trips``,
+``get_trip``, ``add_activity``, ``update_trip`` and ``search_places``:
+
+- ``client``: in process, one request at a time through the Flask test client.
+  Measures the per-request cost of the app without any server.
+- ``server``: over HTTP against ``uvicorn asgi:application`` with
+  ``--workers`` processes, from ``--concurrency`` client threads.
+
+Reports p50/p95/p99 latency, throughput and peak RSS per scenario, and saves
+the results as JSON so runs can be compared between commits::
+
+    cd backend
+    python -m benchmarks.load --trips 1000 --activities 20 --output before.json
+    python -m benchmarks.load --trips 1000 --activities 20 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from benchmarks.mapbox_stub import MapboxStubServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ('get_trips', 'get_trip', 'add_activity', 'update_trip', 'search_places')
+# Distinct place queries; a run repeats them, so later searches hit the cache.
+PLACE_QUERIES = tuple(f'town {i}' for i in range(200))
+
+
+def scenario_request(name, rng, trip_count):
+    """Return ``(method, path, json_body)`` for one request of scenario ``name``."""
+    trip_id = rng.randint(1, trip_count)
+    if name == 'get_trips':
+        return 'GET', '/api/trips?limit=50', None
+    if name == 'get_trip':
+        return 'GET', f'/api/trips/{trip_id}', None
+    if name == 'add_activity':
+        return 'POST', f'/api/trips/{trip_id}/activities', {
+            'name': 'Benchmark stop', 'type': 'excursion', 'date': '2025-06-01T10:00:00', 'location': 'Somewhere',
+        }
+    if name == 'update_trip':
+        return 'PUT', f'/api/trips/{trip_id}', {'summary': f'Updated {rng.random():.6f}'}
+    if name == 'search_places':
+        return 'GET', f'/api/places/search?query={rng.choice(PLACE_QUERIES).replace(" ", "%20")}', None
+    raise ValueError(f'Unknown scenario: {name}')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'throughput_rps': round((len(latencies) + errors) / elapsed, 1) if elapsed else None,
+    }
+
+
+def peak_rss_mb(pids=None):
+    """Peak resident memory in MB of this process, or summed over ``pids``."""
+    if pids is None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes.
+        return round(maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    total_kb = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return round(total_kb / 1024, 1) if total_kb else None
+
+
+def process_tree(pid):
+    """``pid`` and all of its descendants (Linux ``/proc``)."""
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def run_client(args, trip_count):
+    from app import app
+
+    client = app.test_client()
+    results = {}
+    for name in SCENARIOS:
+        rng = random.Random(args.seed)
+        for _ in range(args.warmup):
+            method, path, body = scenario_request(name, rng, trip_count)
+            client.open(path, method=method, json=body)
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            method, path, body = scenario_request(name, rng, trip_count)
+            request_started = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - request_started)
+        results[name] = summarize(latencies, errors, time.perf_counter() - started)
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise SystemExit(f'Server at {url} did not start within {timeout} s')
+
+
+def run_server(args, trip_count, env):
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1', '--port', str(port),
+         '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log'],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        _wait_until_up(base_url + '/')
+        results = {}
+        for name in SCENARIOS:
+            rng = random.Random(args.seed)
+            planned = [scenario_request(name, rng, trip_count) for _ in range(args.warmup + args.requests)]
+            local = threading.local()
+
+            def send(item):
+                if not hasattr(local, 'session'):
+                    local.session = requests.Session()
+                session = local.session
+                method, path, body = item
+                request_started = time.perf_counter()
+                response = session.request(method, base_url + path, json=body, timeout=60)
+                return response.status_code, time.perf_counter() - request_started
+
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                list(pool.map(send, planned[:args.warmup]))
+                started = time.perf_counter()
+                outcomes = list(pool.map(send, planned[args.warmup:]))
+                elapsed = time.perf_counter() - started
+            latencies = [seconds for status, seconds in outcomes if status < 400]
+            results[name] = summarize(latencies, len(outcomes) - len(latencies), elapsed)
+        results['peak_rss_mb'] = peak_rss_mb(process_tree(server.pid))
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    """Print p95 latency and throughput changes against a previous run."""
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    if baseline['meta'].get('params') != current['meta']['params']:
+        print('Warning: the runs used different parameters; the numbers are not directly comparable.')
+    for mode, scenarios in current['results'].items():
+        previous = baseline['results'].get(mode, {})
+        for name in SCENARIOS:
+            now, before = scenarios.get(name), previous.get(name)
+            if not now or not before or not before.get('p95_ms') or not now.get('p95_ms'):
+                continue
+            p95 = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+            rps = (now['throughput_rps'] - before['throughput_rps']) / before['throughput_rps'] * 100
+            print(f'{mode:7} {name:14} p95 {before["p95_ms"]:8.2f} -> {now["p95_ms"]:8.2f} ms ({p95:+6.1f}%)'
+                  f'   throughput {before["throughput_rps"]:8.1f} -> {now["throughput_rps"]:8.1f} rps ({rps:+6.1f}%)')
+
+
+def print_results(results):
+    for mode, scenarios in results.items():
+        print(f'\n{mode} (peak RSS {scenarios["peak_rss_mb"]} MB)')
+        print(f'{"scenario":14} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"req/s":>9} {"errors":>7}')
+        for name in SCENARIOS:
+            r = scenarios[name]
+            print(f'{name:14} {r["p50_ms"] or 0:9.2f} {r["p95_ms"] or 0:9.2f} {r["p99_ms"] or 0:9.2f}'
+                  f' {r["throughput_rps"] or 0:9.1f} {r["errors"]:7}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trips', type=int, default=1000)
+    parser.add_argument('--activities', type=int, default=20, help='activities per trip')
+    parser.add_argument('--participants', type=int, default=3, help='participants per trip')
+    parser.add_argument('--requests', type=int, default=500, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=50, help='unmeasured requests per scenario')
+    parser.add_argument('--mode', choices=('client', 'server', 'both'), default='both')
+    parser.add_argument('--workers', type=int, default=4, help='server worker processes')
+    parser.add_argument('--concurrency', type=int, default=16, help='client threads in server mode')
+    parser.add_argument('--mapbox-latency-ms', type=float, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='a previous --output file to compare with')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='co_planet_bench_')
+    stub = MapboxStubServer(('127.0.0.1', 0), args.mapbox_latency_ms / 1000).start()
+    env = dict(
+        os.environ,
+        DATABASE_URL='sqlite:///' + os.path.join(workdir, 'bench.db'),
+        PLACES_CACHE_PATH=os.path.join(workdir, 'places_cache.db'),
+        MAPBOX_GEOCODING_URL=stub.url,
+        MAPBOX_ACCESS_TOKEN='benchmark',
+    )
+    # Must be set before the app is imported.
+    os.environ.update(env)
+
+    from app import app, db
+    from benchmarks.seed import seed_database
+
+    with app.app_context():
+        db.create_all()
+        counts = seed_database(db, args.trips, args.activities, args.participants, args.seed)
+        db.engine.dispose()
+    print(f"Seeded {counts['trips']} trips, {counts['activities']} activities, "
+          f"{counts['participants']} participants in {workdir}")
+
+    results = {}
+    if args.mode in ('client', 'both'):
+        results['client'] = run_client(args, counts['trips'])
+    if args.mode in ('server', 'both'):
+        # A fresh places cache, so the server run sees the same hit rate.
+        server_env = dict(env, PLACES_CACHE_PATH=os.path.join(workdir, 'places_cache_server.db'))
+        results['server'] = run_server(args, counts['trips'], server_env)
+    stub.shutdown()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        },
+        'results': results,
+    }
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nSaved results to {args.output}')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Local stand-in for the Mapbox geocoding API.
+
+Answers ``GET /<query>.json`` with a few deterministic features after a fixed
+delay, so place search can be benchmarked without a token or network access.
+Point the app at it with ``MAPBOX_GEOCODING_URL``::
+
+    python -m benchmarks.mapbox_stub --port 8765 --latency-ms 80
+"""
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+def stub_features(query, limit):
+    # Coordinates derived from the query so repeated searches agree.
+    h = zlib.crc32(query.encode())
+    lat, lng = (h % 17000) / 100 - 85, (h // 17000 % 36000) / 100 - 180
+    return [
+        {
+            'id': f'place.{h}.{i}',
+            'place_name': f'{query.title()} {i}, Stubland',
+            'text': f'{query.title()} {i}',
+            'center': [lng + i / 100, lat],
+            'context': [],
+        }
+        for i in range(limit)
+    ]
+
+
+class MapboxStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.05):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        # Tests set this to make every search fail with that HTTP status.
+        self.status = 200
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve from a daemon thread and return ``self``."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = unquote(parts.path.rsplit('/', 1)[-1]).removesuffix('.json')
+        limit = int(parse_qs(parts.query).get('limit', ['5'])[0])
+        with self.server._lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        status = self.server.status
+        if status == 200:
+            body = json.dumps({'type': 'FeatureCollection', 'features': stub_features(query, limit)}).encode()
+        else:
+            body = json.dumps({'message': 'Stub error'}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    args = parser.parse_args()
+    server = MapboxStubServer((args.host, args.port), args.latency_ms / 1000)
+    print(f'Mapbox stub listening on {server.url}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
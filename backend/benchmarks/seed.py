@@ -0,0 +1,113 @@
+"""Synthetic data for benchmarks.
+
+Fills the app's database with ``trips`` trips of ``activities`` activities and
+``participants`` attendees each. Origins and destinations are scattered around
+a few real cities and activity dates spread over each trip, so spatial,
+calendar and listing queries see realistic distributions. The same ``seed``
+always produces the same data::
+
+    cd backend
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.seed --trips 1000 --activities 20
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+CITIES = (
+    ('Paris, France', 48.8566, 2.3522),
+    ('Rome, Italy', 41.9028, 12.4964),
+    ('Tokyo, Japan', 35.6762, 139.6503),
+    ('New York, New York, United States', 40.7128, -74.0060),
+    ('Mexico City, Mexico', 19.4326, -99.1332),
+    ('Cape Town, South Africa', -33.9249, 18.4241),
+    ('Sydney, Australia', -33.8688, 151.2093),
+    ('Reykjavik, Iceland', 64.1466, -21.9426),
+)
+ACTIVITY_TYPES = ('excursion', 'restaurant', 'flight', 'lodging')
+STATUSES = ('planned', 'booked', 'done', 'cancelled')
+NAMES = ('Ann', 'Bo', 'Chen', 'Dara', 'Eli', 'Fatima', 'Gus', 'Hana', 'Ivo', 'Jules')
+WORDS = ('museum', 'harbour', 'market', 'old town', 'gallery', 'park', 'bistro', 'temple', 'beach', 'tower')
+
+# Rows per executemany; keeps the parameter lists bounded on large seeds.
+CHUNK_SIZE = 5000
+
+
+def _scatter(rng, city):
+    name, lat, lng = city
+    return name, lat + rng.uniform(-0.5, 0.5), lng + rng.uniform(-0.5, 0.5)
+
+
+def _chunks(rows):
+    rows = iter(rows)
+    while True:
+        chunk = [row for _, row in zip(range(CHUNK_SIZE), rows)]
+        if not chunk:
+            return
+        yield chunk
+
+
+def seed_database(db, trips=1000, activities=20, participants=3, seed=42):
+    """Insert the synthetic data with multi-row inserts and return the counts.
+
+    Trip ids are assumed to start at 1 (an empty database).
+    """
+    from models import Activity, Trip, TripParticipant
+
+    rng = random.Random(seed)
+    created = datetime(2025, 1, 1)
+    trip_rows, participant_rows, activity_rows = [], [], []
+    for i in range(trips):
+        origin, origin_lat, origin_lng = _scatter(rng, rng.choice(CITIES))
+        destination, destination_lat, destination_lng = _scatter(rng, rng.choice(CITIES))
+        start = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+        length = rng.randint(2, 21)
+        trip_rows.append({
+            'name': f'Trip {i}', 'origin': origin, 'origin_place_name': origin,
+            'origin_lat': origin_lat, 'origin_lng': origin_lng,
+            'destination': destination, 'destination_place_name': destination,
+            'destination_lat': destination_lat, 'destination_lng': destination_lng,
+            'is_round_trip': rng.random() < 0.3, 'start_date': start, 'end_date': start + timedelta(days=length),
+            'summary': f'{length} days from {origin} to {destination}', 'created_at': created + timedelta(minutes=i),
+            'updated_at': created + timedelta(minutes=i),
+        })
+        for position, name in enumerate(rng.sample(NAMES, min(participants, len(NAMES)))):
+            participant_rows.append({'trip_id': i + 1, 'name': name, 'position': position})
+        for j in range(activities):
+            when = datetime.combine(start, datetime.min.time()) + timedelta(
+                days=rng.randrange(length + 1), hours=rng.randrange(8, 22))
+            activity_rows.append({
+                'trip_id': i + 1, 'name': f'{rng.choice(WORDS).title()} {j}', 'type': rng.choice(ACTIVITY_TYPES),
+                'date': when, 'location': f'{rng.choice(WORDS)}, {destination}',
+                'notes': f'Visit the {rng.choice(WORDS)} near the {rng.choice(WORDS)}', 'status': rng.choice(STATUSES),
+            })
+
+    # Trips go through the ORM insert so their geohashes are filled in.
+    for chunk in _chunks(trip_rows):
+        db.session.add_all(Trip(**row) for row in chunk)
+        db.session.flush()
+    for model, rows in ((TripParticipant, participant_rows), (Activity, activity_rows)):
+        for chunk in _chunks(rows):
+            db.session.execute(insert(model), chunk)
+    db.session.commit()
+    return {'trips': len(trip_rows), 'participants': len(participant_rows), 'activities': len(activity_rows)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trips', type=int, default=1000)
+    parser.add_argument('--activities', type=int, default=20, help='activities per trip')
+    parser.add_argument('--participants', type=int, default=3, help='participants per trip')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from app import app, db
+
+    with app.app_context():
+        db.create_all()
+        print(seed_database(db, args.trips, args.activities, args.participants, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Microbenchmark for serializing the trip listing.
+
+Compares the previous path (hydrated ORM objects, hand-written ``to_dict``
+literals, stdlib ``json``) with column rows serialized by cached plans,
+encoded with the stdlib and with orjson. Runs against a throwaway in-memory
+SQLite database::
+
+    cd backend
+    python -m benchmarks.serialization --trips 5000 --activities 3
+"""
+import argparse
+import os
+import time
+from datetime import date, datetime, timedelta
+
+# Must be set before the app is imported.
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from app import app, db  # noqa: E402
+from models import Trip, Activity, TripParticipant  # noqa: E402
+from routes.trips import trip_dicts  # noqa: E402
+from serialization import JSONProvider, orjson  # noqa: E402
+
+
+def seed(trip_count, activities_per_trip):
+    start = datetime(2025, 1, 1)
+    db.session.execute(insert(Trip), [
+        {
+            'name': f'Trip {i}', 'origin': 'Paris, France', 'origin_lat': 48.85, 'origin_lng': 2.35,
+            'destination': 'Rome, Italy', 'destination_lat': 41.9, 'destination_lng': 12.5,
+            'is_round_trip': False, 'start_date': date(2025, 1, 1), 'end_date': date(2025, 1, 8),
+            'summary': 'A week away', 'created_at': start + timedelta(minutes=i),
+        }
+        for i in range(trip_count)
+    ])
+    db.session.execute(insert(TripParticipant), [
+        {'trip_id': i + 1, 'name': name, 'position': position}
+        for i in range(trip_count) for position, name in enumerate(('Ann', 'Bo'))
+    ])
+    db.session.execute(insert(Activity), [
+        {'trip_id': i + 1, 'name': f'Activity {j}', 'type': 'sight', 'date': start + timedelta(hours=j),
+         'location': 'Somewhere', 'status': 'planned'}
+        for i in range(trip_count) for j in range(activities_per_trip)
+    ])
+    db.session.commit()
+
+
+def _legacy_activity(activity):
+    return {
+        'id': activity.id,
+        'trip_id': activity.trip_id,
+        'name': activity.name,
+        'type': activity.type,
+        'date': activity.date.isoformat() if activity.date else None,
+        'location': activity.location,
+        'location_place_name': activity.location_place_name,
+        'location_lat': activity.location_lat,
+        'location_lng': activity.location_lng,
+        'location_mapbox_id': activity.location_mapbox_id,
+        'notes': activity.notes,
+        'status': activity.status,
+        'external_id': activity.external_id,
+    }
+
+
+def _legacy_trip(trip):
+    return {
+        'id': trip.id,
+        'name': trip.name,
+        'origin': trip.origin,
+        'origin_place_name': trip.origin_place_name,
+        'origin_lat': trip.origin_lat,
+        'origin_lng': trip.origin_lng,
+        'origin_mapbox_id': trip.origin_mapbox_id,
+        'destination': trip.destination,
+        'destination_place_name': trip.destination_place_name,
+        'destination_lat': trip.destination_lat,
+        'destination_lng': trip.destination_lng,
+        'destination_mapbox_id': trip.destination_mapbox_id,
+        'is_round_trip': trip.is_round_trip,
+        'start_date': trip.start_date.isoformat() if trip.start_date else None,
+        'end_date': trip.end_date.isoformat() if trip.end_date else None,
+        'summary': trip.summary,
+        'people': trip.people,
+        'created_at': trip.created_at.isoformat(),
+        'updated_at': trip.updated_at.isoformat() if trip.updated_at else None,
+        'external_id': trip.external_id,
+        'activities': [_legacy_activity(activity) for activity in trip.activities],
+    }
+
+
+def legacy_payload(provider):
+    trips = Trip.query.options(selectinload(Trip.activities)).order_by(Trip.created_at.desc(), Trip.id.desc())
+    return provider.dumps([_legacy_trip(trip) for trip in trips])
+
+
+def row_payload(provider):
+    return provider.dumps(trip_dicts(order_by=(Trip.created_at.desc(), Trip.id.desc()), include_activities=True))
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        payload = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trips', type=int, default=5000)
+    parser.add_argument('--activities', type=int, default=3, help='activities per trip')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per path; the best is reported')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        seed(args.trips, args.activities)
+
+        stdlib = DefaultJSONProvider(app)
+        app.config['JSON_BACKEND'] = 'stdlib'
+        rows_stdlib = JSONProvider(app)
+        app.config['JSON_BACKEND'] = 'auto'
+        rows_orjson = JSONProvider(app)
+
+        paths = [
+            ('orm + to_dict literals + json', lambda: legacy_payload(stdlib)),
+            ('rows + plans + json', lambda: row_payload(rows_stdlib)),
+        ]
+        if orjson is not None:
+            paths.append(('rows + plans + orjson', lambda: row_payload(rows_orjson)))
+        else:
+            print('orjson is not installed; skipping the orjson path.')
+
+        print(f'{args.trips} trips x {args.activities} activities, best of {args.repeat}')
+        baseline = None
+        expected = None
+        for label, fn in paths:
+            seconds, payload = measure(fn, args.repeat)
+            decoded = stdlib.loads(payload)
+            if expected is None:
+                expected = decoded
+            elif decoded != expected:
+                raise SystemExit(f'{label} produced a different payload')
+            baseline = baseline or seconds
+            print(f'{label:32} {seconds * 1000:9.1f} ms  {args.trips / seconds:10.0f} trips/s  {baseline / seconds:5.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Startup benchmark: import time and time to first request.
+
+Every run starts a fresh interpreter, so nothing is already imported or cached:
+
+- ``client``: imports ``app``, builds it with ``create_app`` and serves
+  ``GET /api/trips?limit=1`` through the Flask test client. Reports each step,
+  the whole process wall time and how many modules were loaded.
+- ``server``: starts ``uvicorn asgi:application`` with one worker and polls
+  the same URL until it answers, which is what a rolling restart waits for.
+
+``--blueprints`` and ``--without-migrations`` set ``APP_BLUEPRINTS`` and
+``MIGRATIONS_ENABLED`` for the runs, and ``--top`` lists the packages that
+take the longest to import. Results can be saved and compared like
+``benchmarks.load``::
+
+    cd backend
+    python -m benchmarks.startup --runs 10 --output before.json
+    python -m benchmarks.startup --runs 10 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+
+from benchmarks.load import BACKEND_DIR, _free_port, git_commit
+
+FIRST_REQUEST = '/api/trips?limit=1'
+CLIENT_STEPS = ('import_ms', 'create_app_ms', 'first_request_ms', 'process_ms')
+
+# Runs in the child interpreter; prints its timings as JSON.
+CLIENT_SCRIPT = f'''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+status = application.test_client().get({FIRST_REQUEST!r}).status_code
+answered = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (answered - created) * 1000,
+    'status': status,
+    'modules': len(sys.modules),
+}}))
+'''
+
+
+def run_client_once(env):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', CLIENT_SCRIPT], cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise SystemExit(f'Startup run failed:\n{result.stderr}')
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    if timings.pop('status') != 200:
+        raise SystemExit(f'GET {FIRST_REQUEST} did not return 200; is the schema in place?')
+    timings['process_ms'] = elapsed * 1000
+    return timings
+
+
+def run_server_once(env, timeout=60):
+    """Milliseconds from spawning uvicorn until the first 200 response."""
+    port = _free_port()
+    url = f'http://127.0.0.1:{port}{FIRST_REQUEST}'
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning', '--no-access-log'],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise SystemExit('The server exited before answering.')
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.005)
+        raise SystemExit(f'Server did not answer within {timeout} s')
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def summarize(values):
+    return {
+        'median_ms': round(statistics.median(values), 1),
+        'min_ms': round(min(values), 1),
+        'max_ms': round(max(values), 1),
+    }
+
+
+def import_profile(env, top):
+    """Import time per top-level package, slowest first, from ``python -X importtime``."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    totals = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        totals[name.strip().split('.')[0]] += int(self_us)
+    slowest = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{'package': package, 'ms': round(us / 1000, 1)} for package, us in slowest]
+
+
+def compare(current, baseline):
+    """Print median changes against a previous run."""
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    if baseline['meta'].get('params') != current['meta']['params']:
+        print('Warning: the runs used different parameters; the numbers are not directly comparable.')
+    for mode, steps in current['results'].items():
+        previous = baseline['results'].get(mode, {})
+        for name, now in steps.items():
+            before = previous.get(name)
+            if not isinstance(now, dict) or not before or not before.get('median_ms'):
+                continue
+            change = (now['median_ms'] - before['median_ms']) / before['median_ms'] * 100
+            print(f'{mode:7} {name:17} {before["median_ms"]:8.1f} -> {now["median_ms"]:8.1f} ms ({change:+6.1f}%)')
+
+
+def print_results(results, profile):
+    for mode, steps in results.items():
+        print(f'\n{mode}' + (f' ({steps["modules"]} modules loaded)' if 'modules' in steps else ''))
+        print(f'{"step":17} {"median ms":>10} {"min ms":>9} {"max ms":>9}')
+        for name, r in steps.items():
+            if isinstance(r, dict):
+                print(f'{name:17} {r["median_ms"]:10.1f} {r["min_ms"]:9.1f} {r["max_ms"]:9.1f}')
+    if profile:
+        print(f'\n{"package":24} {"import ms":>10}')
+        for entry in profile:
+            print(f'{entry["package"]:24} {entry["ms"]:10.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='fresh processes per mode')
+    parser.add_argument('--mode', choices=('client', 'server', 'both'), default='client')
+    parser.add_argument('--blueprints', help='comma-separated APP_BLUEPRINTS for the runs (default: all)')
+    parser.add_argument('--without-migrations', action='store_true', help='run with MIGRATIONS_ENABLED=false')
+    parser.add_argument('--top', type=int, default=0, help='list the N packages slowest to import')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='a previous --output file to compare with')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='co_planet_startup_')
+    env = dict(
+        os.environ,
+        DATABASE_URL='sqlite:///' + os.path.join(workdir, 'startup.db'),
+        PLACES_CACHE_PATH=os.path.join(workdir, 'places_cache.db'),
+    )
+    if args.blueprints:
+        env['APP_BLUEPRINTS'] = args.blueprints
+    if args.without_migrations:
+        env['MIGRATIONS_ENABLED'] = 'false'
+    # The schema is created in a separate process so the timed runs start cold.
+    subprocess.run(
+        [sys.executable, '-c', 'from app import app, db\nwith app.app_context(): db.create_all()'],
+        cwd=BACKEND_DIR, env=env, check=True,
+    )
+
+    results = {}
+    if args.mode in ('client', 'both'):
+        runs = [run_client_once(env) for _ in range(args.runs)]
+        results['client'] = {name: summarize([run[name] for run in runs]) for name in CLIENT_STEPS}
+        results['client']['modules'] = runs[-1]['modules']
+    if args.mode in ('server', 'both'):
+        results['server'] = {'first_response_ms': summarize([run_server_once(env) for _ in range(args.runs)])}
+    profile = import_profile(env, args.top) if args.top else []
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        },
+        'results': results,
+        'import_profile': profile,
+    }
+    print_results(results, profile)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nSaved results to {args.output}')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
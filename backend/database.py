@@ -0,0 +1,76 @@
+"""Database URI, pool and SQLite connection settings.
+
+Everything is driven by environment variables so the same code can run on the
+bundled SQLite file in development and on Postgres (or a tuned SQLite) in
+production. SQLite connections get their pragmas from a ``connect`` event
+listener, since most of them are per-connection settings.
+"""
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def database_uri(basedir):
+    uri = os.environ.get('DATABASE_URL')
+    if not uri:
+        return 'sqlite:///' + os.path.join(basedir, 'co_planet.db')
+    # Heroku-style URLs use the scheme SQLAlchemy dropped in 1.4.
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def sqlite_pragmas():
+    """Pragmas applied to every new SQLite connection, in order."""
+    return {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        # Negative values are KiB rather than pages.
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+        # Off by default in SQLite; the ON DELETE CASCADE foreign keys rely on it.
+        'foreign_keys': 'ON',
+    }
+
+
+def engine_options(uri):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for the configured database."""
+    url = make_url(uri)
+    if is_sqlite(uri) and url.database in (None, '', ':memory:'):
+        # In-memory databases are private to one connection; keep the default pool.
+        return {}
+
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': not is_sqlite(uri),
+    }
+    if is_sqlite(uri):
+        # Pooled connections are handed between request threads.
+        options['connect_args'] = {'check_same_thread': False}
+    return options
+
+
+def configure_engine(engine, pragmas=None):
+    """Apply SQLite pragmas on connect; a no-op for other databases."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
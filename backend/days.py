@@ -0,0 +1,39 @@
+"""Day parameters and day ranges over ``activity.date``.
+
+Shared by the calendar, routing and activity blueprints, so none of them
+imports another (each blueprint module is only loaded when it is selected,
+see ``APP_BLUEPRINTS`` in app.py).
+"""
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select
+
+from extensions import db
+from models import Activity
+
+
+def parse_day(value, name):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD).')
+
+
+def day_bounds(first, last):
+    """Half-open datetime range covering the days ``first`` to ``last``.
+
+    Filtering on the raw ``date`` column (rather than on ``date(date)``) keeps
+    the query a range scan of the ``activity(trip_id, date)`` index.
+    """
+    return datetime.combine(first, time.min), datetime.combine(last + timedelta(days=1), time.min)
+
+
+def day_activities(trip_id, day):
+    """Serialized activities of one day of a trip, ordered by time."""
+    start, end = day_bounds(day, day)
+    rows = db.session.execute(
+        select(*[getattr(Activity, field) for field in Activity.FIELDS])
+        .where(Activity.trip_id == trip_id, Activity.date >= start, Activity.date < end)
+        .order_by(Activity.date, Activity.id)
+    )
+    return Activity.serializer().rows(rows)
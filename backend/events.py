@@ -0,0 +1,232 @@
+"""In-process pub/sub for live trip updates (see ``routes/events.py``).
+
+Changes recorded with ``TripChange.record`` are published once their
+transaction commits, one message per trip version. An ``EventBroker`` fans
+messages out to subscriptions, each with a bounded queue: publishing never
+blocks, and a subscriber that falls ``EVENTS_QUEUE_SIZE`` messages behind is
+marked as overflowed and told to resync instead of buffering without limit.
+A ``Subscription`` is read by a blocking thread (WSGI); an
+``AsyncSubscription`` is read by a coroutine on an asyncio event loop (ASGI).
+
+The backend carries messages between processes. ``LocalBackend`` delivers
+them within the current process only (development, tests, single worker);
+``RedisBackend`` uses Redis pub/sub so every worker sees every change.
+"""
+from collections import defaultdict, deque
+import asyncio
+import json
+import threading
+
+from flask import current_app
+from sqlalchemy import event
+
+from extensions import db
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+_init_lock = threading.Lock()
+
+
+def trip_channel(trip_id):
+    return f'trip:{trip_id}'
+
+
+class Subscription:
+    def __init__(self, channel, max_queue):
+        self.channel = channel
+        self.overflowed = False
+        self._queue = deque()
+        self._max_queue = max_queue
+        self._ready = threading.Condition()
+
+    def put(self, message):
+        with self._ready:
+            if len(self._queue) >= self._max_queue:
+                self.overflowed = True
+                self._queue.clear()
+            elif not self.overflowed:
+                self._queue.append(message)
+            self._ready.notify()
+
+    def get(self, timeout):
+        """Return the queued messages, waiting up to ``timeout`` seconds for one."""
+        with self._ready:
+            if not self._queue and not self.overflowed:
+                self._ready.wait(timeout)
+            messages = list(self._queue)
+            self._queue.clear()
+            return messages
+
+
+class AsyncSubscription:
+    """A subscription read from an asyncio event loop (see ``asgi.py``).
+
+    ``put`` is called from whichever thread dispatches the message and hands
+    it to the loop with ``call_soon_threadsafe``, so a waiting stream costs a
+    coroutine rather than a thread.
+    """
+
+    def __init__(self, channel, max_queue, loop):
+        self.channel = channel
+        self.overflowed = False
+        self._loop = loop
+        self._queue = asyncio.Queue(max_queue)
+
+    def put(self, message):
+        try:
+            self._loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            pass  # The loop has closed; nobody is reading any more.
+
+    def _put(self, message):
+        if self.overflowed:
+            return
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            # Wakes the reader, which checks ``overflowed``.
+            self._queue.put_nowait(None)
+
+    async def get(self, timeout):
+        """Return the queued messages, waiting up to ``timeout`` seconds for one."""
+        try:
+            first = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        messages = [first]
+        while not self._queue.empty():
+            messages.append(self._queue.get_nowait())
+        return [message for message in messages if message is not None]
+
+
+class LocalBackend:
+    """Delivers published messages to subscribers in this process."""
+
+    def start(self, dispatch):
+        self._dispatch = dispatch
+
+    def publish(self, channel, message):
+        self._dispatch(channel, message)
+
+
+class RedisBackend:
+    """Redis pub/sub transport; a listener thread dispatches to local subscribers."""
+
+    def __init__(self, url, prefix='co_planet:'):
+        if redis is None:
+            raise RuntimeError('EVENTS_BACKEND=redis requires the redis package.')
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def start(self, dispatch):
+        def handle(item):
+            channel = item['channel'].decode()[len(self._prefix):]
+            dispatch(channel, json.loads(item['data']))
+
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(**{f'{self._prefix}*': handle})
+        self._thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def publish(self, channel, message):
+        self._client.publish(self._prefix + channel, json.dumps(message))
+
+
+class EventBroker:
+    def __init__(self, backend, max_queue=100, max_subscribers=1000):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._count = 0
+        self._backend = backend
+        backend.start(self._dispatch)
+
+    def subscribe(self, channel, loop=None):
+        """Return a new ``Subscription``, or ``None`` when the broker is full.
+
+        With ``loop``, the subscription is an ``AsyncSubscription`` read on
+        that event loop.
+        """
+        if loop is not None:
+            subscription = AsyncSubscription(channel, self.max_queue, loop)
+        else:
+            subscription = Subscription(channel, self.max_queue)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            self._subscribers[channel].add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, message):
+        self._backend.publish(channel, message)
+
+    def _dispatch(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def subscriber_count(self):
+        with self._lock:
+            return self._count
+
+
+def get_event_broker(app):
+    broker = app.extensions.get('event_broker')
+    if broker is None:
+        with _init_lock:
+            broker = app.extensions.get('event_broker')
+            if broker is None:
+                if app.config['EVENTS_BACKEND'] == 'redis':
+                    backend = RedisBackend(app.config['EVENTS_REDIS_URL'])
+                else:
+                    backend = LocalBackend()
+                broker = EventBroker(
+                    backend,
+                    max_queue=app.config['EVENTS_QUEUE_SIZE'],
+                    max_subscribers=app.config['EVENTS_MAX_SUBSCRIBERS'],
+                )
+                app.extensions['event_broker'] = broker
+    return broker
+
+
+def change_messages(changes):
+    """Group serialized changes into one message per ``(trip_id, seq)``, in order."""
+    messages = {}
+    for change in changes:
+        key = (change['trip_id'], change['seq'])
+        if key not in messages:
+            messages[key] = {'trip_id': change['trip_id'], 'seq': change['seq'], 'changes': []}
+        messages[key]['changes'].append({k: v for k, v in change.items() if k != 'trip_id'})
+    return list(messages.values())
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_committed_changes(session):
+    changes = session.info.pop('trip_changes', None)
+    if not changes:
+        return
+    broker = get_event_broker(current_app)
+    for message in change_messages(changes):
+        broker.publish(trip_channel(message['trip_id']), message)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_uncommitted_changes(session):
+    session.info.pop('trip_changes', None)
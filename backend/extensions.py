@@ -0,0 +1,8 @@
+"""Flask extensions, created unbound and attached to each app in ``create_app``.
+
+Models, routes and helpers import ``db`` from here rather than from ``app``,
+so importing them does not build an application.
+"""
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
@@ -0,0 +1,168 @@
+"""Geohash encoding, bounding-box covers and haversine distances.
+
+Trips store a geohash next to each coordinate pair. A bounding box is turned
+into a small set of geohash prefixes, each of which is an index range scan;
+exact distances are then computed for the candidates only. numpy is used for
+the distance computation when it is installed; it is imported on first use
+rather than with the models, which import this module.
+"""
+import math
+
+_UNSET = object()
+_numpy = _UNSET
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Largest number of geohash cells used to cover one bounding box.
+MAX_COVER_CELLS = 32
+
+
+def load_numpy():
+    """The numpy module, or ``None`` when it is not installed."""
+    global _numpy
+    if _numpy is _UNSET:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - optional dependency
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    if lat is None or lng is None:
+        return None
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def _cell_size(precision):
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def _steps(low, high, step):
+    value = low
+    while value < high:
+        yield value
+        value += step
+    yield high
+
+
+def geohash_cover(south, west, north, east):
+    """Return geohash prefixes whose cells cover the box.
+
+    Boxes crossing the antimeridian (``west > east``) are split in two. An
+    empty list means the box is too large to narrow down and every row is a
+    candidate.
+    """
+    if west > east:
+        left = geohash_cover(south, west, north, 180.0)
+        right = geohash_cover(south, -180.0, north, east)
+        return left + right if left and right else []
+
+    south, north = max(south, -90.0), min(north, 90.0)
+    west, east = max(west, -180.0), min(east, 180.0)
+    chosen = None
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        height, width = _cell_size(precision)
+        cells = (math.ceil((north - south) / height) + 1) * (math.ceil((east - west) / width) + 1)
+        if cells > MAX_COVER_CELLS:
+            break
+        chosen = precision
+    if chosen is None:
+        return []
+
+    height, width = _cell_size(chosen)
+    cover = set()
+    for lat in _steps(south, north, height):
+        for lng in _steps(west, east, width):
+            cover.add(geohash_encode(min(lat, 89.999999), min(lng, 179.999999), chosen))
+    return sorted(cover)
+
+
+def radius_bbox(lat, lng, radius_km):
+    """Return ``(south, west, north, east)`` enclosing a circle."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = lat - dlat, lat + dlat
+    if south <= -90.0 or north >= 90.0:
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    dlng = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(lat))))
+    if dlng >= 180.0:
+        return south, -180.0, north, 180.0
+    west, east = lng - dlng, lng + dlng
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return south, west, north, east
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Distances in km from one point to many points."""
+    np = load_numpy()
+    if np is not None:
+        lat1 = np.radians(lat)
+        lat2 = np.radians(np.asarray(lats, dtype=float))
+        dlat = lat2 - lat1
+        dlng = np.radians(np.asarray(lngs, dtype=float) - lng)
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+        return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).tolist()
+
+    lat1 = math.radians(lat)
+    cos_lat1 = math.cos(lat1)
+    distances = []
+    for other_lat, other_lng in zip(lats, lngs):
+        lat2 = math.radians(other_lat)
+        a = (math.sin((lat2 - lat1) / 2) ** 2
+             + cos_lat1 * math.cos(lat2) * math.sin(math.radians(other_lng - lng) / 2) ** 2)
+        distances.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0))))
+    return distances
+
+
+def haversine_matrix(lats, lngs):
+    """Pairwise distances in km between points.
+
+    Returns a numpy array when numpy is installed and a list of lists otherwise.
+    """
+    np = load_numpy()
+    if np is not None:
+        lat = np.radians(np.asarray(lats, dtype=float))
+        lng = np.radians(np.asarray(lngs, dtype=float))
+        dlat = lat[:, None] - lat[None, :]
+        dlng = lng[:, None] - lng[None, :]
+        cos_lat = np.cos(lat)
+        a = np.sin(dlat / 2) ** 2 + np.outer(cos_lat, cos_lat) * np.sin(dlng / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    return [haversine_km(lat, lng, lats, lngs) for lat, lng in zip(lats, lngs)]
+
+
+def in_bbox(lat, lng, south, west, north, east):
+    if lat is None or lng is None or not south <= lat <= north:
+        return False
+    if west <= east:
+        return west <= lng <= east
+    return lng >= west or lng <= east
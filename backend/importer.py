@@ -0,0 +1,315 @@
+"""Streaming bulk import of itineraries (trips with their activities).
+
+Input is read one record at a time from NDJSON (one trip per line, with a
+nested ``activities`` list, as written by ``/api/export``) or CSV (one row per
+activity with ``trip_*`` and ``activity_*`` columns, rows of a trip adjacent).
+Records are validated with the same rules as ``POST /api/trips`` and written
+in bounded batches, one transaction per batch. Trips and activities that
+carry an ``external_id`` are upserted; the others are always inserted.
+"""
+from datetime import datetime
+import csv
+import json
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from extensions import db
+from geo import geohash_encode
+from models import Trip, Activity, TripParticipant
+from routes.activities import validate_activity_batch
+from routes.trips import trip_values
+
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+_TRUE_STRINGS = {'1', 'true', 't', 'yes', 'y'}
+
+
+class ImportReport:
+    def __init__(self):
+        self.counts = {
+            'trips_created': 0,
+            'trips_updated': 0,
+            'activities_created': 0,
+            'activities_updated': 0,
+        }
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, ref, external_id, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'ref': ref, 'external_id': external_id, 'error': message})
+
+    def to_dict(self):
+        return dict(self.counts, error_count=self.error_count, errors=self.errors)
+
+
+def read_ndjson(stream):
+    """Yield ``(ref, record)`` per line; ``record`` is an exception for unparsable lines."""
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield f'line {line_number}', json.loads(line)
+        except ValueError as e:
+            yield f'line {line_number}', ValueError(f'Invalid JSON: {e}')
+
+
+def _csv_value(value):
+    return value if value not in ('', None) else None
+
+
+def _csv_people(value):
+    """``trip_people``: a JSON list as written by the exporter, or ``;``-separated names."""
+    if not value:
+        return []
+    if value.lstrip().startswith('['):
+        try:
+            people = json.loads(value)
+        except ValueError:
+            people = None
+        if isinstance(people, list):
+            return people
+    return [name for name in value.split(';') if name.strip()]
+
+
+def read_csv(stream):
+    """Yield ``(ref, record)`` per trip, grouping adjacent rows that share a trip key.
+
+    The key is ``trip_external_id`` (or ``trip_id`` for files written by the
+    exporter). Rows with neither each become a trip of their own.
+    """
+    reader = csv.DictReader(stream)
+    current_key = None
+    current = None
+    for row in reader:
+        ref = f'row {reader.line_num}'
+        trip = {}
+        activity = {}
+        for column, value in row.items():
+            if column is None:
+                continue
+            if column.startswith('trip_'):
+                trip[column[len('trip_'):]] = _csv_value(value)
+            elif column.startswith('activity_'):
+                activity[column[len('activity_'):]] = _csv_value(value)
+
+        key = trip.get('external_id') or trip.get('id')
+        if current is None or key is None or key != current_key:
+            if current is not None:
+                yield current
+            trip['is_round_trip'] = (trip.get('is_round_trip') or '').strip().lower() in _TRUE_STRINGS
+            trip['people'] = _csv_people(trip.get('people'))
+            trip['activities'] = []
+            current_key = key
+            current = (ref, trip)
+
+        activity.pop('id', None)
+        # An empty cell means "not given", so defaults such as status apply.
+        activity = {column: value for column, value in activity.items() if value is not None}
+        if activity:
+            current[1]['activities'].append(activity)
+
+    if current is not None:
+        yield current
+
+
+def _validate(ref, record, report):
+    """Return ``(trip values, activity values)`` or ``None`` after reporting the error."""
+    external_id = record.get('external_id') if isinstance(record, dict) else None
+    if isinstance(record, Exception):
+        report.add_error(ref, None, str(record))
+        return None
+    try:
+        values = trip_values(record)
+        activities = record.get('activities') or []
+        if not isinstance(activities, list):
+            raise ValueError('activities must be a list.')
+    except (TypeError, ValueError) as e:
+        report.add_error(ref, external_id, str(e))
+        return None
+
+    activity_values, errors = validate_activity_batch(activities, allow_duplicate_external_ids=True)
+    if errors:
+        first = errors[0]
+        report.add_error(ref, external_id, f"activities[{first['index']}]: {first['error']}")
+        return None
+    return values, activity_values
+
+
+def _upsert_insert(table):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        raise RuntimeError(f'Bulk upserts are not supported on {dialect}.')
+    return dialect_insert(table)
+
+
+def _write_batch(batch):
+    """Write one validated batch in the current transaction and return its counts."""
+    counts = dict.fromkeys(('trips_created', 'trips_updated', 'activities_created', 'activities_updated'), 0)
+    trip_table = Trip.__table__
+    activity_table = Activity.__table__
+    now = datetime.utcnow()
+
+    keyed, unkeyed = {}, []
+    for values, activities in batch:
+        row = {key: value for key, value in values.items() if key != 'people'}
+        row['origin_geohash'] = geohash_encode(row['origin_lat'], row['origin_lng'])
+        row['destination_geohash'] = geohash_encode(row['destination_lat'], row['destination_lng'])
+        row['updated_at'] = now
+        if row['external_id'] is None:
+            unkeyed.append((row, values['people'], activities))
+            continue
+        # A trip repeated within the batch is merged as if the records came in
+        # separate batches: the last one's fields and participants win and
+        # the activities of all of them are written.
+        earlier = keyed.get(row['external_id'])
+        if earlier is not None:
+            activities = earlier[2] + activities
+        keyed[row['external_id']] = (row, values['people'], activities)
+    keyed = list(keyed.values())
+
+    trip_ids = []  # parallel to ``keyed + unkeyed``
+    existing_ids = set()
+
+    if keyed:
+        external_ids = [row['external_id'] for row, _, _ in keyed]
+        existing_ids = set(db.session.scalars(select(Trip.id).where(Trip.external_id.in_(external_ids))))
+        stmt = _upsert_insert(trip_table)
+        update_columns = [key for key in keyed[0][0] if key != 'external_id']
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[trip_table.c.external_id],
+            set_=dict(
+                {column: stmt.excluded[column] for column in update_columns},
+                version=trip_table.c.version + 1,
+            ),
+        )
+        db.session.execute(stmt, [row for row, _, _ in keyed])
+        id_by_external_id = dict(db.session.execute(
+            select(Trip.external_id, Trip.id).where(Trip.external_id.in_(external_ids))
+        ).all())
+        trip_ids.extend(id_by_external_id[row['external_id']] for row, _, _ in keyed)
+
+    if unkeyed:
+        trip_ids.extend(db.session.scalars(
+            insert(trip_table).returning(trip_table.c.id, sort_by_parameter_order=True),
+            [row for row, _, _ in unkeyed],
+        ).all())
+
+    records = keyed + unkeyed
+    counts['trips_updated'] = len(existing_ids)
+    counts['trips_created'] = len(set(trip_ids) - existing_ids)
+
+    # Participants are replaced wholesale, as PUT /api/trips does.
+    if existing_ids:
+        db.session.execute(TripParticipant.__table__.delete().where(TripParticipant.trip_id.in_(existing_ids)))
+    participants = [
+        {'trip_id': trip_id, 'name': name, 'position': position}
+        for trip_id, (_, people, _) in zip(trip_ids, records)
+        for position, name in enumerate(people)
+    ]
+    if participants:
+        db.session.execute(insert(TripParticipant.__table__), participants)
+
+    keyed_activities, unkeyed_activities = {}, []
+    for trip_id, (_, _, activities) in zip(trip_ids, records):
+        for item in activities:
+            row = dict(item, trip_id=trip_id)
+            if row['external_id'] is None:
+                unkeyed_activities.append(row)
+            else:
+                # The last of repeated (trip, external_id) pairs wins, and is counted once.
+                keyed_activities[(trip_id, row['external_id'])] = row
+    keyed_activities = list(keyed_activities.values())
+
+    if keyed_activities:
+        existing_pairs = set()
+        if existing_ids:
+            existing_pairs = set(db.session.execute(
+                select(Activity.trip_id, Activity.external_id)
+                .where(Activity.trip_id.in_(existing_ids), Activity.external_id.isnot(None))
+            ).all())
+        stmt = _upsert_insert(activity_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[activity_table.c.trip_id, activity_table.c.external_id],
+            set_={column: stmt.excluded[column] for column in keyed_activities[0]
+                  if column not in ('trip_id', 'external_id')},
+        )
+        db.session.execute(stmt, keyed_activities)
+        updated = sum((row['trip_id'], row['external_id']) in existing_pairs for row in keyed_activities)
+        counts['activities_updated'] += updated
+        counts['activities_created'] += len(keyed_activities) - updated
+
+    if unkeyed_activities:
+        db.session.execute(insert(activity_table), unkeyed_activities)
+        counts['activities_created'] += len(unkeyed_activities)
+
+    return counts
+
+
+def _flush(batch, report):
+    try:
+        counts = _write_batch([(values, activities) for _, values, activities in batch])
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        message = f'Database error: {getattr(e, "orig", None) or e}'
+        for ref, values, _ in batch:
+            report.add_error(ref, values.get('external_id'), message)
+        return
+    for key, value in counts.items():
+        report.counts[key] += value
+
+
+def import_records(records, batch_size=DEFAULT_BATCH_SIZE):
+    """Validate and write ``(ref, record)`` pairs; returns an ``ImportReport``.
+
+    A batch is flushed every ``batch_size`` trips, or earlier once it holds
+    ``batch_size * 20`` activities, so transactions stay bounded.
+    """
+    report = ImportReport()
+    batch = []
+    activity_count = 0
+    for ref, record in records:
+        validated = _validate(ref, record, report)
+        if validated is None:
+            continue
+        values, activities = validated
+        batch.append((ref, values, activities))
+        activity_count += len(activities)
+        if len(batch) >= batch_size or activity_count >= batch_size * 20:
+            _flush(batch, report)
+            batch = []
+            activity_count = 0
+    if batch:
+        _flush(batch, report)
+    return report
+
+
+def import_stream(stream, file_format, batch_size=DEFAULT_BATCH_SIZE):
+    """Import a text stream in ``ndjson`` or ``csv`` format."""
+    reader = read_csv if file_format == 'csv' else read_ndjson
+    return import_records(reader(stream), batch_size)
+
+
+@click.command('import-itinerary')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['ndjson', 'csv']),
+              help='File format (defaults to the file extension).')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help='Trips per transaction.')
+@with_appcontext
+def import_itinerary_command(path, file_format, batch_size):
+    """Import trips and activities from an NDJSON or CSV file."""
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    with open(path, encoding='utf-8', newline='') as stream:
+        report = import_stream(stream, file_format, batch_size)
+    click.echo(json.dumps(report.to_dict(), indent=2))
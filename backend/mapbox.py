@@ -0,0 +1,345 @@
+"""Shared HTTP client for the Mapbox geocoding API.
+
+One pooled keep-alive ``requests.Session`` is shared by all requests. Identical
+concurrent searches are coalesced into a single upstream call, and a circuit
+breaker fails fast while Mapbox is unhealthy instead of tying up workers.
+``AsyncMapboxClient`` does the same on an asyncio event loop with httpx, for
+the ASGI entry point (see asgi.py).
+
+``requests`` and ``httpx`` are imported when a client is first built, not
+with this module, so processes that never search for places do not load
+them. Both clients report upstream failures as ``MapboxError``.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from urllib.parse import quote
+
+MAPBOX_GEOCODING_URL = 'https://api.mapbox.com/geocoding/v5/mapbox.places'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def search_key(query, types, limit):
+    return ' '.join(query.lower().split()), types, limit
+
+
+def search_params(token, types, limit):
+    return {'access_token': token, 'autocomplete': 'true', 'types': types, 'limit': limit}
+
+
+def simplify_features(data):
+    features = []
+    for feature in data.get('features', []):
+        center = feature.get('center', [])
+        if len(center) != 2:
+            continue
+        features.append({
+            'id': feature.get('id'),
+            'place_name': feature.get('place_name'),
+            'text': feature.get('text'),
+            'latitude': center[1],
+            'longitude': center[0],
+            'context': feature.get('context', [])
+        })
+    return features
+
+
+class MapboxError(Exception):
+    """Mapbox could not be reached or answered with an error."""
+
+
+class MapboxUnavailable(MapboxError):
+    """Raised without calling Mapbox while the circuit breaker is open."""
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its result."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class CircuitBreaker:
+    """Open after ``threshold`` consecutive failures, retry once after ``reset_timeout`` seconds."""
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return 'closed'
+        if now - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class MapboxClient:
+    def __init__(self, base_url=MAPBOX_GEOCODING_URL, pool_size=20, timeout=10, connect_timeout=3.05,
+                 retries=2, backoff=0.2, breaker_threshold=5, breaker_reset=30, observer=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, timeout)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.flights = SingleFlight()
+        # Called with (seconds, 'ok' | 'error') after each upstream call.
+        self.observer = observer
+
+        # A read timeout is not retried: each attempt could wait the full
+        # timeout, so a hung upstream would hold the worker several times over.
+        retry = Retry(
+            total=retries,
+            read=0,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry, pool_block=False)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def search(self, query, token, types, limit):
+        """Geocode ``query`` and return simplified features.
+
+        Raises ``MapboxError`` on upstream failure and ``MapboxUnavailable``
+        while the circuit breaker is open.
+        """
+        key = search_key(query, types, limit)
+        return self.flights.do(key, lambda: self._fetch(query, token, types, limit))
+
+    def _fetch(self, query, token, types, limit):
+        import requests
+
+        if not self.breaker.allow():
+            raise MapboxUnavailable('Mapbox is temporarily unavailable.')
+        started = time.perf_counter()
+        try:
+            response = self.session.get(
+                f"{self.base_url}/{quote(query)}.json",
+                params=search_params(token, types, limit),
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+        except requests.HTTPError as e:
+            # Client errors (bad token, bad query) say nothing about upstream health.
+            if e.response is not None and e.response.status_code < 500 and e.response.status_code != 429:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            self._observe(started, 'error')
+            raise MapboxError(str(e)) from e
+        except (requests.RequestException, ValueError) as e:
+            self.breaker.record_failure()
+            self._observe(started, 'error')
+            raise MapboxError(str(e)) from e
+        self.breaker.record_success()
+        self._observe(started, 'ok')
+        return simplify_features(data)
+
+    def _observe(self, started, outcome):
+        if self.observer is not None:
+            self.observer(time.perf_counter() - started, outcome)
+
+
+class AsyncMapboxClient:
+    """asyncio counterpart of ``MapboxClient``, built on ``httpx.AsyncClient``.
+
+    A waiting search costs a coroutine rather than a thread. Use it from one
+    event loop; the circuit breaker is the same as the sync client's.
+    """
+
+    def __init__(self, base_url=MAPBOX_GEOCODING_URL, pool_size=20, timeout=10, connect_timeout=3.05,
+                 retries=2, backoff=0.2, breaker_threshold=5, breaker_reset=30, observer=None):
+        try:
+            import httpx
+        except ImportError:  # pragma: no cover - optional dependency
+            raise RuntimeError('AsyncMapboxClient requires the httpx package.')
+        self.base_url = base_url.rstrip('/')
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.observer = observer
+        self._flights = {}
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def search(self, query, token, types, limit):
+        """Geocode ``query`` and return simplified features.
+
+        Raises ``MapboxError`` on upstream failure and ``MapboxUnavailable``
+        while the circuit breaker is open. Identical
+        concurrent searches await one shared task, which keeps running if
+        one of its callers is cancelled.
+        """
+        key = search_key(query, types, limit)
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(query, token, types, limit))
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._finish_flight(key, done))
+        return await asyncio.shield(task)
+
+    def _finish_flight(self, key, task):
+        self._flights.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    async def _get(self, url, params):
+        import httpx
+
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = await self.client.get(url, params=params)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                # Only failures to connect are retried, as in MapboxClient.
+                if last:
+                    raise
+            else:
+                if last or response.status_code not in RETRY_STATUSES:
+                    return response
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    async def _fetch(self, query, token, types, limit):
+        import httpx
+
+        if not self.breaker.allow():
+            raise MapboxUnavailable('Mapbox is temporarily unavailable.')
+        started = time.perf_counter()
+        try:
+            response = await self._get(f"{self.base_url}/{quote(query)}.json", search_params(token, types, limit))
+            response.raise_for_status()
+            data = response.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code < 500 and e.response.status_code != 429:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            self._observe(started, 'error')
+            raise MapboxError(str(e)) from e
+        except (httpx.HTTPError, ValueError) as e:
+            self.breaker.record_failure()
+            self._observe(started, 'error')
+            raise MapboxError(str(e)) from e
+        self.breaker.record_success()
+        self._observe(started, 'ok')
+        return simplify_features(data)
+
+    _observe = MapboxClient._observe
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def mapbox_client_options(app):
+    metrics = app.extensions.get('metrics')
+    return dict(
+        observer=metrics.observe_mapbox if metrics is not None else None,
+        base_url=app.config.get('MAPBOX_GEOCODING_URL') or MAPBOX_GEOCODING_URL,
+        pool_size=app.config.get('MAPBOX_POOL_SIZE', 20),
+        timeout=app.config.get('MAPBOX_TIMEOUT', 10),
+        retries=app.config.get('MAPBOX_RETRIES', 2),
+        backoff=app.config.get('MAPBOX_BACKOFF', 0.2),
+        breaker_threshold=app.config.get('MAPBOX_BREAKER_THRESHOLD', 5),
+        breaker_reset=app.config.get('MAPBOX_BREAKER_RESET', 30),
+    )
+
+
+_init_lock = threading.Lock()
+
+
+def get_mapbox_client(app):
+    client = app.extensions.get('mapbox_client')
+    if client is not None:
+        return client
+    with _init_lock:
+        client = app.extensions.get('mapbox_client')
+        if client is None:
+            client = MapboxClient(**mapbox_client_options(app))
+            app.extensions['mapbox_client'] = client
+    return client
+
+
+def get_mapbox_executor(app):
+    """Thread pool that fans out batch searches (``PLACES_BATCH_WORKERS`` threads)."""
+    executor = app.extensions.get('mapbox_executor')
+    if executor is not None:
+        return executor
+    with _init_lock:
+        executor = app.extensions.get('mapbox_executor')
+        if executor is None:
+            executor = ThreadPoolExecutor(app.config.get('PLACES_BATCH_WORKERS', 16), thread_name_prefix='mapbox')
+            app.extensions['mapbox_executor'] = executor
+    return executor
@@ -0,0 +1,280 @@
+"""Request metrics, ``Server-Timing`` headers, slow-query log and profiling.
+
+``init_metrics`` installs request hooks and SQLAlchemy engine events. Each
+request collects a ``RequestTimings`` (SQL query count and time, serialization
+and Mapbox time) that is sent back as a ``Server-Timing`` header and folded
+into per-endpoint histograms. ``GET /metrics`` renders them in the Prometheus
+text format, together with Mapbox upstream latency and place cache counters.
+
+Metrics live in the process that recorded them: with several workers, scrape
+each one or run a single worker per container.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pragma: no cover - optional dependency
+    Profiler = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _label_value(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_label_value(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        # labels -> [per-bucket counts, sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items())
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", "+Inf")])} {count}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class RequestTimings:
+    """Time spent in named phases of one request, for ``Server-Timing``."""
+
+    def __init__(self):
+        self.durations = {}
+        self.counts = {}
+
+    def add(self, name, seconds, count=1):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    @contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def header(self, total):
+        parts = [f'app;dur={total * 1000:.1f}']
+        for name, seconds in self.durations.items():
+            part = f'{name};dur={seconds * 1000:.1f}'
+            if name == 'db':
+                part += f';desc="{self.counts[name]} queries"'
+            parts.append(part)
+        return ', '.join(parts)
+
+
+def current_timings():
+    """The ``RequestTimings`` of the current request, or ``None`` outside one."""
+    return g.get('request_timings') if has_app_context() else None
+
+
+def request_timer(name):
+    """Context manager adding the time spent in its block to the current request."""
+    timings = current_timings()
+    return timings.timer(name) if timings is not None else nullcontext()
+
+
+class Metrics:
+    def __init__(self):
+        self.requests = Counter(
+            'http_requests_total', 'Requests by method, endpoint and status.', ('method', 'endpoint', 'status'))
+        self.latency = Histogram(
+            'http_request_duration_seconds', 'Request latency by endpoint.', labelnames=('endpoint',))
+        self.db_queries = Histogram(
+            'http_request_db_queries', 'SQL statements executed per request.', QUERY_COUNT_BUCKETS, ('endpoint',))
+        self.db_time = Histogram(
+            'http_request_db_seconds', 'Total SQL time per request.', labelnames=('endpoint',))
+        self.serialize_time = Histogram(
+            'http_request_serialize_seconds', 'JSON encoding time per request.', labelnames=('endpoint',))
+        self.slow_queries = Counter('db_slow_queries_total', 'Statements slower than SLOW_QUERY_MS.')
+        self.mapbox_latency = Histogram(
+            'mapbox_upstream_seconds', 'Mapbox geocoding upstream latency by outcome.', labelnames=('outcome',))
+
+    def observe_request(self, method, endpoint, status, seconds, timings):
+        self.requests.inc(method, endpoint, status)
+        self.latency.observe(seconds, endpoint)
+        self.db_queries.observe(timings.counts.get('db', 0), endpoint)
+        self.db_time.observe(timings.durations.get('db', 0.0), endpoint)
+        if 'serialize' in timings.durations:
+            self.serialize_time.observe(timings.durations['serialize'], endpoint)
+
+    def observe_mapbox(self, seconds, outcome):
+        """Observer passed to the Mapbox clients; ``outcome`` is ``ok`` or ``error``."""
+        self.mapbox_latency.observe(seconds, outcome)
+
+    def render(self, app):
+        lines = []
+        for metric in (self.requests, self.latency, self.db_queries, self.db_time, self.serialize_time,
+                       self.slow_queries, self.mapbox_latency):
+            lines.extend(metric.render())
+
+        # Reported from the cache's own counters, so hits served by the
+        # async handler in asgi.py are included too.
+        place_cache = app.extensions.get('place_cache')
+        if place_cache is not None:
+            stats = place_cache.snapshot()
+            lookups = Counter('place_cache_lookups_total', 'Place search cache lookups by result.', ('result',))
+            for result in ('memory_hits', 'disk_hits', 'prefix_hits', 'misses'):
+                lookups.inc(result, amount=stats[result])
+            lines.extend(lookups.render())
+            total = sum(stats[result] for result in ('memory_hits', 'disk_hits', 'prefix_hits', 'misses'))
+            hits = total - stats['misses']
+            lines.extend([
+                '# HELP place_cache_hit_ratio Share of place searches answered from the cache.',
+                '# TYPE place_cache_hit_ratio gauge',
+                f'place_cache_hit_ratio {hits / total if total else 0.0}',
+            ])
+        return '\n'.join(lines) + '\n'
+
+
+def get_metrics(app):
+    """The app's ``Metrics``, or ``None`` when ``METRICS_ENABLED`` is off."""
+    return app.extensions.get('metrics')
+
+
+def _endpoint():
+    # The URL rule rather than the path keeps label cardinality bounded.
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _start_profiler():
+    """Start a sampling profiler (pyinstrument), or cProfile when it is not installed."""
+    if Profiler is not None:
+        profiler = Profiler(interval=0.001)
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+
+def _save_profile(profiler, directory):
+    """Write the profile of the current request and return the file name."""
+    os.makedirs(directory, exist_ok=True)
+    endpoint = re.sub(r'[^A-Za-z0-9]+', '_', _endpoint()).strip('_') or 'root'
+    stem = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.method}-{endpoint}"
+    if Profiler is not None:
+        profiler.stop()
+        name = stem + '.html'
+        with open(os.path.join(directory, name), 'w') as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.disable()
+        name = stem + '.prof'
+        profiler.dump_stats(os.path.join(directory, name))
+    return name
+
+
+def init_metrics(app, engine):
+    """Install request hooks on ``app`` and query timing on ``engine``."""
+    metrics = Metrics()
+    app.extensions['metrics'] = metrics
+    slow_query_seconds = app.config['SLOW_QUERY_MS'] / 1000
+    server_timing = app.config['METRICS_SERVER_TIMING']
+    profile = app.config['PROFILE_REQUESTS']
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    profile_dir = app.config['PROFILE_DIR']
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['query_started'].pop()
+        timings = current_timings()
+        if timings is not None:
+            timings.add('db', seconds)
+        if slow_query_seconds and seconds >= slow_query_seconds:
+            metrics.slow_queries.inc()
+            app.logger.warning('Slow query (%.1f ms): %s', seconds * 1000, statement)
+
+    @app.before_request
+    def _start_request():
+        g.request_timings = RequestTimings()
+        g.request_started = time.perf_counter()
+        if profile and (request.headers.get('X-Profile') or random.random() < sample_rate):
+            g.profiler = _start_profiler()
+
+    @app.after_request
+    def _finish_request(response):
+        timings = g.get('request_timings')
+        if timings is None:
+            return response
+        seconds = time.perf_counter() - g.request_started
+        metrics.observe_request(request.method, _endpoint(), response.status_code, seconds, timings)
+        if server_timing:
+            response.headers['Server-Timing'] = timings.header(seconds)
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            name = _save_profile(profiler, profile_dir)
+            app.logger.info('Saved request profile to %s', name)
+            response.headers['X-Profile-Report'] = name
+        return response
+
+    return metrics
@@ -0,0 +1,48 @@
+"""add optional coordinates to activities
+
+Revision ID: add_activity_coordinates
+Revises: add_search_index
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import create_search_triggers
+
+# revision identifiers, used by Alembic.
+revision = 'add_activity_coordinates'
+down_revision = 'add_search_index'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    ('location_place_name', sa.String(length=255)),
+    ('location_lat', sa.Float()),
+    ('location_lng', sa.Float()),
+    ('location_mapbox_id', sa.String(length=100)),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col['name'] for col in inspector.get_columns('activity')}
+
+    with op.batch_alter_table('activity', schema=None) as batch_op:
+        for name, column_type in COLUMNS:
+            if name not in columns:
+                batch_op.add_column(sa.Column(name, column_type, nullable=True))
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col['name'] for col in inspector.get_columns('activity')}
+
+    with op.batch_alter_table('activity', schema=None) as batch_op:
+        for name, _ in reversed(COLUMNS):
+            if name in columns:
+                batch_op.drop_column(name)
+    # Dropping columns rebuilds the table on SQLite, which drops its triggers.
+    if bind.dialect.name == 'sqlite':
+        create_search_triggers(bind, 'activity')
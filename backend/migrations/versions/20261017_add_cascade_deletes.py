@@ -0,0 +1,53 @@
+"""cascade trip deletes to activities and participants in the database
+
+Revision ID: add_cascade_deletes
+Revises: add_activity_coordinates
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import INDEXED_COLUMNS, create_search_triggers
+
+# revision identifiers, used by Alembic.
+revision = 'add_cascade_deletes'
+down_revision = 'add_activity_coordinates'
+branch_labels = None
+depends_on = None
+
+CHILD_TABLES = ('activity', 'trip_participant')
+# Names the unnamed foreign keys SQLite reflects, so batch mode can drop them.
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _set_trip_foreign_key(bind, table, ondelete):
+    """Recreate ``table.trip_id -> trip.id`` with ``ondelete``; skips it if already so."""
+    foreign_keys = [fk for fk in sa.inspect(bind).get_foreign_keys(table) if fk['referred_table'] == 'trip']
+    if foreign_keys and all(
+        ((fk.get('options') or {}).get('ondelete') or '').upper() == (ondelete or '') for fk in foreign_keys
+    ):
+        return
+
+    name = f'fk_{table}_trip_id_trip'
+    with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        for fk in foreign_keys:
+            batch_op.drop_constraint(fk['name'] or name, type_='foreignkey')
+        batch_op.create_foreign_key(name, 'trip', ['trip_id'], ['id'], ondelete=ondelete)
+    # Rebuilding a table on SQLite drops its triggers, including the search index ones.
+    if bind.dialect.name == 'sqlite' and table in INDEXED_COLUMNS:
+        create_search_triggers(bind, table)
+
+
+def upgrade():
+    bind = op.get_bind()
+    for table in CHILD_TABLES:
+        # Rows left behind by deletes that bypassed the ORM would violate the
+        # constraint once SQLite enforces it.
+        op.execute(f'DELETE FROM {table} WHERE trip_id NOT IN (SELECT id FROM trip)')
+        _set_trip_foreign_key(bind, table, 'CASCADE')
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table in CHILD_TABLES:
+        _set_trip_foreign_key(bind, table, None)
@@ -0,0 +1,51 @@
+"""add external ids for bulk import upserts
+
+Revision ID: add_external_ids
+Revises: add_trip_updated_at
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_external_ids'
+down_revision = 'add_trip_updated_at'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    trip_columns = {col['name'] for col in inspector.get_columns('trip')}
+    activity_columns = {col['name'] for col in inspector.get_columns('activity')}
+
+    if 'external_id' not in trip_columns:
+        with op.batch_alter_table('trip', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('external_id', sa.String(length=100), nullable=True))
+    if 'external_id' not in activity_columns:
+        with op.batch_alter_table('activity', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('external_id', sa.String(length=100), nullable=True))
+
+    inspector = sa.inspect(bind)
+    if 'ix_trip_external_id' not in {index['name'] for index in inspector.get_indexes('trip')}:
+        op.create_index('ix_trip_external_id', 'trip', ['external_id'], unique=True)
+    if 'uq_activity_trip_id_external_id' not in {index['name'] for index in inspector.get_indexes('activity')}:
+        op.create_index('uq_activity_trip_id_external_id', 'activity', ['trip_id', 'external_id'], unique=True)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'uq_activity_trip_id_external_id' in {index['name'] for index in inspector.get_indexes('activity')}:
+        op.drop_index('uq_activity_trip_id_external_id', table_name='activity')
+    if 'ix_trip_external_id' in {index['name'] for index in inspector.get_indexes('trip')}:
+        op.drop_index('ix_trip_external_id', table_name='trip')
+
+    if 'external_id' in {col['name'] for col in inspector.get_columns('activity')}:
+        with op.batch_alter_table('activity', schema=None) as batch_op:
+            batch_op.drop_column('external_id')
+    if 'external_id' in {col['name'] for col in inspector.get_columns('trip')}:
+        with op.batch_alter_table('trip', schema=None) as batch_op:
+            batch_op.drop_column('external_id')
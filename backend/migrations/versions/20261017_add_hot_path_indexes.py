@@ -0,0 +1,46 @@
+"""add indexes for the hot query paths
+
+Revision ID: add_hot_path_indexes
+Revises: add_trip_participants
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_path_indexes'
+down_revision = 'add_trip_participants'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns). ix_activity_trip_id_date also serves plain
+# activity.trip_id lookups, including the delete cascade from trip.
+INDEXES = (
+    ('ix_activity_trip_id_date', 'activity', ['trip_id', 'date']),
+    ('ix_activity_status', 'activity', ['status']),
+    ('ix_trip_created_at_id', 'trip', ['created_at', 'id']),
+    ('ix_trip_start_date_end_date', 'trip', ['start_date', 'end_date']),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for name, table, columns in INDEXES:
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # ix_trip_created_at_id belongs to add_trip_listing_index and is left in place.
+    for name, table, _ in INDEXES:
+        if name == 'ix_trip_created_at_id':
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if name in existing:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,68 @@
+"""never reuse trip and activity ids (SQLite AUTOINCREMENT)
+
+Without AUTOINCREMENT, SQLite hands the id of a deleted highest row to the
+next insert, so a new trip could match a deleted trip's ETag, cached payload
+and change log.
+
+Revision ID: add_id_autoincrement
+Revises: add_cascade_deletes
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+from search import INDEXED_COLUMNS, create_search_triggers
+
+# revision identifiers, used by Alembic.
+revision = 'add_id_autoincrement'
+down_revision = 'add_cascade_deletes'
+branch_labels = None
+depends_on = None
+
+# Highest id each table has ever handed out, as far as the database still
+# knows: the rows themselves and the ids recorded in the change log.
+HIGHEST_USED_ID = {
+    'trip': 'SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM trip UNION ALL SELECT MAX(trip_id) FROM trip_change)',
+    'activity': "SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM activity"
+                " UNION ALL SELECT MAX(entity_id) FROM trip_change WHERE entity = 'activity')",
+}
+
+
+def _has_autoincrement(bind, table):
+    sql = bind.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).scalar()
+    return 'AUTOINCREMENT' in (sql or '').upper()
+
+
+def _recreate(bind, table, autoincrement):
+    with op.batch_alter_table(table, recreate='always', table_kwargs={'sqlite_autoincrement': autoincrement}):
+        pass
+    # Rebuilding a table on SQLite drops its triggers, including the search index ones.
+    if table in INDEXED_COLUMNS:
+        create_search_triggers(bind, table)
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Other databases never reuse ids handed out by a sequence or identity column.
+    if bind.dialect.name != 'sqlite':
+        return
+    for table, highest_sql in HIGHEST_USED_ID.items():
+        if not _has_autoincrement(bind, table):
+            _recreate(bind, table, True)
+        highest = bind.exec_driver_sql(highest_sql).scalar() or 0
+        # Also skip ids of rows deleted before this revision that the log still mentions.
+        current = bind.exec_driver_sql('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).scalar()
+        if current is None:
+            bind.exec_driver_sql('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (table, highest))
+        elif current < highest:
+            bind.exec_driver_sql('UPDATE sqlite_sequence SET seq = ? WHERE name = ?', (highest, table))
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    for table in HIGHEST_USED_ID:
+        if _has_autoincrement(bind, table):
+            _recreate(bind, table, False)
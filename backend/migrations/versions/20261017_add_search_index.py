@@ -0,0 +1,30 @@
+"""add FTS5 full-text index over trips and activities
+
+Revision ID: add_search_index
+Revises: add_trip_change_log
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+from search import create_search_index, drop_search_index
+
+# revision identifiers, used by Alembic.
+revision = 'add_search_index'
+down_revision = 'add_trip_change_log'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create the FTS tables and sync triggers, then index the existing rows."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    create_search_index(bind, rebuild=True)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    drop_search_index(bind)
@@ -0,0 +1,47 @@
+"""add trip_change log for incremental sync
+
+Revision ID: add_trip_change_log
+Revises: add_external_ids
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_trip_change_log'
+down_revision = 'add_external_ids'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'trip_change' not in inspector.get_table_names():
+        op.create_table(
+            'trip_change',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('trip_id', sa.Integer(), nullable=False),
+            sa.Column('seq', sa.Integer(), nullable=False),
+            sa.Column('entity', sa.String(length=20), nullable=False),
+            sa.Column('entity_id', sa.Integer(), nullable=True),
+            sa.Column('op', sa.String(length=10), nullable=False),
+            sa.Column('data', sa.JSON(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+
+    indexes = {index['name'] for index in sa.inspect(bind).get_indexes('trip_change')}
+    if 'ix_trip_change_trip_id_seq' not in indexes:
+        op.create_index('ix_trip_change_trip_id_seq', 'trip_change', ['trip_id', 'seq'])
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if 'trip_change' in inspector.get_table_names():
+        indexes = {index['name'] for index in inspector.get_indexes('trip_change')}
+        if 'ix_trip_change_trip_id_seq' in indexes:
+            op.drop_index('ix_trip_change_trip_id_seq', table_name='trip_change')
+        op.drop_table('trip_change')
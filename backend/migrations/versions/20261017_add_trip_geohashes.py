@@ -0,0 +1,71 @@
+"""add geohash columns for spatial trip queries
+
+Revision ID: add_trip_geohashes
+Revises: add_hot_path_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from geo import geohash_encode
+
+# revision identifiers, used by Alembic.
+revision = 'add_trip_geohashes'
+down_revision = 'add_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add indexed origin/destination geohashes and backfill them from the coordinates."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col['name'] for col in inspector.get_columns('trip')}
+
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        if 'origin_geohash' not in columns:
+            batch_op.add_column(sa.Column('origin_geohash', sa.String(length=12), nullable=True))
+        if 'destination_geohash' not in columns:
+            batch_op.add_column(sa.Column('destination_geohash', sa.String(length=12), nullable=True))
+
+    indexes = {index['name'] for index in sa.inspect(bind).get_indexes('trip')}
+    if 'ix_trip_origin_geohash' not in indexes:
+        op.create_index('ix_trip_origin_geohash', 'trip', ['origin_geohash'])
+    if 'ix_trip_destination_geohash' not in indexes:
+        op.create_index('ix_trip_destination_geohash', 'trip', ['destination_geohash'])
+
+    rows = bind.execute(sa.text(
+        'SELECT id, origin_lat, origin_lng, destination_lat, destination_lng FROM trip'
+    )).all()
+    updates = [
+        {
+            'id': row.id,
+            'origin_geohash': geohash_encode(row.origin_lat, row.origin_lng),
+            'destination_geohash': geohash_encode(row.destination_lat, row.destination_lng),
+        }
+        for row in rows
+    ]
+    if updates:
+        bind.execute(
+            sa.text('UPDATE trip SET origin_geohash = :origin_geohash, '
+                    'destination_geohash = :destination_geohash WHERE id = :id'),
+            updates,
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    indexes = {index['name'] for index in inspector.get_indexes('trip')}
+    columns = {col['name'] for col in inspector.get_columns('trip')}
+
+    if 'ix_trip_destination_geohash' in indexes:
+        op.drop_index('ix_trip_destination_geohash', table_name='trip')
+    if 'ix_trip_origin_geohash' in indexes:
+        op.drop_index('ix_trip_origin_geohash', table_name='trip')
+
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        if 'destination_geohash' in columns:
+            batch_op.drop_column('destination_geohash')
+        if 'origin_geohash' in columns:
+            batch_op.drop_column('origin_geohash')
@@ -0,0 +1,33 @@
+"""add keyset index for trip listing
+
+Revision ID: add_trip_listing_index
+Revises: add_origin_roundtrip
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_trip_listing_index'
+down_revision = 'add_origin_roundtrip'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Back ``GET /api/trips`` keyset pagination on ``(created_at, id)``."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    indexes = {index['name'] for index in inspector.get_indexes('trip')}
+
+    if 'ix_trip_created_at_id' not in indexes:
+        op.create_index('ix_trip_created_at_id', 'trip', ['created_at', 'id'])
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    indexes = {index['name'] for index in inspector.get_indexes('trip')}
+
+    if 'ix_trip_created_at_id' in indexes:
+        op.drop_index('ix_trip_created_at_id', table_name='trip')
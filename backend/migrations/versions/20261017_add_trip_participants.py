@@ -0,0 +1,90 @@
+"""move trip people into a trip_participant table
+
+Revision ID: add_trip_participants
+Revises: add_trip_version
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+# revision identifiers, used by Alembic.
+revision = 'add_trip_participants'
+down_revision = 'add_trip_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create trip_participant and backfill it from the JSON ``trip.people`` text.
+
+    Malformed JSON is kept as a single participant name rather than dropped.
+    The ``people`` column is removed once its data has been copied.
+    """
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = inspector.get_table_names()
+
+    if 'trip_participant' not in existing_tables:
+        op.create_table(
+            'trip_participant',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('trip_id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('position', sa.Integer(), nullable=False, server_default='0'),
+            sa.ForeignKeyConstraint(['trip_id'], ['trip.id'], ),
+        )
+        op.create_index('ix_trip_participant_trip_id', 'trip_participant', ['trip_id'])
+        op.create_index('ix_trip_participant_name', 'trip_participant', ['name'])
+
+    columns = {col['name'] for col in inspector.get_columns('trip')}
+    if 'people' not in columns:
+        return
+
+    participant = sa.table(
+        'trip_participant',
+        sa.column('trip_id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('position', sa.Integer),
+    )
+    rows = []
+    for trip_id, people in bind.execute(sa.text('SELECT id, people FROM trip WHERE people IS NOT NULL')):
+        try:
+            names = json.loads(people)
+        except ValueError:
+            names = [people]
+        if not isinstance(names, list):
+            names = [names]
+        names = [str(name).strip() for name in names if name is not None and str(name).strip()]
+        rows.extend({'trip_id': trip_id, 'name': name[:100], 'position': i} for i, name in enumerate(names))
+        if len(rows) >= 1000:
+            op.bulk_insert(participant, rows)
+            rows = []
+    if rows:
+        op.bulk_insert(participant, rows)
+
+    with op.batch_alter_table('trip', schema=None) as batch_op:
+        batch_op.drop_column('people')
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col['name'] for col in inspector.get_columns('trip')}
+
+    if 'people' not in columns:
+        with op.batch_alter_table('trip', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('people', sa.Text(), nullable=True))
+
+    if 'trip_participant' not in inspector.get_table_names():
+        return
+
+    people = {}
+    for trip_id, name in bind.execute(sa.text('SELECT trip_id, name FROM trip_participant ORDER BY trip_id, position')):
+        people.setdefault(trip_id, []).append(name)
+    for trip_id, names in people.items():
+        bind.execute(sa.text('UPDATE trip SET people = :people WHERE id = :id'), {'people': json.dumps(names), 'id': trip_id})
+
+    op.drop_index('ix_trip_participant_name', table_name='trip_participant')
+    op.drop_index('ix_trip_participant_trip_id', table_name='trip_participant')
+    op.drop_table('trip_participant')
@@ -0,0 +1,43 @@
+"""add trip updated_at for incremental exports
+
+Revision ID: add_trip_updated_at
+Revises: add_trip_geohashes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_trip_updated_at'
+down_revision = 'add_trip_geohashes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col['name'] for col in inspector.get_columns('trip')}
+
+    if 'updated_at' not in columns:
+        with op.batch_alter_table('trip', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        # Existing trips have not changed since they were created, as far as we know.
+        bind.execute(sa.text('UPDATE trip SET updated_at = created_at WHERE updated_at IS NULL'))
+
+    indexes = {index['name'] for index in sa.inspect(bind).get_indexes('trip')}
+    if 'ix_trip_updated_at' not in indexes:
+        op.create_index('ix_trip_updated_at', 'trip', ['updated_at'])
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    indexes = {index['name'] for index in inspector.get_indexes('trip')}
+    columns = {col['name'] for col in inspector.get_columns('trip')}
+
+    if 'ix_trip_updated_at' in indexes:
+        op.drop_index('ix_trip_updated_at', table_name='trip')
+    if 'updated_at' in columns:
+        with op.batch_alter_table('trip', schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
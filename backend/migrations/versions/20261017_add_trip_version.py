@@ -0,0 +1,34 @@
+"""add trip version counter
+
+Revision ID: add_trip_version
+Revises: add_trip_listing_index
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_trip_version'
+down_revision = 'add_trip_listing_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col['name'] for col in inspector.get_columns('trip')}
+
+    if 'version' not in columns:
+        with op.batch_alter_table('trip', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col['name'] for col in inspector.get_columns('trip')}
+
+    if 'version' in columns:
+        with op.batch_alter_table('trip', schema=None) as batch_op:
+            batch_op.drop_column('version')
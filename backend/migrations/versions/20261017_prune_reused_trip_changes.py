@@ -0,0 +1,34 @@
+"""drop change log rows of deleted trips whose id was reused
+
+Before add_id_autoincrement, a new trip could get the id of a deleted one
+and its changes were read together with the deleted trip's log. Every row up
+to the last ``trip`` ``delete`` of an id that was used again afterwards
+belongs to the deleted trip and is removed. An id was used again when the
+trip exists now or the log continues after the delete.
+
+Revision ID: prune_reused_trip_changes
+Revises: add_id_autoincrement
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'prune_reused_trip_changes'
+down_revision = 'add_id_autoincrement'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "DELETE FROM trip_change WHERE id <= ("
+        " SELECT MAX(ended.id) FROM trip_change AS ended"
+        " WHERE ended.trip_id = trip_change.trip_id AND ended.entity = 'trip' AND ended.op = 'delete'"
+        " AND (EXISTS (SELECT 1 FROM trip WHERE trip.id = ended.trip_id)"
+        " OR EXISTS (SELECT 1 FROM trip_change AS later WHERE later.trip_id = ended.trip_id AND later.id > ended.id)))"
+    )
+
+
+def downgrade():
+    # The removed rows described trips that no longer exist; nothing to restore.
+    pass
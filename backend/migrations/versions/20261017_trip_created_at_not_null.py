@@ -0,0 +1,46 @@
+"""make trip.created_at NOT NULL
+
+The trip listing is keyset-paginated on ``(created_at, id)``, and a row with
+a NULL ``created_at`` never satisfies the cursor comparison, so it silently
+dropped out of every page after the first. Such rows (written outside the
+ORM) take the oldest existing ``created_at``, which keeps them at the end of
+the listing, where SQLite sorted them before.
+
+Revision ID: trip_created_at_not_null
+Revises: prune_reused_trip_changes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import create_search_triggers
+
+# revision identifiers, used by Alembic.
+revision = 'trip_created_at_not_null'
+down_revision = 'prune_reused_trip_changes'
+branch_labels = None
+depends_on = None
+
+
+def _alter(nullable):
+    bind = op.get_bind()
+    with op.batch_alter_table('trip', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=nullable)
+    # Rebuilding a table on SQLite drops its triggers, including the search index ones.
+    if bind.dialect.name == 'sqlite':
+        create_search_triggers(bind, 'trip')
+
+
+def upgrade():
+    # Written in SQLAlchemy's SQLite format (microseconds included): the keyset
+    # comparison is a string comparison, so every value must share the format.
+    op.execute(
+        "UPDATE trip SET created_at = strftime('%Y-%m-%d %H:%M:%f',"
+        " COALESCE((SELECT MIN(created_at) FROM trip), updated_at, CURRENT_TIMESTAMP)) || '000'"
+        " WHERE created_at IS NULL"
+    )
+    _alter(nullable=False)
+
+
+def downgrade():
+    _alter(nullable=True)
@@ -1,68 +1,233 @@
-from app import db
+from extensions import db
+from geo import geohash_encode
+from search import create_search_index, drop_search_index
+from serialization import serializer_plan
+from sqlalchemy import event, insert, update
 from datetime import datetime
-import json
 
 class Trip(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
+    # Caller-supplied identifier used by the bulk importer to upsert trips.
+    external_id = db.Column(db.String(100), unique=True, index=True)
     origin = db.Column(db.String(200))
     origin_place_name = db.Column(db.String(255))
     origin_lat = db.Column(db.Float)
     origin_lng = db.Column(db.Float)
     origin_mapbox_id = db.Column(db.String(100))
+    origin_geohash = db.Column(db.String(12), index=True)
     destination = db.Column(db.String(200))
     destination_place_name = db.Column(db.String(255))
     destination_lat = db.Column(db.Float)
     destination_lng = db.Column(db.Float)
     destination_mapbox_id = db.Column(db.String(100))
+    destination_geohash = db.Column(db.String(12), index=True)
     is_round_trip = db.Column(db.Boolean, nullable=False, default=False)
     start_date = db.Column(db.Date)
     end_date = db.Column(db.Date)
     summary = db.Column(db.Text)
-    people = db.Column(db.Text) # Storing as JSON string for MVP
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    activities = db.relationship('Activity', backref='trip', lazy=True, cascade="all, delete-orphan")
+    # NOT NULL: the listing is keyset-paginated on (created_at, id).
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Also refreshed by bump_version, so activity changes move it too.
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Bumped whenever the trip or one of its activities changes; used as the ETag.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # The foreign keys cascade in the database, so deleting a trip does not
+    # load its children first (passive_deletes).
+    activities = db.relationship('Activity', backref='trip', lazy=True, cascade="all, delete-orphan",
+                                 passive_deletes=True)
+    participants = db.relationship('TripParticipant', backref='trip', lazy='selectin',
+                                   order_by='TripParticipant.position', cascade="all, delete-orphan",
+                                   passive_deletes=True)
+
+    __table_args__ = (
+        db.Index('ix_trip_created_at_id', 'created_at', 'id'),
+        db.Index('ix_trip_start_date_end_date', 'start_date', 'end_date'),
+        # Ids are never reused, so ``{id}-{version}`` ETags, payload cache keys and
+        # the change log cannot mistake a new trip for a deleted one.
+        {'sqlite_autoincrement': True},
+    )
+
+    # Columns that may be requested through the ``fields=`` projection on the
+    # trip listing. Order matches ``to_dict``.
+    FIELDS = (
+        'id', 'name',
+        'origin', 'origin_place_name', 'origin_lat', 'origin_lng', 'origin_mapbox_id',
+        'destination', 'destination_place_name', 'destination_lat', 'destination_lng', 'destination_mapbox_id',
+        'is_round_trip', 'start_date', 'end_date', 'summary', 'people', 'created_at', 'updated_at',
+        'external_id',
+    )
+    # ``people`` lives in the trip_participant table; everything else is a column.
+    COLUMN_FIELDS = tuple(field for field in FIELDS if field != 'people')
+    # Serialized with ``isoformat()``.
+    ISO_FIELDS = frozenset({'start_date', 'end_date', 'created_at', 'updated_at'})
+
+    @property
+    def people(self):
+        return [participant.name for participant in self.participants]
+
+    @people.setter
+    def people(self, names):
+        self.participants = [TripParticipant(name=name, position=i) for i, name in enumerate(names)]
+
+    @classmethod
+    def bump_version(cls, trip_id):
+        """Increment the trip's version and return the new value.
+
+        The version doubles as the sequence number of the trip's change log.
+        """
+        return db.session.execute(
+            update(cls).where(cls.id == trip_id)
+            .values(version=cls.version + 1, updated_at=datetime.utcnow())
+            .returning(cls.version)
+        ).scalar_one()
+
+    @classmethod
+    def serializer(cls, fields=FIELDS):
+        """Cached ``SerializerPlan`` for ``fields`` (a tuple)."""
+        return serializer_plan(cls, fields)
+
+    @classmethod
+    def row_to_dict(cls, row, fields):
+        """Serialize a row of selected columns (in ``fields`` order)."""
+        return cls.serializer(tuple(fields)).row(row)
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'origin': self.origin,
-            'origin_place_name': self.origin_place_name,
-            'origin_lat': self.origin_lat,
-            'origin_lng': self.origin_lng,
-            'origin_mapbox_id': self.origin_mapbox_id,
-            'destination': self.destination,
-            'destination_place_name': self.destination_place_name,
-            'destination_lat': self.destination_lat,
-            'destination_lng': self.destination_lng,
-            'destination_mapbox_id': self.destination_mapbox_id,
-            'is_round_trip': self.is_round_trip,
-            'start_date': self.start_date.isoformat() if self.start_date else None,
-            'end_date': self.end_date.isoformat() if self.end_date else None,
-            'summary': self.summary,
-            'people': json.loads(self.people) if self.people else [],
-            'created_at': self.created_at.isoformat()
-        }
+        return self.serializer().obj(self)
+
+@event.listens_for(Trip, 'before_insert')
+@event.listens_for(Trip, 'before_update')
+def _sync_trip_geohashes(mapper, connection, trip):
+    trip.origin_geohash = geohash_encode(trip.origin_lat, trip.origin_lng)
+    trip.destination_geohash = geohash_encode(trip.destination_lat, trip.destination_lng)
+
+class TripParticipant(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    trip_id = db.Column(db.Integer, db.ForeignKey('trip.id', ondelete='CASCADE'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
 
 class Activity(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    trip_id = db.Column(db.Integer, db.ForeignKey('trip.id'), nullable=False)
+    trip_id = db.Column(db.Integer, db.ForeignKey('trip.id', ondelete='CASCADE'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     type = db.Column(db.String(50))
     date = db.Column(db.DateTime)
     location = db.Column(db.String(200))
+    location_place_name = db.Column(db.String(255))
+    location_lat = db.Column(db.Float)
+    location_lng = db.Column(db.Float)
+    location_mapbox_id = db.Column(db.String(100))
     notes = db.Column(db.Text)
-    status = db.Column(db.String(20), default='planned')
+    status = db.Column(db.String(20), default='planned', index=True)
+    external_id = db.Column(db.String(100))
+
+    __table_args__ = (
+        db.Index('ix_activity_trip_id_date', 'trip_id', 'date'),
+        db.Index('uq_activity_trip_id_external_id', 'trip_id', 'external_id', unique=True),
+        {'sqlite_autoincrement': True},
+    )
+
+    FIELDS = (
+        'id', 'trip_id', 'name', 'type', 'date',
+        'location', 'location_place_name', 'location_lat', 'location_lng', 'location_mapbox_id',
+        'notes', 'status', 'external_id',
+    )
+
+    ISO_FIELDS = frozenset({'date'})
+
+    @classmethod
+    def serializer(cls, fields=FIELDS):
+        """Cached ``SerializerPlan`` for ``fields`` (a tuple)."""
+        return serializer_plan(cls, fields)
+
+    @classmethod
+    def row_to_dict(cls, row, fields=FIELDS):
+        """Serialize a row of selected columns (in ``fields`` order)."""
+        return cls.serializer(tuple(fields)).row(row)
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'trip_id': self.trip_id,
-            'name': self.name,
-            'type': self.type,
-            'date': self.date.isoformat() if self.date else None,
-            'location': self.location,
-            'notes': self.notes,
-            'status': self.status
-        }
+        return self.serializer().obj(self)
+
+class TripChange(db.Model):
+    """Append-only log of trip mutations, read by ``GET /api/trips/<id>/changes``.
+
+    ``seq`` is the trip version the mutation produced. One mutation may log
+    several rows with the same ``seq`` (e.g. a bulk activity insert). There is
+    no foreign key to ``trip`` so the log outlives a deleted trip; trip ids are
+    never reused, so a new trip never inherits an old trip's log.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    trip_id = db.Column(db.Integer, nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer)
+    op = db.Column(db.String(10), nullable=False)
+    # Full payload for creates, changed fields for updates, null for deletes.
+    data = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_trip_change_trip_id_seq', 'trip_id', 'seq'),
+    )
+
+    FIELDS = ('seq', 'entity', 'entity_id', 'op', 'data', 'created_at')
+    ISO_FIELDS = frozenset({'created_at'})
+
+    @classmethod
+    def record(cls, trip_id, seq, entity, entity_id, op, data=None):
+        """Add a change to the session; the caller commits it with the mutation.
+
+        The serialized change is also queued on the session and published to
+        live subscribers once the transaction commits (see events.py).
+        """
+        change = cls(trip_id=trip_id, seq=seq, entity=entity, entity_id=entity_id, op=op, data=data,
+                     created_at=datetime.utcnow())
+        db.session.add(change)
+        db.session.info.setdefault('trip_changes', []).append(dict(change.to_dict(), trip_id=trip_id))
+        return change
+
+    @classmethod
+    def record_many(cls, trip_id, seq, entity, entity_ids, op, data=None):
+        """Log the same change for many entities with one executemany insert.
+
+        Used by the set-based bulk endpoints; queued for live subscribers like
+        ``record``.
+        """
+        if not entity_ids:
+            return
+        created_at = datetime.utcnow()
+        db.session.execute(insert(cls), [
+            {'trip_id': trip_id, 'seq': seq, 'entity': entity, 'entity_id': entity_id, 'op': op, 'data': data,
+             'created_at': created_at}
+            for entity_id in entity_ids
+        ])
+        serialize = cls.serializer().row
+        db.session.info.setdefault('trip_changes', []).extend(
+            dict(serialize((seq, entity, entity_id, op, data, created_at)), trip_id=trip_id)
+            for entity_id in entity_ids
+        )
+
+    @staticmethod
+    def diff(before, after):
+        """Fields of ``after`` whose value differs from ``before``."""
+        return {field: value for field, value in after.items() if before.get(field) != value}
+
+    @classmethod
+    def serializer(cls, fields=FIELDS):
+        """Cached ``SerializerPlan`` for ``fields`` (a tuple)."""
+        return serializer_plan(cls, fields)
+
+    def to_dict(self):
+        return self.serializer().obj(self)
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index(metadata, connection, **kw):
+    # The migrations create it for migrated databases (see search.py).
+    if connection.dialect.name == 'sqlite':
+        create_search_index(connection)
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_index(metadata, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        drop_search_index(connection)
@@ -0,0 +1,62 @@
+"""Memory-bounded cache of serialized response bodies.
+
+Entries are keyed by ``(trip_id, version)``, or a longer tuple starting with
+it for payloads derived from the trip (such as a day's route), so a stale
+entry can never be served once the trip's version has moved on. Writers also
+drop a trip's entries eagerly so memory is reclaimed immediately.
+"""
+from collections import OrderedDict
+import threading
+
+
+class PayloadCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate(self, trip_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == trip_id]:
+                self.size -= len(self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+_init_lock = threading.Lock()
+
+
+def get_trip_cache(app):
+    cache = app.extensions.get('trip_cache')
+    if cache is not None:
+        return cache
+    with _init_lock:
+        cache = app.extensions.get('trip_cache')
+        if cache is None:
+            cache = PayloadCache(app.config.get('TRIP_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+            app.extensions['trip_cache'] = cache
+    return cache
@@ -0,0 +1,216 @@
+"""Two-tier cache for Mapbox place search results.
+
+Results are kept in an in-process LRU in front of a small SQLite database so
+they survive restarts and are shared between worker processes. Both tiers
+expire entries after a TTL and are bounded in size.
+
+Lookups never write to SQLite: the access times used for eviction are kept in
+memory and written with the next store. A store that fails (for instance when
+another process holds the write lock for longer than the busy timeout) is
+logged and the result is still served from memory.
+"""
+from collections import OrderedDict
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())
+
+
+def cache_key(query, types, limit):
+    return f"{types}|{limit}|{query}"
+
+
+class PlaceCache:
+    def __init__(self, path, ttl=86400, memory_size=1024, max_entries=100000):
+        self.path = path
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        # Disk hits since the last store, key -> time; see _flush_accessed.
+        self._accessed = {}
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'prefix_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'store_errors': 0,
+        }
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS place_cache ('
+                ' key TEXT PRIMARY KEY,'
+                ' params TEXT NOT NULL,'
+                ' query TEXT NOT NULL,'
+                ' features TEXT NOT NULL,'
+                ' expires_at REAL NOT NULL,'
+                ' accessed_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS ix_place_cache_prefix ON place_cache (params, query)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS ix_place_cache_accessed ON place_cache (accessed_at)')
+
+    def get(self, query, types, limit):
+        """Return cached features for a search, or ``None`` on a miss."""
+        query = normalize_query(query)
+        key = cache_key(query, types, limit)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                features, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return features
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    'SELECT features, expires_at FROM place_cache WHERE key = ? AND expires_at > ?',
+                    (key, now),
+                ).fetchone()
+                if row is not None:
+                    self._accessed[key] = now
+                    features = json.loads(row[0])
+                    self._remember(key, features, row[1])
+                    self.stats['disk_hits'] += 1
+                    return features
+
+            found = self._from_longer_prefix(query, types, limit, now)
+            if found is not None:
+                features, expires_at = found
+                # Derived from the longer query's entry, so it expires with it.
+                self._remember(key, features, expires_at)
+                self.stats['prefix_hits'] += 1
+                return features
+
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, query, types, limit, features):
+        query = normalize_query(query)
+        key = cache_key(query, types, limit)
+        now = time.time()
+        expires_at = now + self.ttl
+
+        with self._lock:
+            self._remember(key, features, expires_at)
+            self.stats['stores'] += 1
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO place_cache (key, params, query, features, expires_at, accessed_at)'
+                    ' VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, f"{types}|{limit}", query, json.dumps(features), expires_at, now),
+                )
+                self._flush_accessed()
+                self._writes_since_evict += 1
+                if self._writes_since_evict >= 100:
+                    self._evict(now)
+            except sqlite3.Error:
+                self.stats['store_errors'] += 1
+                logger.warning('Could not store place search %r in %s', key, self.path, exc_info=True)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+            return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._accessed.clear()
+            if self._conn is not None:
+                self._conn.execute('DELETE FROM place_cache')
+
+    def _remember(self, key, features, expires_at):
+        self._memory[key] = (features, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _flush_accessed(self):
+        """Write the access times of disk hits since the last store."""
+        if self._accessed:
+            self._conn.executemany(
+                'UPDATE place_cache SET accessed_at = ? WHERE key = ?',
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def _from_longer_prefix(self, query, types, limit, now):
+        """Answer a search from a cached search for a longer query.
+
+        While a user types "Paris", a result for "paris" can answer "par" when
+        at least ``limit`` of its places still start with "par". Returns
+        ``(features, expires_at)`` of the longer entry, or ``None``.
+        """
+        if self._conn is None or not query:
+            return None
+        rows = self._conn.execute(
+            'SELECT features, expires_at FROM place_cache'
+            ' WHERE params = ? AND query > ? AND query < ? AND expires_at > ?'
+            ' ORDER BY query LIMIT 20',
+            (f"{types}|{limit}", query, query + '\uffff', now),
+        ).fetchall()
+        for payload, expires_at in rows:
+            matches = [
+                feature for feature in json.loads(payload)
+                if (feature.get('text') or '').lower().startswith(query)
+                or (feature.get('place_name') or '').lower().startswith(query)
+            ]
+            if len(matches) >= limit:
+                return matches[:limit], expires_at
+        return None
+
+    def _evict(self, now):
+        self._writes_since_evict = 0
+        cursor = self._conn.execute('DELETE FROM place_cache WHERE expires_at <= ?', (now,))
+        self.stats['evictions'] += max(cursor.rowcount, 0)
+        (count,) = self._conn.execute('SELECT COUNT(*) FROM place_cache').fetchone()
+        if count > self.max_entries:
+            cursor = self._conn.execute(
+                'DELETE FROM place_cache WHERE key IN ('
+                ' SELECT key FROM place_cache ORDER BY accessed_at LIMIT ?)',
+                (count - self.max_entries,),
+            )
+            self.stats['evictions'] += max(cursor.rowcount, 0)
+
+
+_init_lock = threading.Lock()
+
+
+def get_place_cache(app):
+    cache = app.extensions.get('place_cache')
+    if cache is not None:
+        return cache
+    with _init_lock:
+        cache = app.extensions.get('place_cache')
+        if cache is None:
+            cache = PlaceCache(
+                path=app.config.get('PLACES_CACHE_PATH'),
+                ttl=app.config.get('PLACES_CACHE_TTL', 86400),
+                memory_size=app.config.get('PLACES_CACHE_MEMORY_SIZE', 1024),
+                max_entries=app.config.get('PLACES_CACHE_MAX_ENTRIES', 100000),
+            )
+            app.extensions['place_cache'] = cache
+    return cache
@@ -1,45 +1,231 @@
-from flask import Blueprint, request, jsonify, current_app
-from app import db
-from models import Activity, Trip
+from flask import Blueprint, request, jsonify, current_app, abort
+from days import day_bounds, parse_day
+from extensions import db
+from models import Activity, Trip, TripChange
+from payload_cache import get_trip_cache
+from sqlalchemy import delete, insert, select, update
 from datetime import datetime
 
 activities_bp = Blueprint('activities', __name__)
 
+MAX_BULK_ACTIVITIES = 500
+MAX_BULK_IDS = 1000
+ACTIVITY_FILTERS = ('status', 'type', 'from', 'to')
+
+
+def activity_coordinates(data):
+    """Return ``(lat, lng)`` from a payload; both or neither must be given."""
+    try:
+        lat = float(data['location_lat']) if data.get('location_lat') is not None else None
+        lng = float(data['location_lng']) if data.get('location_lng') is not None else None
+    except (TypeError, ValueError):
+        raise ValueError('Location latitude and longitude must be numbers.')
+    if (lat is None) != (lng is None):
+        raise ValueError('Location latitude and longitude must both be provided.')
+    return lat, lng
+
+
+def activity_values(data):
+    """Validate an activity payload and return the column values to insert.
+
+    Raises ``ValueError`` with a user-facing message when the payload is invalid.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Activity must be a JSON object.')
+    if not data.get('name'):
+        raise ValueError('Activity name is required.')
+    try:
+        date = datetime.fromisoformat(data['date']) if data.get('date') else None
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid activity date: {data.get('date')!r}")
+    lat, lng = activity_coordinates(data)
+    return {
+        'name': data['name'],
+        'type': data.get('type'),
+        'date': date,
+        'location': data.get('location') or data.get('location_place_name'),
+        'location_place_name': data.get('location_place_name'),
+        'location_lat': lat,
+        'location_lng': lng,
+        'location_mapbox_id': data.get('location_mapbox_id'),
+        'notes': data.get('notes'),
+        'status': data.get('status', 'planned'),
+        'external_id': data.get('external_id'),
+    }
+
+
+def validate_activity_batch(items, allow_duplicate_external_ids=False):
+    """Validate a list of activity payloads.
+
+    Returns ``(values, errors)`` where ``errors`` holds one entry per invalid
+    item. An ``external_id`` repeated within the batch is an error unless
+    ``allow_duplicate_external_ids`` is set (the importer upserts, so the
+    last one wins there).
+    """
+    values, errors = [], []
+    seen = set()
+    for index, item in enumerate(items):
+        try:
+            value = activity_values(item)
+            external_id = value['external_id']
+            if external_id is not None and not allow_duplicate_external_ids:
+                if external_id in seen:
+                    raise ValueError(f'Duplicate external_id {external_id!r} in this batch.')
+                seen.add(external_id)
+            values.append(value)
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    return values, errors
+
+
+def existing_external_id_errors(trip_id, values):
+    """Per-item errors for external ids the trip already has an activity with."""
+    external_ids = [value['external_id'] for value in values if value['external_id'] is not None]
+    if not external_ids:
+        return []
+    taken = set(db.session.scalars(
+        select(Activity.external_id).where(Activity.trip_id == trip_id, Activity.external_id.in_(external_ids))
+    ))
+    return [
+        {'index': index, 'error': f"An activity with external_id {value['external_id']!r} already exists."}
+        for index, value in enumerate(values) if value['external_id'] in taken
+    ]
+
+
+def activity_selection(trip_id, data):
+    """WHERE criteria for a trip's activities chosen by ``ids`` or by ``filter``.
+
+    ``filter`` may hold ``status``, ``type`` and an inclusive ``from``/``to``
+    date range. An empty filter selects every activity of the trip. Raises
+    ``ValueError`` with a user-facing message when the payload is invalid.
+    """
+    if not isinstance(data, dict) or ('ids' in data) == ('filter' in data):
+        raise ValueError('Provide either ids or filter.')
+    criteria = [Activity.trip_id == trip_id]
+
+    if 'ids' in data:
+        ids = data['ids']
+        if (not isinstance(ids, list) or not ids
+                or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+            raise ValueError('ids must be a non-empty list of activity ids.')
+        if len(ids) > MAX_BULK_IDS:
+            raise ValueError(f'At most {MAX_BULK_IDS} ids can be given per request; use a filter for more.')
+        criteria.append(Activity.id.in_(ids))
+        return criteria
+
+    filters = data['filter']
+    if not isinstance(filters, dict):
+        raise ValueError('filter must be an object.')
+    unknown = set(filters) - set(ACTIVITY_FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown filter fields: {', '.join(sorted(unknown))}.")
+    if 'status' in filters:
+        criteria.append(Activity.status == filters['status'])
+    if 'type' in filters:
+        criteria.append(Activity.type == filters['type'])
+    if filters.get('from'):
+        first = parse_day(filters['from'], 'from')
+        criteria.append(Activity.date >= day_bounds(first, first)[0])
+    if filters.get('to'):
+        last = parse_day(filters['to'], 'to')
+        criteria.append(Activity.date < day_bounds(last, last)[1])
+    return criteria
+
+
+def insert_activities(trip_id, values):
+    """Insert a validated batch for ``trip_id`` as one executemany statement.
+
+    The caller owns the transaction. Returned activities are in input order.
+    """
+    if not values:
+        return []
+    rows = [dict(item, trip_id=trip_id) for item in values]
+    return db.session.scalars(
+        insert(Activity).returning(Activity, sort_by_parameter_order=True),
+        rows,
+    ).all()
+
+
 @activities_bp.route('/api/trips/<int:trip_id>/activities', methods=['POST'])
 def add_activity(trip_id):
     trip = Trip.query.get_or_404(trip_id)
     data = request.get_json()
     try:
-        new_activity = Activity(
-            trip_id=trip.id,
-            name=data['name'],
-            type=data.get('type'),
-            date=datetime.fromisoformat(data['date']) if data.get('date') else None,
-            location=data.get('location'),
-            notes=data.get('notes'),
-            status=data.get('status', 'planned')
-        )
+        values = activity_values(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        new_activity = Activity(trip_id=trip.id, **values)
         db.session.add(new_activity)
+        seq = Trip.bump_version(trip.id)
+        activity_data = new_activity.to_dict()
+        TripChange.record(trip.id, seq, 'activity', new_activity.id, 'create', activity_data)
         db.session.commit()
-        return jsonify(new_activity.to_dict()), 201
+        get_trip_cache(current_app).invalidate(trip.id)
+        return jsonify(activity_data), 201
     except Exception as e:
         current_app.logger.exception("Failed to add activity")
         return jsonify({'error': 'Unable to add activity. Ensure the database is migrated and request data is valid.', 'details': str(e)}), 500
+
+@activities_bp.route('/api/trips/<int:trip_id>/activities/bulk', methods=['POST'])
+def add_activities_bulk(trip_id):
+    trip = Trip.query.get_or_404(trip_id)
+    data = request.get_json()
+    items = data.get('activities') if isinstance(data, dict) else data
+
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'A non-empty list of activities is required.'}), 400
+    if len(items) > MAX_BULK_ACTIVITIES:
+        return jsonify({'error': f'At most {MAX_BULK_ACTIVITIES} activities can be created per request.'}), 400
+
+    values, errors = validate_activity_batch(items)
+    if not errors:
+        errors = existing_external_id_errors(trip.id, values)
+    if errors:
+        return jsonify({'error': 'Some activities are invalid. Nothing was created.', 'errors': errors}), 400
+
+    try:
+        activities = insert_activities(trip.id, values)
+        seq = Trip.bump_version(trip.id)
+        activity_data = [activity.to_dict() for activity in activities]
+        for item in activity_data:
+            TripChange.record(trip.id, seq, 'activity', item['id'], 'create', item)
+        db.session.commit()
+        get_trip_cache(current_app).invalidate(trip.id)
+        return jsonify({'activities': activity_data}), 201
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Failed to add activities")
+        return jsonify({'error': 'Unable to add activities. Ensure the database is migrated and request data is valid.', 'details': str(e)}), 500
 
 @activities_bp.route('/api/activities/<int:id>', methods=['PUT'])
 def update_activity(id):
     activity = Activity.query.get_or_404(id)
     data = request.get_json()
     try:
+        before = activity.to_dict()
         if 'name' in data: activity.name = data['name']
         if 'type' in data: activity.type = data['type']
         if 'date' in data: activity.date = datetime.fromisoformat(data['date'])
-        if 'location' in data: activity.location = data['location']
+        if 'location' in data or 'location_place_name' in data:
+            activity.location = data.get('location') or data.get('location_place_name')
+        if 'location_place_name' in data: activity.location_place_name = data['location_place_name']
+        if 'location_lat' in data or 'location_lng' in data:
+            try:
+                activity.location_lat, activity.location_lng = activity_coordinates(data)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        if 'location_mapbox_id' in data: activity.location_mapbox_id = data['location_mapbox_id']
         if 'notes' in data: activity.notes = data['notes']
         if 'status' in data: activity.status = data['status']
 
+        seq = Trip.bump_version(activity.trip_id)
+        activity_data = activity.to_dict()
+        TripChange.record(activity.trip_id, seq, 'activity', activity.id, 'update',
+                          TripChange.diff(before, activity_data))
         db.session.commit()
-        return jsonify(activity.to_dict())
+        get_trip_cache(current_app).invalidate(activity.trip_id)
+        return jsonify(activity_data)
     except Exception as e:
         current_app.logger.exception("Failed to update activity")
         return jsonify({'error': 'Unable to update activity. Ensure the database is migrated and request data is valid.', 'details': str(e)}), 500
@@ -47,6 +233,73 @@ def update_activity(id):
 @activities_bp.route('/api/activities/<int:id>', methods=['DELETE'])
 def delete_activity(id):
     activity = Activity.query.get_or_404(id)
+    trip_id = activity.trip_id
     db.session.delete(activity)
+    seq = Trip.bump_version(trip_id)
+    TripChange.record(trip_id, seq, 'activity', id, 'delete')
     db.session.commit()
+    get_trip_cache(current_app).invalidate(trip_id)
     return jsonify({'message': 'Activity deleted successfully'})
+
+@activities_bp.route('/api/trips/<int:trip_id>/activities', methods=['PATCH'])
+def update_activities_status(trip_id):
+    """Set the ``status`` of a trip's activities chosen by ``ids`` or ``filter``.
+
+    One set-based UPDATE; activities that already have the status are left
+    alone and not reported.
+    """
+    if db.session.execute(select(Trip.id).where(Trip.id == trip_id)).scalar() is None:
+        abort(404)
+    data = request.get_json(silent=True)
+    status = data.get('status') if isinstance(data, dict) else None
+    if not isinstance(status, str) or not status.strip() or len(status) > 20:
+        return jsonify({'error': 'status must be a non-empty string of at most 20 characters.'}), 400
+    try:
+        criteria = activity_selection(trip_id, {key: value for key, value in data.items() if key != 'status'})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        updated = db.session.scalars(
+            update(Activity).where(*criteria, Activity.status.is_distinct_from(status))
+            .values(status=status).returning(Activity.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if updated:
+            seq = Trip.bump_version(trip_id)
+            TripChange.record_many(trip_id, seq, 'activity', updated, 'update', {'status': status})
+        db.session.commit()
+        if updated:
+            get_trip_cache(current_app).invalidate(trip_id)
+        return jsonify({'updated': len(updated), 'ids': updated})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Failed to update activities")
+        return jsonify({'error': 'Unable to update activities. Ensure the database is migrated and request data is valid.', 'details': str(e)}), 500
+
+@activities_bp.route('/api/trips/<int:trip_id>/activities', methods=['DELETE'])
+def delete_activities(trip_id):
+    """Delete a trip's activities chosen by ``ids`` or ``filter`` in one DELETE."""
+    if db.session.execute(select(Trip.id).where(Trip.id == trip_id)).scalar() is None:
+        abort(404)
+    try:
+        criteria = activity_selection(trip_id, request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        deleted = db.session.scalars(
+            delete(Activity).where(*criteria).returning(Activity.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if deleted:
+            seq = Trip.bump_version(trip_id)
+            TripChange.record_many(trip_id, seq, 'activity', deleted, 'delete')
+        db.session.commit()
+        if deleted:
+            get_trip_cache(current_app).invalidate(trip_id)
+        return jsonify({'deleted': len(deleted), 'ids': deleted})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Failed to delete activities")
+        return jsonify({'error': 'Unable to delete activities. Ensure the database is migrated and request data is valid.', 'details': str(e)}), 500
@@ -0,0 +1,102 @@
+from flask import Blueprint, request, jsonify, current_app, abort
+from sqlalchemy import func, select
+from extensions import db
+from models import Trip, Activity
+from days import day_activities, day_bounds, parse_day
+
+calendar_bp = Blueprint('calendar', __name__)
+
+MAX_CALENDAR_DAYS = 366
+# Key used in the per-day breakdowns for activities without a status or type.
+UNSPECIFIED = 'unspecified'
+
+
+def _calendar_etag(trip_id, version, first, last):
+    return f'{trip_id}-{version}-{first.isoformat()}-{last.isoformat()}'
+
+
+def calendar_days(trip_id, first, last):
+    """Per-day activity counts for a trip between two dates (inclusive).
+
+    Grouping and counting run in SQL; only days with activities are returned,
+    in date order.
+    """
+    start, end = day_bounds(first, last)
+    day = func.date(Activity.date)
+    rows = db.session.execute(
+        select(day, Activity.status, Activity.type, func.count())
+        .where(Activity.trip_id == trip_id, Activity.date >= start, Activity.date < end)
+        .group_by(day, Activity.status, Activity.type)
+        .order_by(day)
+    )
+    days = {}
+    for day_value, status, activity_type, count in rows:
+        # SQLite returns 'YYYY-MM-DD' strings, other databases date objects.
+        key = day_value if isinstance(day_value, str) else day_value.isoformat()
+        summary = days.get(key)
+        if summary is None:
+            summary = days[key] = {'date': key, 'count': 0, 'by_status': {}, 'by_type': {}}
+        summary['count'] += count
+        status = status or UNSPECIFIED
+        activity_type = activity_type or UNSPECIFIED
+        summary['by_status'][status] = summary['by_status'].get(status, 0) + count
+        summary['by_type'][activity_type] = summary['by_type'].get(activity_type, 0) + count
+    return list(days.values())
+
+
+@calendar_bp.route('/api/trips/<int:id>/calendar', methods=['GET'])
+def get_trip_calendar(id):
+    """Per-day activity summary for a window of a trip's calendar.
+
+    ``from`` and ``to`` default to the trip's start and end dates. A day's
+    activities are fetched separately from ``/calendar/<date>``.
+    """
+    trip = db.session.execute(
+        select(Trip.version, Trip.start_date, Trip.end_date).where(Trip.id == id)
+    ).first()
+    if trip is None:
+        abort(404)
+
+    try:
+        first = parse_day(request.args['from'], 'from') if request.args.get('from') else trip.start_date
+        last = parse_day(request.args['to'], 'to') if request.args.get('to') else trip.end_date
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if first is None or last is None:
+        return jsonify({'error': 'from and to are required for trips without start and end dates.'}), 400
+    if last < first:
+        return jsonify({'error': 'to must not be before from.'}), 400
+    if (last - first).days + 1 > MAX_CALENDAR_DAYS:
+        return jsonify({'error': f'At most {MAX_CALENDAR_DAYS} days can be requested at once.'}), 400
+
+    # Like the trip detail, the version doubles as the ETag.
+    etag = _calendar_etag(id, trip.version, first, last)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        undated = db.session.execute(
+            select(func.count()).where(Activity.trip_id == id, Activity.date.is_(None))
+        ).scalar()
+        response = jsonify({
+            'trip_id': id,
+            'version': trip.version,
+            'from': first.isoformat(),
+            'to': last.isoformat(),
+            'days': calendar_days(id, first, last),
+            'undated': undated,
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@calendar_bp.route('/api/trips/<int:id>/calendar/<day>', methods=['GET'])
+def get_trip_calendar_day(id, day):
+    """The activities of one day of a trip, ordered by time."""
+    try:
+        day = parse_day(day, 'date')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if db.session.execute(select(Trip.id).where(Trip.id == id)).scalar() is None:
+        abort(404)
+    return jsonify({'trip_id': id, 'date': day.isoformat(), 'activities': day_activities(id, day)})
@@ -0,0 +1,156 @@
+from flask import Blueprint, request, jsonify, current_app, abort
+from events import get_event_broker, trip_channel
+from routes.trips import MAX_CHANGES_LIMIT, trip_changes
+import time
+
+events_bp = Blueprint('events', __name__)
+
+# Reconnection delay suggested to EventSource clients, in milliseconds.
+RETRY_MS = 3000
+TOO_MANY_STREAMS = 'Too many live connections. Poll /api/trips/<id>/changes instead.'
+STREAM_HEADERS = {
+    'Cache-Control': 'no-cache',
+    # Stop reverse proxies (nginx) from buffering the stream.
+    'X-Accel-Buffering': 'no',
+}
+
+
+def _sse(dumps, event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _stream(broker, subscription, first_events, last_seq, dumps, heartbeat, max_duration):
+    """Yield SSE frames until the connection closes or ``max_duration`` elapses.
+
+    Runs after the request context is gone, so it holds no database
+    connection while idle. A subscriber that overflowed its queue is
+    disconnected; EventSource reconnects with ``Last-Event-ID`` and the
+    missed versions are replayed from the change log.
+    """
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        yield from first_events
+        deadline = time.monotonic() + max_duration
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            messages = subscription.get(timeout=min(heartbeat, remaining))
+            if subscription.overflowed:
+                return
+            if not messages:
+                yield ': heartbeat\n\n'
+                continue
+            for message in messages:
+                # Versions already sent by the replay are skipped.
+                if message['seq'] <= last_seq:
+                    continue
+                last_seq = message['seq']
+                yield _sse(dumps, 'change', message, last_seq)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def async_stream(broker, subscription, first_events, last_seq, dumps, heartbeat, max_duration):
+    """``_stream`` for an ``AsyncSubscription``: yields the same frames on an event loop."""
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        for frame in first_events:
+            yield frame
+        deadline = time.monotonic() + max_duration
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            messages = await subscription.get(timeout=min(heartbeat, remaining))
+            if subscription.overflowed:
+                return
+            if not messages:
+                yield ': heartbeat\n\n'
+                continue
+            for message in messages:
+                if message['seq'] <= last_seq:
+                    continue
+                last_seq = message['seq']
+                yield _sse(dumps, 'change', message, last_seq)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def stream_since(headers, args):
+    """The version a stream resumes from (``Last-Event-ID`` or ``?since``), or ``None``.
+
+    Raises ``ValueError`` when it is not an integer.
+    """
+    since = headers.get('Last-Event-ID') or args.get('since')
+    return int(since) if since else None
+
+
+def opening_events(id, since, dumps):
+    """Frames sent before live changes, and the version they bring the client to.
+
+    ``ready`` for a new stream, the missed versions from the change log for a
+    resumed one, or ``reset`` when the log cannot cover the gap. Returns
+    ``None`` for an unknown trip.
+    """
+    result = trip_changes(id, since or 0, MAX_CHANGES_LIMIT)
+    if result is None:
+        return None
+    if since is None:
+        return [_sse(dumps, 'ready', {'version': result['version']}, result['version'])], result['version']
+    if result['reset'] or result['has_more']:
+        return [_sse(dumps, 'reset', {'version': result['version']}, result['version'])], result['version']
+    events = []
+    messages = {}
+    for change in result['changes']:
+        messages.setdefault(change['seq'], []).append(change)
+    for seq, changes in messages.items():
+        events.append(_sse(dumps, 'change', {'trip_id': id, 'seq': seq, 'changes': changes}, seq))
+    return events, result['version']
+
+
+@events_bp.route('/api/trips/<int:id>/events', methods=['GET'])
+def trip_events(id):
+    """Server-Sent Events stream of a trip's changes.
+
+    Each ``change`` event carries one trip version with the same change
+    objects as ``GET /api/trips/<id>/changes``. The event id is the version,
+    so a reconnecting client resumes where it stopped. Under ASGI this route
+    is served by ``asgi.trip_events`` instead, without holding a thread.
+    """
+    try:
+        since = stream_since(request.headers, request.args)
+    except ValueError:
+        return jsonify({'error': 'since must be an integer.'}), 400
+
+    broker = get_event_broker(current_app)
+    # Subscribe before reading the log so nothing committed in between is lost.
+    subscription = broker.subscribe(trip_channel(id))
+    if subscription is None:
+        response = jsonify({'error': TOO_MANY_STREAMS})
+        response.headers['Retry-After'] = str(RETRY_MS // 1000)
+        return response, 503
+
+    dumps = current_app.json.dumps
+    try:
+        opened = opening_events(id, since, dumps)
+        if opened is None:
+            abort(404)
+    except BaseException:
+        broker.unsubscribe(subscription)
+        raise
+
+    first_events, version = opened
+    body = _stream(
+        broker, subscription, first_events, version, dumps,
+        current_app.config['EVENTS_HEARTBEAT'], current_app.config['EVENTS_MAX_DURATION'],
+    )
+    response = current_app.response_class(body, mimetype='text/event-stream')
+    response.headers.update(STREAM_HEADERS)
+    return response
+
+
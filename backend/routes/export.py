@@ -0,0 +1,131 @@
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
+from sqlalchemy import select
+from extensions import db
+from models import Trip, Activity, TripParticipant
+from datetime import datetime, timezone
+import csv
+import io
+import json
+
+export_bp = Blueprint('export', __name__)
+
+EXPORT_BATCH_SIZE = 500
+
+# One CSV row per activity, with the trip columns repeated on each row. Trips
+# without activities get a single row with empty activity columns. ``trip_people``
+# is a JSON list, so names containing separators survive a round trip.
+CSV_TRIP_FIELDS = Trip.FIELDS
+CSV_ACTIVITY_FIELDS = (
+    'id', 'name', 'type', 'date',
+    'location', 'location_place_name', 'location_lat', 'location_lng', 'location_mapbox_id',
+    'notes', 'status', 'external_id',
+)
+CSV_HEADER = (
+    tuple(f'trip_{field}' for field in CSV_TRIP_FIELDS)
+    + tuple(f'activity_{field}' for field in CSV_ACTIVITY_FIELDS)
+)
+
+
+def _trip_batches(updated_since):
+    """Yield lists of ``(trip, activities)`` dicts, ``EXPORT_BATCH_SIZE`` trips at a time.
+
+    Trip rows are streamed from a server-side cursor as plain column tuples;
+    each batch loads its participants and activities with one query each.
+    No ORM objects are built, so memory stays flat whatever the export size.
+    """
+    query = (
+        select(*[getattr(Trip, field) for field in Trip.COLUMN_FIELDS])
+        .order_by(Trip.updated_at, Trip.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if updated_since is not None:
+        query = query.where(Trip.updated_at >= updated_since)
+
+    serialize_trips = Trip.serializer(Trip.COLUMN_FIELDS).rows
+    serialize_activity = Activity.serializer().row
+    for rows in db.session.execute(query).partitions():
+        trips = serialize_trips(rows)
+        trip_ids = [trip['id'] for trip in trips]
+
+        people = {trip_id: [] for trip_id in trip_ids}
+        for trip_id, name in db.session.execute(
+            select(TripParticipant.trip_id, TripParticipant.name)
+            .where(TripParticipant.trip_id.in_(trip_ids))
+            .order_by(TripParticipant.trip_id, TripParticipant.position)
+        ):
+            people[trip_id].append(name)
+
+        activities = {trip_id: [] for trip_id in trip_ids}
+        for row in db.session.execute(
+            select(*[getattr(Activity, field) for field in Activity.FIELDS])
+            .where(Activity.trip_id.in_(trip_ids))
+            .order_by(Activity.trip_id, Activity.id)
+        ):
+            activities[row.trip_id].append(serialize_activity(row))
+
+        batch = []
+        for trip in trips:
+            trip['people'] = people[trip['id']]
+            batch.append((trip, activities[trip['id']]))
+        yield batch
+
+
+def _ndjson(updated_since):
+    dumps = current_app.json.dumps
+    for batch in _trip_batches(updated_since):
+        lines = []
+        for trip, activities in batch:
+            trip['activities'] = activities
+            lines.append(dumps(trip))
+        yield '\n'.join(lines) + '\n'
+
+
+def _csv(updated_since):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for batch in _trip_batches(updated_since):
+        for trip, activities in batch:
+            trip['people'] = json.dumps(trip['people'], ensure_ascii=False)
+            trip_row = [trip[field] for field in CSV_TRIP_FIELDS]
+            if not activities:
+                writer.writerow(trip_row + [None] * len(CSV_ACTIVITY_FIELDS))
+            for activity in activities:
+                writer.writerow(trip_row + [activity[field] for field in CSV_ACTIVITY_FIELDS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+@export_bp.route('/api/export', methods=['GET'])
+def export_trips():
+    """Stream every trip with its activities as NDJSON or CSV.
+
+    ``updated_since`` limits the export to trips updated at or after that
+    time. It cannot report trips deleted since then, as they have no row
+    left to export; a client that needs deletions reads the trip's change
+    log (``/api/trips/<id>/changes``), which ends with a ``trip`` ``delete``
+    change.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv.'}), 400
+
+    updated_since = None
+    if request.args.get('updated_since'):
+        try:
+            updated_since = datetime.fromisoformat(request.args['updated_since'])
+        except ValueError:
+            return jsonify({'error': 'updated_since must be an ISO 8601 datetime.'}), 400
+        if updated_since.tzinfo is not None:
+            # Timestamps are stored as naive UTC.
+            updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+
+    if export_format == 'csv':
+        body, mimetype = _csv(updated_since), 'text/csv'
+    else:
+        body, mimetype = _ndjson(updated_since), 'application/x-ndjson'
+
+    response = current_app.response_class(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=co_planet_export.{export_format}'
+    return response
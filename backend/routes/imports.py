@@ -0,0 +1,37 @@
+from flask import Blueprint, request, jsonify, current_app
+from importer import DEFAULT_BATCH_SIZE, import_stream
+import io
+
+imports_bp = Blueprint('imports', __name__)
+
+
+@imports_bp.route('/api/import', methods=['POST'])
+def import_itineraries():
+    """Import trips from an NDJSON or CSV upload (multipart ``file`` or raw body).
+
+    The body is read as a stream and written in batches, so the response
+    reports per-row errors alongside the counts of what was committed.
+    """
+    import_format = request.args.get('format', 'ndjson')
+    if import_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv.'}), 400
+    try:
+        batch_size = int(request.args.get('batch_size', DEFAULT_BATCH_SIZE))
+    except ValueError:
+        return jsonify({'error': 'batch_size must be an integer.'}), 400
+    if batch_size < 1:
+        return jsonify({'error': 'batch_size must be positive.'}), 400
+
+    upload = request.files.get('file')
+    raw = upload.stream if upload is not None else request.stream
+    stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+    try:
+        report = import_stream(stream, import_format, batch_size)
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Import file must be UTF-8 encoded.'}), 400
+    except Exception as e:
+        current_app.logger.exception('Import failed')
+        return jsonify({'error': 'Failed to import', 'details': str(e)}), 500
+    finally:
+        stream.detach()
+    return jsonify(report.to_dict())
@@ -0,0 +1,12 @@
+from flask import Blueprint, current_app, abort
+from metrics import get_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_prometheus_metrics():
+    metrics = get_metrics(current_app)
+    if metrics is None:
+        abort(404)
+    return current_app.response_class(metrics.render(current_app), mimetype='text/plain; version=0.0.4')
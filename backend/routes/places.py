@@ -1,50 +1,152 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from concurrent.futures import wait
 import os
-import requests
-from urllib.parse import quote
+from mapbox import MapboxError, MapboxUnavailable, get_mapbox_client, get_mapbox_executor
+from metrics import request_timer
+from place_cache import get_place_cache, normalize_query
 
 places_bp = Blueprint('places', __name__)
 
+DEFAULT_PLACE_TYPES = 'place,region,locality,neighborhood,postcode'
+DEFAULT_LIMIT = 5
+MAX_BATCH_QUERIES = 500
+
+
+def mapbox_token():
+    return os.environ.get('MAPBOX_ACCESS_TOKEN') or os.environ.get('MAPBOX_TOKEN')
 
-@places_bp.route('/api/places/search')
-def search_places():
-    mapbox_token = os.environ.get('MAPBOX_ACCESS_TOKEN') or os.environ.get('MAPBOX_TOKEN')
-    query = request.args.get('query')
 
+def search_args(args):
+    """Validate search query arguments and return ``(query, types, limit)``.
+
+    Shared with the async handler in asgi.py. Raises ``ValueError`` with a
+    user-facing message.
+    """
+    query = args.get('query')
+    types = args.get('types', DEFAULT_PLACE_TYPES)
     if not query:
-        return jsonify({'error': 'A search query is required.'}), 400
+        raise ValueError('A search query is required.')
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError('limit must be an integer.')
+    if not 1 <= limit <= 10:
+        raise ValueError('limit must be between 1 and 10.')
+    return query, types, limit
+
 
-    if not mapbox_token:
+def batch_args(data):
+    """Validate a batch search body and return ``(queries, unique, types, limit)``.
+
+    ``unique`` maps each normalized query to the first spelling that produced
+    it, so every distinct place is looked up once. Shared with the async
+    handler in asgi.py. Raises ``ValueError`` with a user-facing message.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('queries'), list) or not data['queries']:
+        raise ValueError('A non-empty list of queries is required.')
+    queries = data['queries']
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise ValueError(f'At most {MAX_BATCH_QUERIES} queries can be resolved per request.')
+    if not all(isinstance(query, str) and query.strip() for query in queries):
+        raise ValueError('Every query must be a non-empty string.')
+    _, types, limit = search_args({'query': queries[0], **{k: data[k] for k in ('types', 'limit') if k in data}})
+    unique = {}
+    for query in queries:
+        unique.setdefault(normalize_query(query), query)
+    return queries, unique, types, limit
+
+
+def batch_response(queries, outcomes):
+    """One result per input query, in input order; duplicates share their lookup."""
+    results = [dict(outcomes[normalize_query(query)], query=query) for query in queries]
+    return {
+        'results': results,
+        'unique': len(outcomes),
+        'errors': sum(1 for outcome in outcomes.values() if 'error' in outcome),
+    }
+
+
+@places_bp.route('/api/places/search')
+def search_places():
+    try:
+        query, types, limit = search_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    token = mapbox_token()
+    if not token:
         return jsonify({'error': 'Mapbox access token is not configured on the server.'}), 500
 
+    cache = get_place_cache(current_app)
+    features = cache.get(query, types, limit)
+    if features is not None:
+        response = jsonify({'features': features})
+        response.headers['X-Cache'] = 'HIT'
+        return response
+
     try:
-        response = requests.get(
-            f"https://api.mapbox.com/geocoding/v5/mapbox.places/{quote(query)}.json",
-            params={
-                'access_token': mapbox_token,
-                'autocomplete': 'true',
-                'types': 'place,region,locality,neighborhood,postcode',
-                'limit': 5
-            },
-            timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        features = []
-        for feature in data.get('features', []):
-            center = feature.get('center', [])
-            if len(center) != 2:
-                continue
-            features.append({
-                'id': feature.get('id'),
-                'place_name': feature.get('place_name'),
-                'text': feature.get('text'),
-                'latitude': center[1],
-                'longitude': center[0],
-                'context': feature.get('context', [])
-            })
-
-        return jsonify({'features': features})
-    except requests.RequestException as e:
+        # Concurrent identical searches share one upstream call.
+        with request_timer('mapbox'):
+            features = get_mapbox_client(current_app).search(query, token, types, limit)
+        cache.set(query, types, limit, features)
+        response = jsonify({'features': features})
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    except MapboxUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except MapboxError as e:
         return jsonify({'error': f'Failed to fetch places from Mapbox: {str(e)}'}), 502
+
+
+def _resolve(client, cache, query, token, types, limit):
+    features = client.search(query, token, types, limit)
+    cache.set(query, types, limit, features)
+    return features
+
+
+@places_bp.route('/api/places/batch', methods=['POST'])
+def search_places_batch():
+    """Resolve many place queries at once.
+
+    Distinct queries are answered from the cache where possible and the rest
+    are fanned out over a bounded thread pool. ``PLACES_BATCH_TIMEOUT`` is
+    one deadline for the whole batch, counted from when the lookups are
+    submitted, not a budget per lookup; each upstream request is bounded by
+    ``MAPBOX_TIMEOUT`` on its own. Lookups still running at the deadline are
+    reported as timed out while the others are returned; they keep running
+    and warm the cache.
+    """
+    try:
+        queries, unique, types, limit = batch_args(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    token = mapbox_token()
+    if not token:
+        return jsonify({'error': 'Mapbox access token is not configured on the server.'}), 500
+
+    cache = get_place_cache(current_app)
+    client = get_mapbox_client(current_app)
+    executor = get_mapbox_executor(current_app)
+    outcomes, pending = {}, {}
+    for key, query in unique.items():
+        features = cache.get(query, types, limit)
+        if features is not None:
+            outcomes[key] = {'features': features, 'cached': True}
+        else:
+            pending[executor.submit(_resolve, client, cache, query, token, types, limit)] = key
+
+    with request_timer('mapbox'):
+        done, _ = wait(pending, timeout=current_app.config['PLACES_BATCH_TIMEOUT'])
+    for future, key in pending.items():
+        if future not in done:
+            outcomes[key] = {'error': 'Timed out waiting for Mapbox.', 'status': 504}
+        elif isinstance(future.exception(), MapboxUnavailable):
+            outcomes[key] = {'error': str(future.exception()), 'status': 503}
+        elif isinstance(future.exception(), MapboxError):
+            outcomes[key] = {'error': f'Failed to fetch places from Mapbox: {future.exception()}', 'status': 502}
+        elif future.exception() is not None:
+            raise future.exception()
+        else:
+            outcomes[key] = {'features': future.result(), 'cached': False}
+    return jsonify(batch_response(queries, outcomes))
@@ -0,0 +1,110 @@
+from flask import Blueprint, request, jsonify, current_app, abort
+from sqlalchemy import select
+from days import day_activities, parse_day
+from extensions import db
+from metrics import request_timer
+from models import Trip
+from payload_cache import get_trip_cache
+from routing import plan_route
+
+routing_bp = Blueprint('routing', __name__)
+
+MAX_ROUTE_STOPS = 500
+ROUTE_ENDS = ('origin', 'destination', 'none')
+
+
+def _route_end(trip, kind):
+    """The origin or destination of ``trip`` as a route end, or ``None``."""
+    if kind == 'none':
+        return None
+    lat, lng = getattr(trip, f'{kind}_lat'), getattr(trip, f'{kind}_lng')
+    if lat is None or lng is None:
+        return None
+    return {'kind': kind, 'name': getattr(trip, f'{kind}_place_name') or getattr(trip, kind), 'lat': lat, 'lng': lng}
+
+
+def trip_route(trip, day, start_kind, end_kind):
+    """Suggested visiting order for ``day`` as a JSON-ready dict."""
+    activities = day_activities(trip.id, day)
+    located = [a for a in activities if a['location_lat'] is not None and a['location_lng'] is not None]
+    if len(located) > MAX_ROUTE_STOPS:
+        raise ValueError(f'At most {MAX_ROUTE_STOPS} located activities can be routed at once.')
+    start, end = _route_end(trip, start_kind), _route_end(trip, end_kind)
+
+    with request_timer('route'):
+        order, legs, baseline = plan_route(
+            [(a['location_lat'], a['location_lng']) for a in located],
+            (start['lat'], start['lng']) if start else None,
+            (end['lat'], end['lng']) if end else None,
+        )
+    # Without a start the first stop has no leg leading to it.
+    stop_legs = legs[:len(order)] if start else [None] + legs[:len(order) - 1]
+    if end and order:
+        end = dict(end, leg_km=round(legs[-1], 3))
+    return {
+        'trip_id': trip.id,
+        'version': trip.version,
+        'date': day.isoformat(),
+        'start': start,
+        'end': end,
+        'stops': [
+            dict(located[index], leg_km=round(leg, 3) if leg is not None else None)
+            for index, leg in zip(order, stop_legs)
+        ],
+        'unlocated': [a for a in activities if a['location_lat'] is None or a['location_lng'] is None],
+        'distance_km': round(sum(legs, 0.0), 3),
+        # Length of the same day visited in time order, for comparison.
+        'baseline_distance_km': round(baseline, 3),
+    }
+
+
+@routing_bp.route('/api/trips/<int:id>/route', methods=['GET'])
+def get_trip_route(id):
+    """Suggested visiting order for the located activities of one day.
+
+    The route starts at the trip's origin and ends at the origin again for
+    round trips, at the destination otherwise. ``start`` and ``end``
+    (``origin``, ``destination`` or ``none``) override either end. Activities
+    without coordinates are returned under ``unlocated``.
+    """
+    try:
+        day = parse_day(request.args.get('date'), 'date')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    trip = db.session.execute(
+        select(
+            Trip.id, Trip.version, Trip.is_round_trip,
+            Trip.origin, Trip.origin_place_name, Trip.origin_lat, Trip.origin_lng,
+            Trip.destination, Trip.destination_place_name, Trip.destination_lat, Trip.destination_lng,
+        ).where(Trip.id == id)
+    ).first()
+    if trip is None:
+        abort(404)
+
+    start_kind = request.args.get('start', 'origin')
+    end_kind = request.args.get('end', 'origin' if trip.is_round_trip else 'destination')
+    if start_kind not in ROUTE_ENDS or end_kind not in ROUTE_ENDS:
+        return jsonify({'error': 'start and end must be origin, destination or none.'}), 400
+
+    # Any change to the trip or its activities bumps the version, so the
+    # route is computed at most once per version and day.
+    etag = f'{id}-{trip.version}-route-{day.isoformat()}-{start_kind}-{end_kind}'
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        cache = get_trip_cache(current_app)
+        key = (id, trip.version, 'route', day.isoformat(), start_kind, end_kind)
+        body = cache.get(key)
+        if body is None:
+            try:
+                route = trip_route(trip, day, start_kind, end_kind)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            body = current_app.json.dumps(route).encode()
+            cache.set(key, body)
+        response = current_app.response_class(body, mimetype='application/json')
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,95 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from extensions import db
+from search import fts_query
+import html
+
+search_bp = Blueprint('search', __name__)
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+SNIPPET_TOKENS = 12
+# Placeholders for the match markers; the snippet is HTML-escaped before
+# they are turned into <mark> tags, so indexed text can never inject markup.
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+# bm25 weights follow the column order in search.INDEXED_COLUMNS: a match in
+# the name counts most.
+TRIP_SEARCH = text(
+    "SELECT trip.id AS id, trip.id AS trip_id, trip.name AS name,"
+    " snippet(trip_fts, -1, :mark_start, :mark_end, '…', :tokens) AS snippet,"
+    " bm25(trip_fts, 10.0, 3.0, 3.0, 1.0) AS rank"
+    " FROM trip_fts JOIN trip ON trip.id = trip_fts.rowid"
+    " WHERE trip_fts MATCH :query ORDER BY rank LIMIT :limit"
+)
+ACTIVITY_SEARCH = text(
+    "SELECT activity.id AS id, activity.trip_id AS trip_id, activity.name AS name,"
+    " snippet(activity_fts, -1, :mark_start, :mark_end, '…', :tokens) AS snippet,"
+    " bm25(activity_fts, 10.0, 3.0, 1.0, 2.0) AS rank"
+    " FROM activity_fts JOIN activity ON activity.id = activity_fts.rowid"
+    " WHERE activity_fts MATCH :query AND (:trip_id IS NULL OR activity.trip_id = :trip_id)"
+    " ORDER BY rank LIMIT :limit"
+)
+
+
+def _snippet(raw):
+    return html.escape(raw or '').replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+@search_bp.route('/api/search', methods=['GET'])
+def search():
+    """Ranked full-text search over trips and activities.
+
+    Every word of ``q`` must match, as a prefix. ``type`` restricts results to
+    ``trip`` or ``activity`` and ``trip_id`` limits activities to one trip.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return jsonify({'error': 'Full-text search requires the SQLite FTS5 index.'}), 501
+
+    query = fts_query(request.args.get('q', ''))
+    if not query:
+        return jsonify({'error': 'A search query is required.'}), 400
+    kind = request.args.get('type')
+    if kind not in (None, 'trip', 'activity'):
+        return jsonify({'error': 'type must be trip or activity.'}), 400
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        trip_id = int(request.args['trip_id']) if request.args.get('trip_id') else None
+    except ValueError:
+        return jsonify({'error': 'limit and trip_id must be integers.'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive.'}), 400
+
+    params = {'query': query, 'limit': limit, 'mark_start': _MARK_START, 'mark_end': _MARK_END,
+              'tokens': SNIPPET_TOKENS}
+    searches = []
+    if kind in (None, 'trip') and trip_id is None:
+        searches.append(('trip', TRIP_SEARCH, params))
+    if kind in (None, 'activity'):
+        searches.append(('activity', ACTIVITY_SEARCH, dict(params, trip_id=trip_id)))
+
+    results = []
+    for result_type, statement, statement_params in searches:
+        try:
+            rows = db.session.execute(statement, statement_params).all()
+        except OperationalError as e:
+            # fts_query quotes every term; this guards against input it misses.
+            if 'fts5' not in str(e.orig):
+                raise
+            db.session.rollback()
+            return jsonify({'error': 'Invalid search query.'}), 400
+        for row in rows:
+            results.append({
+                'type': result_type,
+                'id': row.id,
+                'trip_id': row.trip_id,
+                'name': row.name,
+                'snippet': _snippet(row.snippet),
+                # bm25 is lower for better matches; flip it so higher is better.
+                # Significant digits rather than decimals: for a term found in
+                # most rows FTS5 clamps the IDF to 1e-6, so scores are tiny.
+                'score': float(f'{-row.rank:.6g}'),
+            })
+    results.sort(key=lambda result: result['score'], reverse=True)
+    return jsonify({'q': request.args['q'], 'results': results[:limit]})
@@ -0,0 +1,122 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import and_, or_, select
+from extensions import db
+from models import Trip
+from geo import geohash_cover, haversine_km, in_bbox, radius_bbox
+from routes.trips import trip_dicts
+
+spatial_bp = Blueprint('spatial', __name__)
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+MAX_RADIUS_KM = 20000
+
+
+def _parse_limit():
+    """The ``limit`` argument, capped at ``MAX_LIMIT``; raises ``ValueError`` with a user-facing message."""
+    try:
+        limit = int(request.args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError('limit must be an integer.')
+    if limit < 1:
+        raise ValueError('limit must be positive.')
+    return min(limit, MAX_LIMIT)
+
+
+def _prefix_filter(cover):
+    """Index range scans over both geohash columns for each covering prefix."""
+    # '{' sorts directly after 'z', the last geohash character.
+    ranges = []
+    for column in (Trip.origin_geohash, Trip.destination_geohash):
+        ranges.extend(and_(column >= prefix, column < prefix + '{') for prefix in cover)
+    return or_(*ranges)
+
+
+def _candidates(south, west, north, east):
+    query = select(
+        Trip.id, Trip.origin_lat, Trip.origin_lng, Trip.destination_lat, Trip.destination_lng
+    )
+    cover = geohash_cover(south, west, north, east)
+    if cover:
+        query = query.where(_prefix_filter(cover))
+    else:
+        query = query.where(or_(Trip.origin_geohash.isnot(None), Trip.destination_geohash.isnot(None)))
+    return db.session.execute(query).all()
+
+
+def _trips_by_id(ids):
+    trips = trip_dicts(Trip.id.in_(ids)) if ids else []
+    return {trip['id']: trip for trip in trips}
+
+
+@spatial_bp.route('/api/trips/nearby', methods=['GET'])
+def trips_nearby():
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        radius_km = float(request.args.get('radius_km', 50))
+    except KeyError:
+        return jsonify({'error': 'lat and lng are required.'}), 400
+    except ValueError:
+        return jsonify({'error': 'lat, lng and radius_km must be numbers.'}), 400
+    try:
+        limit = _parse_limit()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({'error': 'lat/lng are out of range.'}), 400
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        return jsonify({'error': f'radius_km must be between 0 and {MAX_RADIUS_KM}.'}), 400
+
+    rows = _candidates(*radius_bbox(lat, lng, radius_km))
+
+    # Measure both endpoints of every candidate in one batch; a trip matches
+    # when either its origin or its destination lies inside the radius.
+    points = []
+    for row in rows:
+        if row.origin_lat is not None and row.origin_lng is not None:
+            points.append((row.id, row.origin_lat, row.origin_lng))
+        if row.destination_lat is not None and row.destination_lng is not None:
+            points.append((row.id, row.destination_lat, row.destination_lng))
+    distances = haversine_km(lat, lng, [p[1] for p in points], [p[2] for p in points])
+
+    nearest = {}
+    for (trip_id, _, _), distance in zip(points, distances):
+        if distance <= radius_km and distance < nearest.get(trip_id, float('inf')):
+            nearest[trip_id] = distance
+
+    matches = sorted(nearest.items(), key=lambda item: (item[1], item[0]))[:limit]
+    trips = _trips_by_id([trip_id for trip_id, _ in matches])
+    result = []
+    for trip_id, distance in matches:
+        trip_data = trips[trip_id]
+        trip_data['distance_km'] = round(distance, 3)
+        result.append(trip_data)
+    return jsonify({'trips': result})
+
+
+@spatial_bp.route('/api/trips/in_bbox', methods=['GET'])
+def trips_in_bbox():
+    try:
+        west, south, east, north = (float(value) for value in request.args['bbox'].split(','))
+    except KeyError:
+        return jsonify({'error': 'bbox=west,south,east,north is required.'}), 400
+    except ValueError:
+        return jsonify({'error': 'bbox must be four numbers (west,south,east,north).'}), 400
+    try:
+        limit = _parse_limit()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        return jsonify({'error': 'bbox is out of range.'}), 400
+
+    ids = [
+        row.id for row in _candidates(south, west, north, east)
+        if in_bbox(row.origin_lat, row.origin_lng, south, west, north, east)
+        or in_bbox(row.destination_lat, row.destination_lng, south, west, north, east)
+    ]
+    ids = sorted(ids, reverse=True)[:limit]
+    trips = _trips_by_id(ids)
+    return jsonify({'trips': [trips[trip_id] for trip_id in ids]})
@@ -1,79 +1,329 @@
-from flask import Blueprint, request, jsonify, current_app
-from app import db
-from models import Trip, Activity
+from flask import Blueprint, request, jsonify, current_app, abort
+from extensions import db
+from models import Trip, Activity, TripParticipant, TripChange
+from payload_cache import get_trip_cache
+from routes.activities import MAX_BULK_ACTIVITIES, insert_activities, validate_activity_batch
+from sqlalchemy import delete, func, select, tuple_
 from datetime import datetime
+import base64
+import binascii
 import json
 
 trips_bp = Blueprint('trips', __name__)
 
+
+def _parse_people(people):
+    if people is None:
+        return []
+    if not isinstance(people, list):
+        raise ValueError('people must be a list of names.')
+    return [str(name).strip() for name in people if str(name).strip()]
+
+
+def _optional_float(data, key):
+    return float(data.get(key)) if data.get(key) is not None else None
+
+
+def _optional_date(data, key):
+    return datetime.fromisoformat(data[key]).date() if data.get(key) else None
+
+
+def trip_values(data):
+    """Validate a new-trip payload and return the values to build the trip from.
+
+    Round trips without a destination end where they started. ``people`` is
+    returned as a list of names. Raises ``ValueError`` with a user-facing
+    message when the payload is invalid.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Trip must be a JSON object.')
+    if not data.get('name'):
+        raise ValueError('Trip name is required.')
+
+    is_round_trip = bool(data.get('is_round_trip'))
+
+    origin_lat = _optional_float(data, 'origin_lat')
+    origin_lng = _optional_float(data, 'origin_lng')
+    destination_lat = _optional_float(data, 'destination_lat')
+    destination_lng = _optional_float(data, 'destination_lng')
+
+    if origin_lat is None or origin_lng is None:
+        raise ValueError('Origin coordinates are required. Please select a validated place.')
+
+    if (destination_lat is None) != (destination_lng is None):
+        raise ValueError('Destination latitude and longitude must both be provided.')
+
+    origin = data.get('origin') or data.get('origin_place_name')
+    destination = data.get('destination') or data.get('destination_place_name')
+    destination_place_name = data.get('destination_place_name')
+    destination_mapbox_id = data.get('destination_mapbox_id')
+
+    if is_round_trip and destination_lat is None and destination_lng is None:
+        destination_lat = origin_lat
+        destination_lng = origin_lng
+        destination = destination or origin
+        destination_place_name = destination_place_name or data.get('origin_place_name')
+        destination_mapbox_id = destination_mapbox_id or data.get('origin_mapbox_id')
+    elif destination_lat is None or destination_lng is None:
+        raise ValueError('Destination coordinates are required. Please select a validated place.')
+
+    return {
+        'name': data['name'],
+        'origin': origin,
+        'origin_place_name': data.get('origin_place_name'),
+        'origin_lat': origin_lat,
+        'origin_lng': origin_lng,
+        'origin_mapbox_id': data.get('origin_mapbox_id'),
+        'destination': destination,
+        'destination_place_name': destination_place_name,
+        'destination_lat': destination_lat,
+        'destination_lng': destination_lng,
+        'destination_mapbox_id': destination_mapbox_id,
+        'is_round_trip': is_round_trip,
+        'start_date': _optional_date(data, 'start_date'),
+        'end_date': _optional_date(data, 'end_date'),
+        'summary': data.get('summary'),
+        'people': _parse_people(data.get('people', [])),
+        'external_id': data.get('external_id'),
+    }
+
+
 @trips_bp.route('/api/trips', methods=['POST'])
 def create_trip():
     data = request.get_json()
     try:
-        is_round_trip = bool(data.get('is_round_trip'))
-
-        origin_lat = float(data.get('origin_lat')) if data.get('origin_lat') is not None else None
-        origin_lng = float(data.get('origin_lng')) if data.get('origin_lng') is not None else None
-        destination_lat = float(data.get('destination_lat')) if data.get('destination_lat') is not None else None
-        destination_lng = float(data.get('destination_lng')) if data.get('destination_lng') is not None else None
-
-        if origin_lat is None or origin_lng is None:
-            return jsonify({'error': 'Origin coordinates are required. Please select a validated place.'}), 400
-
-        if (destination_lat is None) != (destination_lng is None):
-            return jsonify({'error': 'Destination latitude and longitude must both be provided.'}), 400
-
-        if is_round_trip and destination_lat is None and destination_lng is None:
-            destination_lat = origin_lat
-            destination_lng = origin_lng
-            data.setdefault('destination', data.get('origin') or data.get('origin_place_name'))
-            data.setdefault('destination_place_name', data.get('origin_place_name'))
-            data.setdefault('destination_mapbox_id', data.get('origin_mapbox_id'))
-        elif destination_lat is None or destination_lng is None:
-            return jsonify({'error': 'Destination coordinates are required. Please select a validated place.'}), 400
-
-        new_trip = Trip(
-            name=data['name'],
-            origin=data.get('origin') or data.get('origin_place_name'),
-            origin_place_name=data.get('origin_place_name'),
-            origin_lat=origin_lat,
-            origin_lng=origin_lng,
-            origin_mapbox_id=data.get('origin_mapbox_id'),
-            destination=data.get('destination') or data.get('destination_place_name'),
-            destination_place_name=data.get('destination_place_name'),
-            destination_lat=destination_lat,
-            destination_lng=destination_lng,
-            destination_mapbox_id=data.get('destination_mapbox_id'),
-            is_round_trip=is_round_trip,
-            start_date=datetime.fromisoformat(data['start_date']).date() if data.get('start_date') else None,
-            end_date=datetime.fromisoformat(data['end_date']).date() if data.get('end_date') else None,
-            summary=data.get('summary'),
-            people=json.dumps(data.get('people', []))
-        )
+        values = trip_values(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        activity_items = data.get('activities')
+        activity_rows = []
+        if activity_items is not None:
+            if not isinstance(activity_items, list):
+                return jsonify({'error': 'activities must be a list.'}), 400
+            if len(activity_items) > MAX_BULK_ACTIVITIES:
+                return jsonify({'error': f'At most {MAX_BULK_ACTIVITIES} activities can be created per request.'}), 400
+            activity_rows, errors = validate_activity_batch(activity_items)
+            if errors:
+                return jsonify({'error': 'Some activities are invalid. Nothing was created.', 'errors': errors}), 400
+
+        new_trip = Trip(**values)
         db.session.add(new_trip)
+        # Trip and activities are written in a single transaction.
+        db.session.flush()
+        activities = insert_activities(new_trip.id, activity_rows)
+
+        trip_data = new_trip.to_dict()
+        if activity_items is not None:
+            trip_data['activities'] = [activity.to_dict() for activity in activities]
+        TripChange.record(new_trip.id, new_trip.version, 'trip', new_trip.id, 'create', trip_data)
         db.session.commit()
-        return jsonify(new_trip.to_dict()), 201
+        return jsonify(trip_data), 201
     except Exception as e:
+        db.session.rollback()
         current_app.logger.exception("Failed to create trip")
         return jsonify({'error': 'Unable to create trip. Ensure the database is migrated and request data is valid.', 'details': str(e)}), 500
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _encode_cursor(created_at, trip_id):
+    payload = json.dumps([created_at.isoformat(), trip_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    created_at, trip_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    return datetime.fromisoformat(created_at), int(trip_id)
+
+
+def _parse_fields(raw):
+    requested = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in requested if f not in Trip.FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return requested
+
+
+def _parse_include(raw):
+    include = {item.strip() for item in raw.split(',') if item.strip()}
+    unknown = include - {'activities'}
+    if unknown:
+        raise ValueError(f"Unknown include(s): {', '.join(sorted(unknown))}")
+    return include
+
+
+def _people_by_trip(trip_ids):
+    """Load the participants of a page of trips with one batched query."""
+    grouped = {trip_id: [] for trip_id in trip_ids}
+    if not trip_ids:
+        return grouped
+    rows = db.session.execute(
+        select(TripParticipant.trip_id, TripParticipant.name)
+        .where(TripParticipant.trip_id.in_(trip_ids))
+        .order_by(TripParticipant.trip_id, TripParticipant.position)
+    )
+    for trip_id, name in rows:
+        grouped[trip_id].append(name)
+    return grouped
+
+
+def _activities_by_trip(trip_ids):
+    """Load the activities of a page of trips with one batched query."""
+    grouped = {trip_id: [] for trip_id in trip_ids}
+    if not trip_ids:
+        return grouped
+    serialize = Activity.serializer().row
+    rows = db.session.execute(
+        select(*[getattr(Activity, field) for field in Activity.FIELDS])
+        .where(Activity.trip_id.in_(trip_ids))
+        .order_by(Activity.trip_id, Activity.id)
+    )
+    for row in rows:
+        grouped[row.trip_id].append(serialize(row))
+    return grouped
+
+
+def trip_dicts(*criteria, order_by=(), include_activities=False):
+    """Serialize the matching trips straight from column rows.
+
+    No ORM objects are built: trips, participants and (optionally) activities
+    are read with one query each and turned into dicts by cached plans.
+    """
+    query = select(*[getattr(Trip, field) for field in Trip.COLUMN_FIELDS]).where(*criteria).order_by(*order_by)
+    trips = Trip.serializer(Trip.COLUMN_FIELDS).rows(db.session.execute(query))
+    trip_ids = [trip['id'] for trip in trips]
+    people = _people_by_trip(trip_ids)
+    activities = _activities_by_trip(trip_ids) if include_activities else None
+    for trip in trips:
+        trip['people'] = people[trip['id']]
+        if activities is not None:
+            trip['activities'] = activities[trip['id']]
+    return trips
+
+
 @trips_bp.route('/api/trips', methods=['GET'])
 def get_trips():
-    trips = Trip.query.order_by(Trip.created_at.desc()).all()
-    return jsonify([trip.to_dict() for trip in trips])
+    args = request.args
+    try:
+        include = _parse_include(args.get('include', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    participant_filter = None
+    if args.get('participant'):
+        participant_filter = Trip.id.in_(
+            select(TripParticipant.trip_id).where(TripParticipant.name == args['participant'].strip())
+        )
+
+    if not any(key in args for key in ('limit', 'cursor', 'fields', 'count')):
+        # Legacy, unpaginated response kept for existing clients.
+        criteria = [participant_filter] if participant_filter is not None else []
+        return jsonify(trip_dicts(
+            *criteria,
+            order_by=(Trip.created_at.desc(), Trip.id.desc()),
+            include_activities='activities' in include,
+        ))
+
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer.'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive.'}), 400
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    try:
+        requested = _parse_fields(args['fields']) if args.get('fields') else list(Trip.FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # id and created_at are always selected so the page can be keyset-paginated.
+    selected = ['id', 'created_at'] + [f for f in requested if f in Trip.COLUMN_FIELDS and f not in ('id', 'created_at')]
+
+    query = db.session.query(*[getattr(Trip, f) for f in selected])
+    if participant_filter is not None:
+        query = query.filter(participant_filter)
+    if args.get('cursor'):
+        try:
+            cursor_created_at, cursor_id = _decode_cursor(args['cursor'])
+        except (ValueError, TypeError, binascii.Error):
+            return jsonify({'error': 'Invalid cursor.'}), 400
+        query = query.filter(tuple_(Trip.created_at, Trip.id) < (cursor_created_at, cursor_id))
+
+    # Fetch one extra row to learn whether another page exists without a COUNT.
+    rows = query.order_by(Trip.created_at.desc(), Trip.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    trip_ids = [row.id for row in rows]
+    people = _people_by_trip(trip_ids) if 'people' in requested else None
+    activities = _activities_by_trip(trip_ids) if 'activities' in include else None
+    serialize = Trip.serializer(tuple(selected)).row
+    trips = []
+    for row in rows:
+        item = serialize(row)
+        if people is not None:
+            item['people'] = people[row.id]
+        trip_data = {field: item[field] for field in requested}
+        if activities is not None:
+            trip_data['activities'] = activities[row.id]
+        trips.append(trip_data)
+
+    result = {
+        'trips': trips,
+        'next_cursor': _encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+    }
+    if args.get('count', '').lower() in ('1', 'true', 'yes'):
+        count_query = db.session.query(func.count(Trip.id))
+        if participant_filter is not None:
+            count_query = count_query.filter(participant_filter)
+        result['total'] = count_query.scalar()
+    return jsonify(result)
+
+def _trip_etag(trip_id, version):
+    return f'{trip_id}-{version}'
+
 
 @trips_bp.route('/api/trips/<int:id>', methods=['GET'])
 def get_trip(id):
-    trip = Trip.query.get_or_404(id)
-    trip_data = trip.to_dict()
-    trip_data['activities'] = [activity.to_dict() for activity in trip.activities]
-    return jsonify(trip_data)
+    # Only the version column is read up front; an unchanged trip is answered
+    # from the If-None-Match header or the payload cache without loading it.
+    version = db.session.execute(select(Trip.version).where(Trip.id == id)).scalar()
+    if version is None:
+        abort(404)
+
+    etag = _trip_etag(id, version)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        cache = get_trip_cache(current_app)
+        body = cache.get((id, version))
+        if body is None:
+            trips = trip_dicts(Trip.id == id, include_activities=True)
+            if not trips:
+                abort(404)
+            # Cached under the version read above: if the trip changed in
+            # between, the payload is newer than its key, and that key is
+            # never looked up again once readers see the new version.
+            body = current_app.json.dumps(trips[0]).encode()
+            cache.set((id, version), body)
+        response = current_app.response_class(body, mimetype='application/json')
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @trips_bp.route('/api/trips/<int:id>', methods=['PUT'])
 def update_trip(id):
     trip = Trip.query.get_or_404(id)
     data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Trip must be a JSON object.'}), 400
     try:
+        before = trip.to_dict()
         if 'name' in data: trip.name = data['name']
         if 'origin' in data or 'origin_place_name' in data or 'origin_lat' in data or 'origin_lng' in data:
             o_lat = float(data.get('origin_lat')) if data.get('origin_lat') is not None else None
@@ -114,7 +364,7 @@ def update_trip(id):
         if 'start_date' in data: trip.start_date = datetime.fromisoformat(data['start_date']).date()
         if 'end_date' in data: trip.end_date = datetime.fromisoformat(data['end_date']).date()
         if 'summary' in data: trip.summary = data['summary']
-        if 'people' in data: trip.people = json.dumps(data['people'])
+        if 'people' in data: trip.people = _parse_people(data['people'])
 
         if trip.is_round_trip:
             if trip.origin_lat is None or trip.origin_lng is None:
@@ -129,15 +379,94 @@ def update_trip(id):
             if not trip.destination_mapbox_id:
                 trip.destination_mapbox_id = trip.origin_mapbox_id
 
+        if not TripChange.diff(before, trip.to_dict()):
+            # Nothing changed: keep the version, so ETags, cached payloads
+            # and subscribers are left alone.
+            db.session.rollback()
+            return jsonify(before)
+
+        seq = Trip.bump_version(trip.id)
+        trip_data = trip.to_dict()
+        TripChange.record(trip.id, seq, 'trip', trip.id, 'update', TripChange.diff(before, trip_data))
         db.session.commit()
-        return jsonify(trip.to_dict())
+        get_trip_cache(current_app).invalidate(trip.id)
+        return jsonify(trip_data)
+    except (TypeError, ValueError) as e:
+        # Invalid people, coordinates or dates; nothing is saved.
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.exception("Failed to update trip")
         return jsonify({'error': 'Unable to update trip. Ensure the database is migrated and request data is valid.', 'details': str(e)}), 500
 
 @trips_bp.route('/api/trips/<int:id>', methods=['DELETE'])
 def delete_trip(id):
-    trip = Trip.query.get_or_404(id)
-    db.session.delete(trip)
+    version = db.session.execute(select(Trip.version).where(Trip.id == id)).scalar()
+    if version is None:
+        abort(404)
+    TripChange.record(id, version + 1, 'trip', id, 'delete')
+    # Activities and participants go with it through ON DELETE CASCADE.
+    db.session.execute(delete(Trip).where(Trip.id == id))
     db.session.commit()
+    get_trip_cache(current_app).invalidate(id)
     return jsonify({'message': 'Trip deleted successfully'})
+
+DEFAULT_CHANGES_LIMIT = 100
+MAX_CHANGES_LIMIT = 1000
+
+
+def trip_changes(trip_id, since, limit=DEFAULT_CHANGES_LIMIT):
+    """Changes made to a trip after version ``since``, oldest first.
+
+    At most ``limit`` versions are returned; callers continue from
+    ``next_since``. ``reset`` is true when the log cannot bridge the gap (the
+    trip changed before the log existed, or through the bulk importer): the
+    client should refetch the trip and continue from the version in its ETag.
+    Returns ``None`` for a trip that has neither a row nor a log.
+    """
+    version = db.session.execute(select(Trip.version).where(Trip.id == trip_id)).scalar()
+    if version is None:
+        # A deleted trip keeps its log, which ends with the delete.
+        version = db.session.execute(
+            select(func.max(TripChange.seq)).where(TripChange.trip_id == trip_id)
+        ).scalar()
+        if version is None:
+            return None
+
+    until = min(version, since + limit)
+    rows = []
+    if until > since:
+        rows = db.session.execute(
+            select(*[getattr(TripChange, field) for field in TripChange.FIELDS])
+            .where(TripChange.trip_id == trip_id, TripChange.seq > since, TripChange.seq <= until)
+            .order_by(TripChange.seq, TripChange.id)
+        ).all()
+
+    reset = since > version or len({row.seq for row in rows}) != until - since
+    if reset:
+        rows, until = [], version
+    return {
+        'trip_id': trip_id,
+        'since': since,
+        'version': version,
+        'next_since': until,
+        'has_more': until < version,
+        'reset': reset,
+        'changes': TripChange.serializer().rows(rows),
+    }
+
+
+@trips_bp.route('/api/trips/<int:id>/changes', methods=['GET'])
+def get_trip_changes(id):
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', DEFAULT_CHANGES_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'since and limit must be integers.'}), 400
+    if since < 0 or limit < 1:
+        return jsonify({'error': 'since must not be negative and limit must be positive.'}), 400
+
+    result = trip_changes(id, since, min(limit, MAX_CHANGES_LIMIT))
+    if result is None:
+        abort(404)
+    return jsonify(result)
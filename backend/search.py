@@ -0,0 +1,74 @@
+"""SQLite FTS5 index over trips and activities (see ``routes/search.py``).
+
+Each table has an external-content FTS5 table (``trip_fts``, ``activity_fts``)
+that stores only the index; the text stays in ``trip`` and ``activity``.
+Triggers keep the index in sync on every insert, delete and update of an
+indexed column, so bulk inserts, importer upserts and cascaded deletes are
+covered as well as ORM writes. Updates that only touch other columns (such as
+``Trip.bump_version``) do not reindex anything.
+
+The DDL is shared by ``db.create_all()`` (see models.py) and the
+``add_search_index`` migration.
+"""
+import re
+
+INDEXED_COLUMNS = {
+    'trip': ('name', 'origin', 'destination', 'summary'),
+    'activity': ('name', 'location', 'notes', 'type'),
+}
+MAX_QUERY_TERMS = 10
+
+
+def _table_ddl(table, columns):
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    return [
+        # prefix='2 3' keeps short prefix queries ("par*") on their own index.
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', content_rowid='id',"
+        f" tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN"
+        f" INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN"
+        f" INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN"
+        f" INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});"
+        f" INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+    ]
+
+
+def create_search_index(connection, rebuild=False):
+    """Create the FTS tables and triggers (idempotent); SQLite only.
+
+    ``rebuild`` re-reads every row of the content tables, for databases that
+    already hold data.
+    """
+    for table, columns in INDEXED_COLUMNS.items():
+        for statement in _table_ddl(table, columns):
+            connection.exec_driver_sql(statement)
+        if rebuild:
+            connection.exec_driver_sql(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def create_search_triggers(connection, table):
+    """Recreate the triggers of one table, e.g. after a batch migration rebuilt it."""
+    for statement in _table_ddl(table, INDEXED_COLUMNS[table])[1:]:
+        connection.exec_driver_sql(statement)
+
+
+def drop_search_index(connection):
+    for table in INDEXED_COLUMNS:
+        for suffix in ('ai', 'ad', 'au'):
+            connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in the input are
+    treated as plain text. Returns ``''`` when there is nothing to search for.
+    """
+    terms = re.findall(r'\w+', text)[:MAX_QUERY_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
@@ -0,0 +1,117 @@
+"""JSON provider and row serializers for API payloads.
+
+``JSONProvider`` encodes with orjson when it is installed and falls back to
+Flask's stdlib provider otherwise (or for values orjson rejects), so output is
+the same either way. ``SerializerPlan`` turns a row of selected columns (or a
+model instance) into a dict; plans are built once per ``(model, fields)`` and
+cached, so serializing a listing is one ``zip`` per row plus ``isoformat`` on
+the date columns.
+"""
+from functools import lru_cache
+from operator import attrgetter
+
+from flask.json.provider import DefaultJSONProvider
+
+from metrics import request_timer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when available.
+
+    Keys are sorted and ``compact`` is honoured as with the default provider.
+    datetimes are passed through to Flask's ``default`` so they keep the
+    HTTP-date format Flask uses; payloads built by ``SerializerPlan`` already
+    hold ISO strings. The stdlib path writes compact separators and raw UTF-8
+    like orjson does, so both produce the same bytes (float exponents aside,
+    e.g. ``1e-07`` against ``1e-7``).
+    """
+
+    ensure_ascii = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        backend = app.config.get('JSON_BACKEND', 'auto')
+        self.use_orjson = orjson is not None and backend != 'stdlib'
+
+    def _orjson_options(self, kwargs):
+        options = orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            options |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj, **kwargs):
+        with request_timer('serialize'):
+            return self._dumps_bytes(obj, **kwargs)
+
+    def _dumps_bytes(self, obj, **kwargs):
+        # orjson always writes compact UTF-8; anything else goes to the stdlib.
+        if self.use_orjson and not kwargs.keys() - {'sort_keys', 'indent', 'separators'}:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options(kwargs))
+            except (orjson.JSONEncodeError, TypeError):
+                pass  # e.g. non-string keys or integers beyond 64 bits
+        if not kwargs.get('indent'):
+            kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs).encode()
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode()
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        # Same argument handling as ``flask.jsonify``.
+        if args and kwargs:
+            raise TypeError('app.json.response() takes either args or kwargs, not both')
+        obj = args[0] if len(args) == 1 else (args or kwargs or None)
+        dump_args = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args.setdefault('indent', 2)
+        else:
+            dump_args.setdefault('separators', (',', ':'))
+        return self._app.response_class(
+            self.dumps_bytes(obj, **dump_args) + b'\n', mimetype=self.mimetype
+        )
+
+
+class SerializerPlan:
+    """Serializer for one model and one tuple of fields, in that order."""
+
+    def __init__(self, fields, iso_fields):
+        self.fields = tuple(fields)
+        self._iso_indexes = tuple(i for i, field in enumerate(self.fields) if field in iso_fields)
+        getter = attrgetter(*self.fields)
+        self._getter = getter if len(self.fields) > 1 else (lambda obj: (getter(obj),))
+
+    def row(self, row):
+        """Serialize a sequence of values in ``fields`` order (e.g. a ``Row``)."""
+        if not self._iso_indexes:
+            return dict(zip(self.fields, row))
+        values = list(row)
+        for i in self._iso_indexes:
+            value = values[i]
+            if value is not None:
+                values[i] = value.isoformat()
+        return dict(zip(self.fields, values))
+
+    def rows(self, rows):
+        return [self.row(row) for row in rows]
+
+    def obj(self, obj):
+        """Serialize the ``fields`` attributes of a model instance."""
+        return self.row(self._getter(obj))
+
+
+@lru_cache(maxsize=256)
+def serializer_plan(model, fields):
+    return SerializerPlan(fields, model.ISO_FIELDS)
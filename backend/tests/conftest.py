@@ -0,0 +1,81 @@
+"""Shared fixtures: an app on a throwaway SQLite file and a local Mapbox stand-in."""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from benchmarks.mapbox_stub import MapboxStubServer
+from extensions import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'PLACES_CACHE_PATH': str(tmp_path / 'places_cache.db'),
+        'METRICS_ENABLED': False,
+        'MIGRATIONS_ENABLED': False,
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def mapbox_stub(app, monkeypatch):
+    """Points the app's Mapbox client at a local stub; ``stub.requests`` counts upstream calls."""
+    stub = MapboxStubServer(('127.0.0.1', 0), latency=0).start()
+    app.config['MAPBOX_GEOCODING_URL'] = stub.url
+    monkeypatch.setenv('MAPBOX_ACCESS_TOKEN', 'test-token')
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+@pytest.fixture
+def make_trip(client):
+    """Create a trip through the API and return its JSON; keyword arguments override the defaults."""
+    def make(**fields):
+        payload = {
+            'name': 'Test trip',
+            'origin_place_name': 'Paris, France', 'origin_lat': 48.8566, 'origin_lng': 2.3522,
+            'destination_place_name': 'Lyon, France', 'destination_lat': 45.764, 'destination_lng': 4.8357,
+            'start_date': '2026-05-01', 'end_date': '2026-05-03',
+        }
+        payload.update(fields)
+        response = client.post('/api/trips', json=payload)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()
+    return make
+
+
+@pytest.fixture
+def count_queries(app):
+    """``with count_queries() as statements:`` collects ``(sql, parameters)`` run inside the block.
+
+    Assert on ``len(statements)`` to catch N+1 regressions.
+    """
+    @contextmanager
+    def count():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return count
@@ -0,0 +1,114 @@
+from sqlalchemy import text
+
+from extensions import db
+from routes.activities import MAX_BULK_IDS
+
+
+def _add(client, trip_id, *activities):
+    response = client.post(f'/api/trips/{trip_id}/activities/bulk', json={'activities': list(activities)})
+    assert response.status_code == 201, response.get_json()
+    return [activity['id'] for activity in response.get_json()['activities']]
+
+
+def _version(client, trip_id):
+    return client.get(f'/api/trips/{trip_id}/changes').get_json()['version']
+
+
+def test_selection_payload_is_validated(client, make_trip):
+    trip = make_trip()
+    [activity_id] = _add(client, trip['id'], {'name': 'Museum'})
+    url = f"/api/trips/{trip['id']}/activities"
+    bad_selections = [
+        {},
+        {'ids': [activity_id], 'filter': {}},
+        {'ids': []},
+        {'ids': ['1']},
+        {'ids': [True]},
+        {'ids': list(range(1, MAX_BULK_IDS + 2))},
+        {'filter': []},
+        {'filter': {'colour': 'red'}},
+        {'filter': {'from': 'May'}},
+    ]
+    for selection in bad_selections:
+        assert client.delete(url, json=selection).status_code == 400, selection
+        assert client.patch(url, json=dict(selection, status='done')).status_code == 400, selection
+    assert client.patch(url, json={'ids': [activity_id]}).status_code == 400
+    assert client.patch(url, json={'ids': [activity_id], 'status': 'x' * 21}).status_code == 400
+    assert client.delete('/api/trips/999/activities', json={'ids': [1]}).status_code == 404
+    assert _version(client, trip['id']) == 2
+
+
+def test_date_filter_bounds_are_inclusive(client, make_trip):
+    trip = make_trip()
+    ids = _add(
+        client, trip['id'],
+        {'name': 'Before', 'date': '2026-04-30T23:59:59'},
+        {'name': 'First', 'date': '2026-05-01T00:00:00'},
+        {'name': 'Last', 'date': '2026-05-02T23:59:59'},
+        {'name': 'After', 'date': '2026-05-03T00:00:00'},
+        {'name': 'Undated'},
+    )
+    response = client.patch(f"/api/trips/{trip['id']}/activities",
+                            json={'status': 'booked', 'filter': {'from': '2026-05-01', 'to': '2026-05-02'}})
+    assert response.get_json() == {'updated': 2, 'ids': ids[1:3]}
+
+    response = client.delete(f"/api/trips/{trip['id']}/activities", json={'filter': {'to': '2026-04-30'}})
+    assert response.get_json() == {'deleted': 1, 'ids': ids[:1]}
+
+
+def test_status_update_skips_unchanged_activities(client, make_trip):
+    trip = make_trip()
+    ids = _add(client, trip['id'], {'name': 'A'}, {'name': 'B', 'status': 'done'}, {'name': 'C'})
+    url = f"/api/trips/{trip['id']}/activities"
+    version = _version(client, trip['id'])
+
+    response = client.patch(url, json={'status': 'done', 'ids': ids})
+    assert response.get_json() == {'updated': 2, 'ids': [ids[0], ids[2]]}
+    assert _version(client, trip['id']) == version + 1
+    changes = client.get(f"/api/trips/{trip['id']}/changes?since={version}").get_json()['changes']
+    assert [(c['entity_id'], c['op'], c['data']) for c in changes] == [
+        (ids[0], 'update', {'status': 'done'}), (ids[2], 'update', {'status': 'done'}),
+    ]
+
+    # Nothing left to change: no new version, no log rows.
+    assert client.patch(url, json={'status': 'done', 'filter': {}}).get_json() == {'updated': 0, 'ids': []}
+    assert _version(client, trip['id']) == version + 1
+
+
+def test_bulk_delete_logs_one_row_per_activity(client, make_trip):
+    trip = make_trip()
+    other = make_trip(name='Other')
+    ids = _add(client, trip['id'], {'name': 'A', 'type': 'food'}, {'name': 'B', 'type': 'food'}, {'name': 'C'})
+    [foreign] = _add(client, other['id'], {'name': 'D', 'type': 'food'})
+    version = _version(client, trip['id'])
+
+    response = client.delete(f"/api/trips/{trip['id']}/activities", json={'ids': [ids[0], foreign]})
+    # Ids of another trip's activities are ignored.
+    assert response.get_json() == {'deleted': 1, 'ids': [ids[0]]}
+    response = client.delete(f"/api/trips/{trip['id']}/activities", json={'filter': {'type': 'food'}})
+    assert response.get_json() == {'deleted': 1, 'ids': [ids[1]]}
+
+    changes = client.get(f"/api/trips/{trip['id']}/changes?since={version}").get_json()['changes']
+    assert [(c['seq'], c['entity_id'], c['op']) for c in changes] == [
+        (version + 1, ids[0], 'delete'), (version + 2, ids[1], 'delete'),
+    ]
+    assert [a['name'] for a in client.get(f"/api/trips/{trip['id']}").get_json()['activities']] == ['C']
+    assert len(client.get(f"/api/trips/{other['id']}").get_json()['activities']) == 1
+
+
+def test_deleting_a_trip_cascades_in_the_database(app, client, make_trip):
+    trip = make_trip(name='Cascade trip', people=['Alice', 'Bob'])
+    _add(client, trip['id'], {'name': 'Cascade museum'}, {'name': 'Cascade park'})
+    kept = make_trip(name='Kept trip', people=['Alice'])
+
+    assert client.delete(f"/api/trips/{trip['id']}").status_code == 200
+    with app.app_context():
+        connection = db.session.connection()
+        assert connection.exec_driver_sql('PRAGMA foreign_keys').scalar() == 1
+        count = lambda sql: connection.execute(text(sql), {'id': trip['id']}).scalar()
+        assert count('SELECT COUNT(*) FROM activity WHERE trip_id = :id') == 0
+        assert count('SELECT COUNT(*) FROM trip_participant WHERE trip_id = :id') == 0
+        assert count('SELECT COUNT(*) FROM trip_participant') == 1
+        assert count("SELECT COUNT(*) FROM activity_fts WHERE activity_fts MATCH 'cascade'") == 0
+        assert count("SELECT COUNT(*) FROM trip_fts WHERE trip_fts MATCH 'cascade'") == 0
+    assert client.get('/api/search?q=kept').get_json()['results'][0]['id'] == kept['id']
@@ -0,0 +1,162 @@
+"""The ASGI entry point: async handlers must not block the event loop or take bridge threads."""
+import asyncio
+import importlib
+import json
+import threading
+
+import pytest
+
+from benchmarks.mapbox_stub import MapboxStubServer
+from events import get_event_broker
+from extensions import db
+from place_cache import get_place_cache
+
+
+@pytest.fixture
+def asgi(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'test.db'))
+    monkeypatch.setenv('PLACES_CACHE_PATH', str(tmp_path / 'places_cache.db'))
+    monkeypatch.setenv('METRICS_ENABLED', 'false')
+    # A single bridge thread: a stream that held one would block every other request.
+    monkeypatch.setenv('ASGI_WSGI_WORKERS', '1')
+    module = importlib.reload(importlib.import_module('asgi'))
+    with module.app.app_context():
+        db.create_all()
+    yield module
+    with module.app.app_context():
+        db.engine.dispose()
+
+
+def scope(method, path, query=b'', headers=()):
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+        'method': method, 'path': path, 'raw_path': path.encode(), 'query_string': query, 'root_path': '',
+        'headers': [(b'host', b'testserver'), *headers], 'server': ('testserver', 80), 'client': ('127.0.0.1', 1),
+    }
+
+
+async def call(application, method, path, payload=None, query=b''):
+    """Send one request and return ``(status, body)``."""
+    body = json.dumps(payload).encode() if payload is not None else b''
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    requested = asyncio.Event()
+    messages = []
+
+    async def receive():
+        if not requested.is_set():
+            requested.set()
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await asyncio.wait_for(application(scope(method, path, query, headers), receive, send), timeout=10)
+    return messages[0]['status'], b''.join(m.get('body', b'') for m in messages[1:])
+
+
+class Stream:
+    """An open ``/events`` request; ``frames`` receives each body chunk as text."""
+
+    def __init__(self, application, path, query=b''):
+        self.frames = asyncio.Queue()
+        self.status = None
+        self._disconnect = asyncio.Event()
+        self._requested = False
+        self.task = asyncio.ensure_future(application(scope('GET', path, query), self._receive, self._send))
+
+    async def _receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self._disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def _send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif message.get('body'):
+            await self.frames.put(message['body'].decode())
+
+    async def next_event(self):
+        while True:
+            frame = await asyncio.wait_for(self.frames.get(), timeout=5)
+            if frame.startswith('event:'):
+                return frame
+
+    async def close(self):
+        self._disconnect.set()
+        await asyncio.wait_for(self.task, timeout=5)
+
+
+def test_open_streams_do_not_hold_bridge_threads(asgi):
+    async def scenario():
+        application = asgi.application
+        status, body = await call(application, 'POST', '/api/trips', {
+            'name': 'Live', 'origin_place_name': 'Paris, France', 'origin_lat': 48.8566, 'origin_lng': 2.3522,
+            'destination_place_name': 'Lyon, France', 'destination_lat': 45.764, 'destination_lng': 4.8357,
+            'start_date': '2026-05-01', 'end_date': '2026-05-03',
+        })
+        assert status == 201
+        trip_id = json.loads(body)['id']
+
+        streams = [Stream(application, f'/api/trips/{trip_id}/events') for _ in range(3)]
+        for stream in streams:
+            assert (await stream.next_event()).startswith('event: ready')
+        assert all(stream.status == 200 for stream in streams)
+
+        # Would wait forever for the only bridge thread if the streams held it.
+        status, _ = await call(application, 'PUT', f'/api/trips/{trip_id}', {'name': 'Renamed'})
+        assert status == 200
+        for stream in streams:
+            event = await stream.next_event()
+            assert event.startswith('event: change\nid: 2\n')
+            assert '"Renamed"' in event
+
+        for stream in streams:
+            await stream.close()
+        assert get_event_broker(asgi.app).subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_stream_errors_match_the_flask_route(asgi):
+    async def scenario():
+        application = asgi.application
+        missing = Stream(application, '/api/trips/999/events')
+        await asyncio.wait_for(missing.task, timeout=5)
+        assert missing.status == 404
+
+        invalid = Stream(application, '/api/trips/1/events', query=b'since=abc')
+        await asyncio.wait_for(invalid.task, timeout=5)
+        assert invalid.status == 400
+        assert get_event_broker(asgi.app).subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_place_cache_is_used_off_the_event_loop(asgi, monkeypatch):
+    stub = MapboxStubServer(('127.0.0.1', 0), latency=0).start()
+    asgi.app.config['MAPBOX_GEOCODING_URL'] = stub.url
+    monkeypatch.setenv('MAPBOX_ACCESS_TOKEN', 'test-token')
+    cache = get_place_cache(asgi.app)
+    calls = []
+    for name in ('get', 'set'):
+        def record(*args, _method=getattr(cache, name), _name=name):
+            calls.append((_name, threading.current_thread() is threading.main_thread()))
+            return _method(*args)
+        monkeypatch.setattr(cache, name, record)
+
+    async def scenario():
+        status, _ = await call(asgi.application, 'GET', '/api/places/search', query=b'query=paris')
+        assert status == 200
+        status, _ = await call(asgi.application, 'POST', '/api/places/batch', {'queries': ['paris', 'lyon']})
+        assert status == 200
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        stub.shutdown()
+        stub.server_close()
+    assert {name for name, _ in calls} == {'get', 'set'}
+    assert not any(on_loop for _, on_loop in calls)
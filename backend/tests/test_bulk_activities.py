@@ -0,0 +1,95 @@
+from routes.activities import MAX_BULK_ACTIVITIES
+
+
+def _trip_payload(**fields):
+    payload = {
+        'name': 'Bulk trip',
+        'origin_place_name': 'Paris, France', 'origin_lat': 48.8566, 'origin_lng': 2.3522,
+        'destination_place_name': 'Lyon, France', 'destination_lat': 45.764, 'destination_lng': 4.8357,
+    }
+    payload.update(fields)
+    return payload
+
+
+def test_trip_with_activities_is_created_atomically(client):
+    activities = [{'name': f'Stop {i}', 'date': f'2026-05-0{i + 1}T10:00:00'} for i in range(3)]
+    response = client.post('/api/trips', json=_trip_payload(activities=activities))
+    assert response.status_code == 201
+    trip = response.get_json()
+    ids = [activity['id'] for activity in trip['activities']]
+    assert [activity['name'] for activity in trip['activities']] == ['Stop 0', 'Stop 1', 'Stop 2']
+    assert ids == sorted(ids)
+    assert [a['id'] for a in client.get(f"/api/trips/{trip['id']}").get_json()['activities']] == ids
+
+
+def test_invalid_embedded_activity_creates_nothing(client):
+    activities = [{'name': 'Fine'}, {'date': '2026-05-01'}, {'name': 'Bad date', 'date': 'soon'}]
+    response = client.post('/api/trips', json=_trip_payload(activities=activities))
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['error'] == 'Some activities are invalid. Nothing was created.'
+    assert [error['index'] for error in body['errors']] == [1, 2]
+    assert body['errors'][0]['error'] == 'Activity name is required.'
+    assert client.get('/api/trips').get_json() == []
+
+    too_many = [{'name': 'Stop'}] * (MAX_BULK_ACTIVITIES + 1)
+    assert client.post('/api/trips', json=_trip_payload(activities=too_many)).status_code == 400
+    assert client.post('/api/trips', json=_trip_payload(activities={'name': 'x'})).status_code == 400
+    assert client.get('/api/trips').get_json() == []
+
+
+def test_bulk_add_returns_ids_in_input_order(client, make_trip):
+    trip = make_trip()
+    names = ['Zoo', 'Aquarium', 'Market', 'Bakery']
+    response = client.post(f"/api/trips/{trip['id']}/activities/bulk",
+                           json={'activities': [{'name': name} for name in names]})
+    assert response.status_code == 201
+    created = response.get_json()['activities']
+    assert [activity['name'] for activity in created] == names
+    assert [activity['id'] for activity in created] == sorted(activity['id'] for activity in created)
+    changes = client.get(f"/api/trips/{trip['id']}/changes").get_json()['changes']
+    assert [c['entity_id'] for c in changes if c['entity'] == 'activity'] == [a['id'] for a in created]
+    # A plain list works as well as {"activities": [...]}.
+    assert client.post(f"/api/trips/{trip['id']}/activities/bulk", json=[{'name': 'Park'}]).status_code == 201
+
+
+def test_invalid_bulk_add_rolls_back_the_whole_batch(client, make_trip):
+    trip = make_trip()
+    url = f"/api/trips/{trip['id']}/activities/bulk"
+    response = client.post(url, json={'activities': [{'name': 'Fine'}, {'name': 'Half', 'location_lat': 1}]})
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [
+        {'index': 1, 'error': 'Location latitude and longitude must both be provided.'},
+    ]
+    assert client.post(url, json={'activities': []}).status_code == 400
+    assert client.post(url, json={'activities': [{'name': 'Stop'}] * (MAX_BULK_ACTIVITIES + 1)}).status_code == 400
+    assert client.post('/api/trips/999/activities/bulk', json=[{'name': 'Stop'}]).status_code == 404
+
+    detail = client.get(f"/api/trips/{trip['id']}").get_json()
+    assert detail['activities'] == []
+    assert client.get(f"/api/trips/{trip['id']}/changes").get_json()['version'] == 1
+
+
+def test_duplicate_external_ids_are_item_errors(client, make_trip):
+    trip = make_trip()
+    url = f"/api/trips/{trip['id']}/activities/bulk"
+    response = client.post(url, json=[
+        {'name': 'A', 'external_id': 'a'}, {'name': 'B', 'external_id': 'a'}, {'name': 'C'},
+    ])
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [{'index': 1, 'error': "Duplicate external_id 'a' in this batch."}]
+
+    assert client.post(url, json=[{'name': 'A', 'external_id': 'a'}]).status_code == 201
+    response = client.post(url, json=[{'name': 'B', 'external_id': 'b'}, {'name': 'A again', 'external_id': 'a'}])
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [{'index': 1, 'error': "An activity with external_id 'a' already exists."}]
+
+    # The same external id is fine on another trip.
+    other = make_trip(name='Other')
+    assert client.post(f"/api/trips/{other['id']}/activities/bulk", json=[{'name': 'A', 'external_id': 'a'}]).status_code == 201
+
+    response = client.post('/api/trips', json=_trip_payload(activities=[
+        {'name': 'A', 'external_id': 'x'}, {'name': 'B', 'external_id': 'x'},
+    ]))
+    assert response.status_code == 400
+    assert response.get_json()['errors'][0]['index'] == 1
@@ -0,0 +1,93 @@
+"""GET /api/trips/<id>/calendar and /calendar/<date>: per-day counts and day bounds."""
+import pytest
+
+
+@pytest.fixture
+def trip_id(client, make_trip):
+    trip = make_trip(start_date='2026-05-01', end_date='2026-05-03')
+    response = client.post(f"/api/trips/{trip['id']}/activities/bulk", json=[
+        {'name': 'Night before', 'date': '2026-04-30T23:59:59'},
+        {'name': 'Midnight', 'date': '2026-05-01T00:00:00', 'status': 'booked', 'type': 'food'},
+        {'name': 'Museum', 'date': '2026-05-01T10:00:00', 'status': 'booked', 'type': 'sight'},
+        {'name': 'Lunch', 'date': '2026-05-01T12:30:00'},
+        {'name': 'Late show', 'date': '2026-05-03T23:59:59', 'status': 'done', 'type': 'sight'},
+        {'name': 'Day after', 'date': '2026-05-04T00:00:00'},
+        {'name': 'Someday'},
+        {'name': 'Maybe'},
+    ])
+    assert response.status_code == 201, response.get_json()
+    return trip['id']
+
+
+def test_days_are_counted_within_the_trip_dates(client, trip_id):
+    body = client.get(f'/api/trips/{trip_id}/calendar').get_json()
+
+    assert (body['from'], body['to']) == ('2026-05-01', '2026-05-03')
+    assert body['days'] == [
+        {'date': '2026-05-01', 'count': 3,
+         'by_status': {'booked': 2, 'planned': 1}, 'by_type': {'food': 1, 'sight': 1, 'unspecified': 1}},
+        {'date': '2026-05-03', 'count': 1, 'by_status': {'done': 1}, 'by_type': {'sight': 1}},
+    ]
+    assert body['undated'] == 2
+
+
+def test_range_bounds_include_whole_days(client, trip_id):
+    body = client.get(f'/api/trips/{trip_id}/calendar?from=2026-04-30&to=2026-05-04').get_json()
+    assert [(day['date'], day['count']) for day in body['days']] == [
+        ('2026-04-30', 1), ('2026-05-01', 3), ('2026-05-03', 1), ('2026-05-04', 1),
+    ]
+
+    body = client.get(f'/api/trips/{trip_id}/calendar?from=2026-05-03&to=2026-05-03').get_json()
+    assert [(day['date'], day['count']) for day in body['days']] == [('2026-05-03', 1)]
+    assert client.get(f'/api/trips/{trip_id}/calendar?from=2026-05-02&to=2026-05-02').get_json()['days'] == []
+
+
+@pytest.mark.parametrize('query, error', [
+    ('from=2026-13-01', 'from must be a date (YYYY-MM-DD).'),
+    ('to=soon', 'to must be a date (YYYY-MM-DD).'),
+    ('from=2026-05-03&to=2026-05-01', 'to must not be before from.'),
+    ('from=2026-01-01&to=2027-01-02', 'At most 366 days can be requested at once.'),
+])
+def test_invalid_ranges_are_rejected(client, trip_id, query, error):
+    response = client.get(f'/api/trips/{trip_id}/calendar?{query}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+def test_undated_trip_needs_a_range(client, make_trip):
+    trip = make_trip(start_date=None, end_date=None)
+    assert client.get(f"/api/trips/{trip['id']}/calendar").status_code == 400
+    response = client.get(f"/api/trips/{trip['id']}/calendar?from=2026-05-01&to=2026-05-02")
+    assert response.status_code == 200
+    assert response.get_json()['days'] == []
+
+
+def test_missing_trip_is_404(client):
+    assert client.get('/api/trips/999/calendar').status_code == 404
+    assert client.get('/api/trips/999/calendar/2026-05-01').status_code == 404
+
+
+def test_calendar_etag_follows_the_version_and_range(client, trip_id):
+    response = client.get(f'/api/trips/{trip_id}/calendar')
+    etag = response.headers['ETag']
+    headers = {'If-None-Match': etag}
+    assert client.get(f'/api/trips/{trip_id}/calendar', headers=headers).status_code == 304
+    assert client.get(f'/api/trips/{trip_id}/calendar?to=2026-05-02', headers=headers).status_code == 200
+
+    client.post(f'/api/trips/{trip_id}/activities', json={'name': 'Walk', 'date': '2026-05-02T09:00:00'})
+    response = client.get(f'/api/trips/{trip_id}/calendar', headers=headers)
+    assert response.status_code == 200
+    assert [day['date'] for day in response.get_json()['days']] == ['2026-05-01', '2026-05-02', '2026-05-03']
+
+
+def test_day_lists_its_activities_in_time_order(client, trip_id):
+    body = client.get(f'/api/trips/{trip_id}/calendar/2026-05-01').get_json()
+    assert body['date'] == '2026-05-01'
+    assert [a['name'] for a in body['activities']] == ['Midnight', 'Museum', 'Lunch']
+    assert [a['name'] for a in client.get(f'/api/trips/{trip_id}/calendar/2026-05-03').get_json()['activities']] == [
+        'Late show',
+    ]
+
+    response = client.get(f'/api/trips/{trip_id}/calendar/May-1')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'date must be a date (YYYY-MM-DD).'}
@@ -0,0 +1,36 @@
+def changes(client, trip_id, since=0):
+    response = client.get(f'/api/trips/{trip_id}/changes?since={since}')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_change_log_follows_each_mutation(client, make_trip):
+    trip = make_trip()
+    activity = client.post(f"/api/trips/{trip['id']}/activities", json={'name': 'Museum'}).get_json()
+    client.put(f"/api/activities/{activity['id']}", json={'status': 'booked'})
+
+    log = changes(client, trip['id'])
+    assert [(c['seq'], c['entity'], c['op']) for c in log['changes']] == [
+        (1, 'trip', 'create'), (2, 'activity', 'create'), (3, 'activity', 'update'),
+    ]
+    assert log['changes'][2]['data'] == {'status': 'booked'}
+    assert changes(client, trip['id'], since=3)['changes'] == []
+
+
+def test_recreated_trip_starts_with_its_own_log(client, make_trip):
+    old = make_trip(name='Old trip')
+    client.post(f"/api/trips/{old['id']}/activities", json={'name': 'Museum'})
+    client.delete(f"/api/trips/{old['id']}")
+
+    new = make_trip(name='New trip')
+    log = changes(client, new['id'])
+    assert [(c['seq'], c['entity'], c['op']) for c in log['changes']] == [(1, 'trip', 'create')]
+    assert log['changes'][0]['data']['name'] == 'New trip'
+    assert log['reset'] is False
+
+    # The deleted trip's log stays readable and ends with the delete.
+    old_log = changes(client, old['id'])
+    assert [(c['entity'], c['op']) for c in old_log['changes']] == [
+        ('trip', 'create'), ('activity', 'create'), ('trip', 'delete'),
+    ]
+    assert old_log['changes'][0]['data']['name'] == 'Old trip'
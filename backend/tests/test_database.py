@@ -0,0 +1,61 @@
+"""SQLite runs in WAL mode with a busy timeout: readers never wait for a writer."""
+import threading
+import time
+
+from sqlalchemy import insert, text
+
+from extensions import db
+from models import Trip
+
+
+def hold_write_transaction(app, started, release):
+    """Insert a trip and keep the transaction open until ``release`` is set."""
+    with app.app_context():
+        with db.engine.connect() as connection:
+            connection.execute(insert(Trip).values(name='Pending'))
+            started.set()
+            release.wait(10)
+            connection.commit()
+
+
+def test_connection_pragmas(app):
+    with app.app_context(), db.engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+        assert connection.execute(text('PRAGMA foreign_keys')).scalar() == 1
+
+
+def test_read_proceeds_during_long_write(app, client, make_trip):
+    make_trip(name='Committed')
+    started, release = threading.Event(), threading.Event()
+    writer = threading.Thread(target=hold_write_transaction, args=(app, started, release))
+    writer.start()
+    try:
+        assert started.wait(5)
+        began = time.monotonic()
+        response = client.get('/api/trips')
+        assert time.monotonic() - began < 1
+        assert writer.is_alive()  # still uncommitted while the read completed
+        assert response.status_code == 200
+        assert [trip['name'] for trip in response.get_json()] == ['Committed']
+    finally:
+        release.set()
+        writer.join()
+    assert {trip['name'] for trip in client.get('/api/trips').get_json()} == {'Committed', 'Pending'}
+
+
+def test_second_writer_waits_instead_of_failing(app, client):
+    started, release = threading.Event(), threading.Event()
+    writer = threading.Thread(target=hold_write_transaction, args=(app, started, release))
+    writer.start()
+    assert started.wait(5)
+    threading.Timer(0.3, release.set).start()
+    try:
+        response = client.post('/api/trips', json={
+            'name': 'Second', 'origin_place_name': 'Paris', 'origin_lat': 48.85, 'origin_lng': 2.35,
+            'destination_place_name': 'Lyon', 'destination_lat': 45.76, 'destination_lng': 4.84,
+        })
+    finally:
+        release.set()
+        writer.join()
+    assert response.status_code == 201, response.get_json()
@@ -0,0 +1,126 @@
+"""GET /api/export: streamed NDJSON and CSV, and the updated_since watermark."""
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import update
+
+import routes.export
+from extensions import db
+from models import Trip
+
+NOTES = 'Bring cash, cards\nand a "good" umbrella'
+
+
+def _export(client, query=''):
+    response = client.get(f'/api/export{query}')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response
+
+
+def _set_updated_at(app, trip_id, value):
+    with app.app_context():
+        db.session.execute(update(Trip).where(Trip.id == trip_id).values(updated_at=value))
+        db.session.commit()
+
+
+def test_ndjson_has_one_trip_per_line(client, make_trip):
+    first = make_trip(name='First', people=['Ana', 'Ben'])
+    second = make_trip(name='Second')
+    client.post(f"/api/trips/{first['id']}/activities", json={'name': 'Museum', 'notes': NOTES})
+
+    response = _export(client)
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=co_planet_export.ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    trips = {trip['id']: trip for trip in map(json.loads, lines)}
+
+    # Ordered by updated_at: adding the activity moved the first trip last.
+    assert list(trips) == [second['id'], first['id']]
+    assert trips[first['id']]['people'] == ['Ana', 'Ben']
+    assert [(a['name'], a['notes']) for a in trips[first['id']]['activities']] == [('Museum', NOTES)]
+    assert trips[second['id']]['activities'] == []
+    assert {key: value for key, value in trips[second['id']].items() if key != 'activities'} == second
+
+
+def test_export_is_streamed_in_batches(client, make_trip, monkeypatch):
+    monkeypatch.setattr(routes.export, 'EXPORT_BATCH_SIZE', 2)
+    for i in range(5):
+        make_trip(name=f'Trip {i}')
+
+    response = client.get('/api/export', buffered=False)
+    assert response.is_streamed
+    chunks = [chunk.decode() for chunk in response.response]
+    response.close()
+    assert [chunk.count('\n') for chunk in chunks] == [2, 2, 1]
+
+    response = client.get('/api/export?format=csv', buffered=False)
+    chunks = [chunk.decode() for chunk in response.response]
+    response.close()
+    # The header goes out with the first batch.
+    assert [len(list(csv.reader(io.StringIO(chunk)))) for chunk in chunks] == [3, 2, 1]
+
+
+def test_csv_quotes_separators_and_newlines(client, make_trip):
+    trip = make_trip(name='Paris, again', people=['Ana; Bo', 'Cy "C"'])
+    empty = make_trip(name='Nothing planned')
+    for name in ('Louvre, then lunch', 'Night walk'):
+        client.post(f"/api/trips/{trip['id']}/activities", json={'name': name, 'notes': NOTES})
+
+    response = _export(client, '?format=csv')
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=co_planet_export.csv'
+    header, *rows = csv.reader(io.StringIO(response.get_data(as_text=True)))
+    assert tuple(header) == routes.export.CSV_HEADER
+    rows = [dict(zip(header, row)) for row in rows]
+
+    assert [(row['trip_name'], row['activity_name']) for row in rows] == [
+        ('Nothing planned', ''), ('Paris, again', 'Louvre, then lunch'), ('Paris, again', 'Night walk'),
+    ]
+    assert rows[1]['activity_notes'] == rows[2]['activity_notes'] == NOTES
+    assert json.loads(rows[1]['trip_people']) == ['Ana; Bo', 'Cy "C"']
+    assert json.loads(rows[0]['trip_people']) == []
+    assert rows[0]['trip_id'] == str(empty['id'])
+    assert all(rows[0][f'activity_{field}'] == '' for field in routes.export.CSV_ACTIVITY_FIELDS)
+
+
+def test_updated_since_filters_on_updated_at(app, client, make_trip):
+    old = make_trip(name='Old')
+    recent = make_trip(name='Recent')
+    _set_updated_at(app, old['id'], datetime(2026, 1, 1, 12, 0))
+    _set_updated_at(app, recent['id'], datetime(2026, 3, 1, 12, 0))
+
+    def exported(since):
+        lines = _export(client, f'?updated_since={since}').get_data(as_text=True).splitlines()
+        return [json.loads(line)['name'] for line in lines]
+
+    assert exported('2026-01-01T12:00:00') == ['Old', 'Recent']
+    assert exported('2026-01-01T12:00:01') == ['Recent']
+    assert exported('2026-03-01T12:00:00') == ['Recent']
+    assert exported('2026-03-02') == []
+    # Offsets are converted to the stored UTC time.
+    assert exported('2026-03-01T14:00:00%2B02:00') == ['Recent']
+    assert exported('2026-03-01T13:00:00%2B00:00') == []
+
+    # An activity change moves the trip past the watermark.
+    client.post(f"/api/trips/{old['id']}/activities", json={'name': 'Museum'})
+    assert exported('2026-03-02') == ['Old']
+
+
+def test_deleted_trips_are_not_exported(client, make_trip):
+    gone = make_trip(name='Gone')
+    make_trip(name='Kept')
+    client.delete(f"/api/trips/{gone['id']}")
+
+    lines = _export(client).get_data(as_text=True).splitlines()
+    assert [json.loads(line)['name'] for line in lines] == ['Kept']
+    changes = client.get(f"/api/trips/{gone['id']}/changes").get_json()['changes']
+    assert (changes[-1]['entity'], changes[-1]['op']) == ('trip', 'delete')
+
+
+def test_invalid_parameters_are_rejected(client):
+    assert client.get('/api/export?format=xml').status_code == 400
+    response = client.get('/api/export?updated_since=yesterday')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'updated_since must be an ISO 8601 datetime.'}
@@ -0,0 +1,83 @@
+import json
+
+from extensions import db
+from models import Activity, Trip
+
+TRIP = {
+    'name': 'Imported', 'origin_place_name': 'Paris', 'origin_lat': 48.85, 'origin_lng': 2.35,
+    'destination_place_name': 'Lyon', 'destination_lat': 45.76, 'destination_lng': 4.84,
+}
+
+
+def import_body(client, body, file_format='ndjson'):
+    response = client.post(f'/api/import?format={file_format}', data=body.encode())
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def ndjson(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+def test_repeated_external_id_in_one_batch_last_wins(app, client):
+    report = import_body(client, ndjson(
+        dict(TRIP, external_id='x1', people=['A', 'B'], activities=[{'name': 'Louvre', 'external_id': 'a1'}]),
+        dict(TRIP, external_id='x1', name='Renamed', people=['C'],
+             activities=[{'name': 'Louvre at night', 'external_id': 'a1'}, {'name': 'Walk'}]),
+    ))
+    assert report['trips_created'] == 1
+    assert report['trips_updated'] == 0
+    assert report['activities_created'] == 2
+    assert report['error_count'] == 0
+
+    trips = client.get('/api/trips?include=activities').get_json()
+    assert len(trips) == 1
+    assert trips[0]['name'] == 'Renamed'
+    assert trips[0]['people'] == ['C']
+    assert sorted(activity['name'] for activity in trips[0]['activities']) == ['Louvre at night', 'Walk']
+
+
+def test_repeated_external_id_matches_separate_batches(app, client):
+    records = ndjson(
+        dict(TRIP, external_id='x1', people=['A', 'B'], activities=[{'name': 'Louvre', 'external_id': 'a1'}]),
+        dict(TRIP, external_id='x1', people=['C'], activities=[{'name': 'Louvre', 'external_id': 'a1'}]),
+    )
+    response = client.post('/api/import?format=ndjson&batch_size=1', data=records.encode()).get_json()
+    assert (response['activities_created'], response['activities_updated']) == (1, 1)
+    with app.app_context():
+        assert db.session.query(Activity).count() == 1
+        assert db.session.query(Trip).one().people == ['C']
+
+
+def test_csv_empty_status_defaults_to_planned(client):
+    body = (
+        'trip_external_id,trip_name,trip_origin_place_name,trip_origin_lat,trip_origin_lng,'
+        'trip_destination_place_name,trip_destination_lat,trip_destination_lng,activity_name,activity_status\n'
+        'x1,Imported,Paris,48.85,2.35,Lyon,45.76,4.84,Louvre,\n'
+        'x1,Imported,Paris,48.85,2.35,Lyon,45.76,4.84,Walk,booked\n'
+    )
+    assert import_body(client, body, 'csv')['activities_created'] == 2
+    activities = client.get('/api/trips?include=activities').get_json()[0]['activities']
+    assert {activity['name']: activity['status'] for activity in activities} == {'Louvre': 'planned', 'Walk': 'booked'}
+
+
+def test_csv_export_import_round_trip_keeps_people(client, make_trip):
+    people = ['Smith; John', 'Ann, "Nan"', 'Zoë']
+    trip = make_trip(people=people)
+    client.post(f"/api/trips/{trip['id']}/activities", json={'name': 'Museum'})
+    exported = client.get('/api/export?format=csv').get_data(as_text=True)
+
+    client.delete(f"/api/trips/{trip['id']}")
+    assert import_body(client, exported, 'csv')['trips_created'] == 1
+    (imported,) = client.get('/api/trips?include=activities').get_json()
+    assert imported['people'] == people
+    assert [activity['name'] for activity in imported['activities']] == ['Museum']
+
+
+def test_csv_people_may_be_semicolon_separated(client):
+    body = (
+        'trip_name,trip_origin_place_name,trip_origin_lat,trip_origin_lng,trip_is_round_trip,trip_people\n'
+        'Hand written,Paris,48.85,2.35,true,Ann;Ben\n'
+    )
+    assert import_body(client, body, 'csv')['trips_created'] == 1
+    assert client.get('/api/trips').get_json()[0]['people'] == ['Ann', 'Ben']
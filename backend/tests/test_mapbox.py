@@ -0,0 +1,166 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mapbox import AsyncMapboxClient, CircuitBreaker, MapboxClient, MapboxError, MapboxUnavailable, SingleFlight
+
+
+def test_read_timeout_is_not_retried(mapbox_stub):
+    mapbox_stub.latency = 1.0
+    client = MapboxClient(base_url=mapbox_stub.url, timeout=0.2, retries=2, backoff=0)
+
+    started = time.monotonic()
+    with pytest.raises(MapboxError):
+        client.search('Slow', 'token', 'place', 5)
+    assert time.monotonic() - started < 0.8
+    assert mapbox_stub.requests == 1
+    assert client.breaker._failures == 1
+
+
+def test_async_read_timeout_is_not_retried(mapbox_stub):
+    mapbox_stub.latency = 1.0
+
+    async def search():
+        client = AsyncMapboxClient(base_url=mapbox_stub.url, timeout=0.2, retries=2, backoff=0)
+        try:
+            with pytest.raises(MapboxError):
+                await client.search('Slow', 'token', 'place', 5)
+        finally:
+            await client.aclose()
+
+    started = time.monotonic()
+    asyncio.run(search())
+    assert time.monotonic() - started < 0.8
+    assert mapbox_stub.requests == 1
+
+
+def test_connection_errors_are_retried(mapbox_stub):
+    url = mapbox_stub.url
+    mapbox_stub.shutdown()
+    mapbox_stub.server_close()
+    client = MapboxClient(base_url=url, timeout=0.2, retries=2, backoff=0)
+    with pytest.raises(MapboxError, match='Max retries exceeded'):
+        client.search('Down', 'token', 'place', 5)
+
+
+def _search_concurrently(client, query, callers=5):
+    """Run ``callers`` identical searches at once; return each result or raised error."""
+    def search():
+        try:
+            return client.search(query, 'token', 'place', 5)
+        except MapboxError as e:
+            return e
+
+    with ThreadPoolExecutor(callers) as pool:
+        return list(pool.map(lambda _: search(), range(callers)))
+
+
+def test_concurrent_identical_searches_share_one_call(mapbox_stub):
+    mapbox_stub.latency = 0.3
+    client = MapboxClient(base_url=mapbox_stub.url, retries=0)
+
+    results = _search_concurrently(client, 'Paris')
+
+    assert mapbox_stub.requests == 1
+    assert all(result == results[0] for result in results)
+    assert results[0][0]['text'] == 'Paris 0'
+
+
+def test_concurrent_identical_searches_share_one_error(mapbox_stub):
+    mapbox_stub.latency = 0.3
+    mapbox_stub.status = 500
+    client = MapboxClient(base_url=mapbox_stub.url, retries=0)
+
+    errors = _search_concurrently(client, 'Paris')
+
+    assert mapbox_stub.requests == 1
+    assert all(isinstance(error, MapboxError) for error in errors)
+    assert len({id(error) for error in errors}) == 1
+    assert client.breaker._failures == 1
+
+
+def test_single_flight_runs_again_once_the_call_finishes():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return len(calls)
+
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(flights.do, 'key', fetch) for _ in range(3)]
+        while not calls:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        release.set()
+        assert [future.result() for future in futures] == [1, 1, 1]
+    assert flights.do('key', fetch) == 2
+
+
+def test_breaker_opens_after_threshold_consecutive_failures():
+    breaker = CircuitBreaker(threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_breaker_allows_one_half_open_trial_and_closes_on_success():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_half_open_trial_reopens_the_breaker():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_server_errors_open_the_breaker(mapbox_stub):
+    mapbox_stub.status = 500
+    client = MapboxClient(base_url=mapbox_stub.url, retries=0, breaker_threshold=2)
+    for _ in range(2):
+        with pytest.raises(MapboxError):
+            client.search('Paris', 'token', 'place', 5)
+
+    with pytest.raises(MapboxUnavailable):
+        client.search('Paris', 'token', 'place', 5)
+    assert mapbox_stub.requests == 2
+
+
+def test_client_errors_do_not_trip_the_breaker(mapbox_stub):
+    mapbox_stub.status = 401
+    client = MapboxClient(base_url=mapbox_stub.url, retries=0, breaker_threshold=2)
+    for _ in range(4):
+        with pytest.raises(MapboxError) as excinfo:
+            client.search('Paris', 'token', 'place', 5)
+        assert not isinstance(excinfo.value, MapboxUnavailable)
+
+    assert mapbox_stub.requests == 4
+    assert client.breaker.state == 'closed'
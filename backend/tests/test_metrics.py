@@ -0,0 +1,143 @@
+"""GET /metrics exposition, Server-Timing headers and the slow-query log."""
+import logging
+import re
+
+import pytest
+
+from app import create_app
+from extensions import db
+from metrics import Counter, Histogram, get_metrics
+
+# One sample line of the Prometheus text format: name, optional labels, value.
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\\n]|\\[\\"n])*",?)*\})? \S+$')
+
+
+@pytest.fixture
+def metrics_app(tmp_path):
+    def make(**config):
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'metrics.db'),
+            'PLACES_CACHE_PATH': str(tmp_path / 'places_cache.db'),
+            'METRICS_ENABLED': True,
+            'MIGRATIONS_ENABLED': False,
+            **config,
+        })
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        return app
+
+    apps = []
+    yield make
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
+
+
+TRIP = {
+    'name': 'Metrics', 'origin_place_name': 'Paris, France', 'origin_lat': 48.8566, 'origin_lng': 2.3522,
+    'destination_place_name': 'Lyon, France', 'destination_lat': 45.764, 'destination_lng': 4.8357,
+    'start_date': '2026-05-01', 'end_date': '2026-05-03',
+}
+
+
+def _samples(text):
+    return [line for line in text.splitlines() if line and not line.startswith('#')]
+
+
+def test_label_values_are_escaped():
+    counter = Counter('odd_total', 'Odd labels.', ('endpoint',))
+    counter.inc('/say/"hi"\\there\nnow')
+    histogram = Histogram('odd_seconds', 'Odd labels.', buckets=(1,), labelnames=('endpoint',))
+    histogram.observe(0.5, 'a"b')
+
+    lines = counter.render() + histogram.render()
+    assert 'odd_total{endpoint="/say/\\"hi\\"\\\\there\\nnow"} 1' in lines
+    assert 'odd_seconds_bucket{endpoint="a\\"b",le="1"} 1' in lines
+    assert all(SAMPLE.match(line) for line in _samples('\n'.join(lines)))
+
+
+def test_exposition_format(metrics_app):
+    app = metrics_app()
+    client = app.test_client()
+    trip = client.post('/api/trips', json=TRIP).get_json()
+    for _ in range(2):
+        client.get(f"/api/trips/{trip['id']}")
+    client.get('/api/trips/999')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'version=0.0.4' in response.content_type
+    text = response.get_data(as_text=True)
+    assert text.endswith('\n')
+
+    for line in text.splitlines():
+        assert line.startswith(('# HELP ', '# TYPE ')) or SAMPLE.match(line), line
+    assert '# TYPE http_requests_total counter' in text
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert 'http_requests_total{method="GET",endpoint="/api/trips/<int:id>",status="200"} 2' in text
+    assert 'http_requests_total{method="GET",endpoint="/api/trips/<int:id>",status="404"} 1' in text
+    assert 'http_requests_total{method="POST",endpoint="/api/trips",status="201"} 1' in text
+
+    # Buckets are cumulative and end with +Inf equal to the count.
+    prefix = 'http_request_duration_seconds_bucket{endpoint="/api/trips/<int:id>",'
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in text.splitlines() if line.startswith(prefix)]
+    assert buckets == sorted(buckets)
+    assert buckets[-1] == 3
+    assert 'http_request_duration_seconds_count{endpoint="/api/trips/<int:id>"} 3' in text
+
+
+def test_route_rules_are_escaped_in_labels(metrics_app):
+    app = metrics_app()
+    app.add_url_rule('/odd/"quoted"\\rule', 'odd', lambda: 'ok')
+    client = app.test_client()
+    assert client.get('/odd/"quoted"\\rule').status_code == 200
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'http_requests_total{method="GET",endpoint="/odd/\\"quoted\\"\\\\rule",status="200"} 1' in text
+    assert all(SAMPLE.match(line) for line in _samples(text))
+
+
+def test_metrics_endpoint_is_off_when_disabled(client):
+    assert client.get('/metrics').status_code == 404
+    assert 'Server-Timing' not in client.get('/api/trips').headers
+
+
+def test_server_timing_header(metrics_app):
+    client = metrics_app().test_client()
+    client.post('/api/trips', json=TRIP)
+
+    header = client.get('/api/trips').headers['Server-Timing']
+    parts = dict(part.split(';', 1) for part in header.split(', '))
+    assert re.fullmatch(r'dur=\d+\.\d', parts['app'])
+    assert re.fullmatch(r'dur=\d+\.\d;desc="[1-9]\d* queries"', parts['db'])
+
+
+def test_server_timing_can_be_turned_off(metrics_app):
+    client = metrics_app(METRICS_SERVER_TIMING=False).test_client()
+    assert 'Server-Timing' not in client.get('/api/trips').headers
+
+
+def test_queries_over_the_threshold_are_logged(metrics_app, caplog):
+    # Every statement takes longer than a nanosecond.
+    app = metrics_app(SLOW_QUERY_MS=0.000001)
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        app.test_client().get('/api/trips')
+
+    slow = [record.getMessage() for record in caplog.records if record.getMessage().startswith('Slow query')]
+    assert slow
+    assert any('FROM trip' in message for message in slow)
+    total = next(line for line in get_metrics(app).render(app).splitlines() if line.startswith('db_slow_queries_total'))
+    assert int(total.split()[1]) >= len(slow)
+
+
+def test_fast_queries_are_not_logged(metrics_app, caplog):
+    for threshold in (0, 10000):
+        app = metrics_app(SLOW_QUERY_MS=threshold)
+        with caplog.at_level(logging.WARNING, logger=app.logger.name):
+            app.test_client().get('/api/trips')
+        assert not [record for record in caplog.records if record.getMessage().startswith('Slow query')]
+        samples = _samples(get_metrics(app).render(app))
+        assert not [line for line in samples if line.startswith('db_slow_queries_total')]
@@ -0,0 +1,38 @@
+def test_update_with_invalid_people_is_rejected(client, make_trip):
+    trip = make_trip(people=['Alice'])
+    response = client.put(f"/api/trips/{trip['id']}", json={'name': 'Renamed', 'people': 'Alice'})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'people must be a list of names.'
+
+    unchanged = client.get(f"/api/trips/{trip['id']}").get_json()
+    assert unchanged['name'] == 'Test trip'
+    assert unchanged['people'] == ['Alice']
+    assert client.get(f"/api/trips/{trip['id']}/changes").get_json()['version'] == 1
+
+
+def test_update_with_invalid_date_is_rejected(client, make_trip):
+    trip = make_trip()
+    assert client.put(f"/api/trips/{trip['id']}", json={'start_date': 'soon'}).status_code == 400
+    assert client.put(f"/api/trips/{trip['id']}", json=['not', 'an', 'object']).status_code == 400
+
+
+def test_update_replaces_people_in_order(client, make_trip):
+    trip = make_trip(people=['Alice', 'Bob'])
+    response = client.put(f"/api/trips/{trip['id']}", json={'people': [' Carol ', '', 'Alice']})
+    assert response.status_code == 200
+    assert response.get_json()['people'] == ['Carol', 'Alice']
+    assert client.get(f"/api/trips/{trip['id']}").get_json()['people'] == ['Carol', 'Alice']
+
+
+def test_listing_filters_by_participant(client, make_trip):
+    alice = make_trip(name='With Alice', people=['Alice', 'Bob'])
+    make_trip(name='Without Alice', people=['Bob'])
+    make_trip(name='Nobody')
+
+    legacy = client.get('/api/trips?participant=Alice').get_json()
+    assert [trip['id'] for trip in legacy] == [alice['id']]
+
+    page = client.get('/api/trips?participant=%20Bob%20&limit=10&count=true').get_json()
+    assert [trip['name'] for trip in page['trips']] == ['Without Alice', 'With Alice']
+    assert page['total'] == 2
+    assert client.get('/api/trips?participant=Zoe&limit=10').get_json()['trips'] == []
@@ -0,0 +1,101 @@
+import sqlite3
+
+import place_cache
+from place_cache import PlaceCache, get_place_cache
+
+
+def search(client, query, limit=5):
+    return client.get('/api/places/search', query_string={'query': query, 'limit': limit})
+
+
+def test_miss_then_memory_hit(client, mapbox_stub):
+    first = search(client, 'Paris')
+    assert first.status_code == 200
+    assert first.headers['X-Cache'] == 'MISS'
+    assert mapbox_stub.requests == 1
+
+    second = search(client, '  paris ')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+    assert mapbox_stub.requests == 1
+
+
+def test_disk_hit_survives_restart_without_writing(app, client, mapbox_stub):
+    features = search(client, 'Lyon').get_json()['features']
+
+    # A second cache on the same file, as in another worker process.
+    restarted = PlaceCache(app.config['PLACES_CACHE_PATH'])
+    accessed_sql = "SELECT accessed_at FROM place_cache WHERE query = 'lyon'"
+    (stored_at,) = restarted._conn.execute(accessed_sql).fetchone()
+    changes = restarted._conn.total_changes
+    assert restarted.get('lyon', 'place,region,locality,neighborhood,postcode', 5) == features
+    assert restarted.snapshot()['disk_hits'] == 1
+    assert restarted._conn.total_changes == changes
+
+    # The access time is written with the next store.
+    restarted.set('nice', 'place', 5, [])
+    (accessed_at,) = restarted._conn.execute(accessed_sql).fetchone()
+    assert accessed_at > stored_at
+    assert not restarted._accessed
+
+
+def test_prefix_hit_from_longer_query(app, client, mapbox_stub):
+    search(client, 'Paris')
+    get_place_cache(app)._memory.clear()
+
+    response = search(client, 'par')
+    assert response.headers['X-Cache'] == 'HIT'
+    assert [f['place_name'] for f in response.get_json()['features']][:1] == ['Paris 0, Stubland']
+    assert mapbox_stub.requests == 1
+    assert get_place_cache(app).snapshot()['prefix_hits'] == 1
+
+
+def test_prefix_hit_needs_enough_matches(tmp_path):
+    cache = PlaceCache(str(tmp_path / 'cache.db'))
+    cache.set('paris', 'place', 2, [{'text': 'Paris', 'place_name': 'Paris, France'}, {'text': 'Lyon'}])
+    cache._memory.clear()
+    assert cache.get('par', 'place', 2) is None
+    assert cache.snapshot()['misses'] == 1
+
+
+def test_entries_expire(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(place_cache.time, 'time', lambda: now[0])
+    cache = PlaceCache(str(tmp_path / 'cache.db'), ttl=60)
+    cache.set('rome', 'place', 5, [{'text': 'Rome'}])
+
+    now[0] += 59
+    assert cache.get('rome', 'place', 5) == [{'text': 'Rome'}]
+    now[0] += 2
+    assert cache.get('rome', 'place', 5) is None
+    assert cache.snapshot()['misses'] == 1
+
+
+def test_prefix_hit_expires_with_its_source(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(place_cache.time, 'time', lambda: now[0])
+    cache = PlaceCache(str(tmp_path / 'cache.db'), ttl=60)
+    cache.set('rome', 'place', 1, [{'text': 'Rome'}])
+
+    now[0] += 50
+    assert cache.get('ro', 'place', 1) == [{'text': 'Rome'}]
+    now[0] += 20
+    # Past the source entry's expiry, even though "ro" was derived only 20 s ago.
+    assert cache.get('ro', 'place', 1) is None
+
+
+def test_failed_store_still_serves_the_search(app, client, mapbox_stub):
+    cache = get_place_cache(app)
+    cache._conn.execute('PRAGMA busy_timeout=0')
+    # Another process holding the write lock.
+    other = sqlite3.connect(app.config['PLACES_CACHE_PATH'], isolation_level=None)
+    other.execute('BEGIN IMMEDIATE')
+    try:
+        response = search(client, 'Berlin')
+        assert response.status_code == 200
+        assert response.headers['X-Cache'] == 'MISS'
+        assert cache.snapshot()['store_errors'] == 1
+        assert search(client, 'Berlin').headers['X-Cache'] == 'HIT'
+    finally:
+        other.rollback()
+        other.close()
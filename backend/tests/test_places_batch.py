@@ -0,0 +1,72 @@
+"""POST /api/places/batch: one lookup per normalized query, partial results on timeout."""
+from mapbox import get_mapbox_client, get_mapbox_executor
+from place_cache import get_place_cache
+from routes.places import DEFAULT_LIMIT, DEFAULT_PLACE_TYPES
+
+
+def test_normalized_duplicates_share_one_lookup(client, mapbox_stub):
+    response = client.post('/api/places/batch', json={'queries': ['Paris', ' paris ', 'PARIS', 'Rome']})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert mapbox_stub.requests == 2
+    assert body['unique'] == 2
+    assert body['errors'] == 0
+    assert [result['query'] for result in body['results']] == ['Paris', ' paris ', 'PARIS', 'Rome']
+    paris = [result['features'] for result in body['results'][:3]]
+    assert paris[0] == paris[1] == paris[2]
+    assert paris[0] != body['results'][3]['features']
+    assert not any(result['cached'] for result in body['results'])
+
+
+def test_cached_queries_skip_mapbox(client, mapbox_stub):
+    client.post('/api/places/batch', json={'queries': ['Paris']})
+    response = client.post('/api/places/batch', json={'queries': ['paris', 'Rome']})
+
+    results = response.get_json()['results']
+    assert mapbox_stub.requests == 2
+    assert [result['cached'] for result in results] == [True, False]
+
+
+def test_slow_lookups_time_out_and_the_rest_are_returned(app, client, mapbox_stub):
+    cache = get_place_cache(app)
+    cache.set('Rome', DEFAULT_PLACE_TYPES, DEFAULT_LIMIT, [{'id': 'place.rome'}])
+    app.config['PLACES_BATCH_TIMEOUT'] = 0.2
+    mapbox_stub.latency = 1.0
+
+    response = client.post('/api/places/batch', json={'queries': ['Rome', 'Paris', 'paris']})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['unique'] == 2
+    assert body['errors'] == 1
+    rome, paris, paris_again = body['results']
+    assert rome == {'query': 'Rome', 'features': [{'id': 'place.rome'}], 'cached': True}
+    assert paris == {'query': 'Paris', 'error': 'Timed out waiting for Mapbox.', 'status': 504}
+    assert paris_again['status'] == 504
+
+    # The timed-out lookup kept running and warmed the cache.
+    get_mapbox_executor(app).shutdown(wait=True)
+    assert cache.get('Paris', DEFAULT_PLACE_TYPES, DEFAULT_LIMIT) is not None
+
+
+def test_open_breaker_fails_fast(app, client, mapbox_stub):
+    breaker = get_mapbox_client(app).breaker
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+
+    response = client.post('/api/places/batch', json={'queries': ['Paris', 'Rome']})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert mapbox_stub.requests == 0
+    assert body['errors'] == 2
+    assert {result['status'] for result in body['results']} == {503}
+    assert body['results'][0]['error'] == 'Mapbox is temporarily unavailable.'
+
+
+def test_invalid_batches_are_rejected(client, mapbox_stub):
+    assert client.post('/api/places/batch', json={'queries': []}).status_code == 400
+    assert client.post('/api/places/batch', json={'queries': ['Paris', ' ']}).status_code == 400
+    assert client.post('/api/places/batch', json={'queries': ['Paris'], 'limit': 11}).status_code == 400
+    assert mapbox_stub.requests == 0
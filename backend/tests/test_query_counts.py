@@ -0,0 +1,45 @@
+"""Query counts that must not grow with the number of rows (N+1 guards)."""
+import pytest
+
+
+def seed(client, make_trip, trips, activities=3):
+    ids = []
+    for i in range(trips):
+        trip = make_trip(name=f'Trip {i}', people=[f'Person {i}', 'Shared'])
+        client.post(f"/api/trips/{trip['id']}/activities/bulk", json=[
+            {'name': f'Stop {j}', 'date': f'2026-05-0{1 + j % 3}T10:00:00'} for j in range(activities)
+        ])
+        ids.append(trip['id'])
+    return ids
+
+
+@pytest.mark.parametrize('path', [
+    '/api/trips?include=activities',
+    '/api/trips?include=activities&limit=100',
+    '/api/trips?include=activities&participant=Shared',
+])
+def test_trip_listing_query_count_is_constant(client, make_trip, count_queries, path):
+    seed(client, make_trip, 1)
+    with count_queries() as one:
+        assert client.get(path).status_code == 200
+
+    seed(client, make_trip, 49)
+    with count_queries() as fifty:
+        response = client.get(path)
+    body = response.get_json()
+    trips = body if isinstance(body, list) else body['trips']
+    assert len(trips) == 50
+    assert all(len(trip['activities']) == 3 for trip in trips)
+    assert len(fifty) == len(one)
+
+
+def test_trip_detail_query_count_is_constant(client, make_trip, count_queries):
+    (trip_id,) = seed(client, make_trip, 1, activities=1)
+    with count_queries() as few:
+        client.get(f'/api/trips/{trip_id}')
+
+    client.post(f'/api/trips/{trip_id}/activities/bulk', json=[{'name': f'Extra {j}'} for j in range(50)])
+    with count_queries() as many:
+        response = client.get(f'/api/trips/{trip_id}')
+    assert len(response.get_json()['activities']) == 51
+    assert len(many) == len(few)
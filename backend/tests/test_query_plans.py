@@ -0,0 +1,61 @@
+"""The hot read paths must be answered from indexes, never by scanning a table."""
+import re
+
+import pytest
+
+from extensions import db
+
+
+def query_plan(app, statement, parameters):
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        try:
+            rows = connection.cursor().execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        finally:
+            connection.close()
+    return [row[3] for row in rows]
+
+
+def plans_for(app, client, count_queries, path):
+    with count_queries() as statements:
+        assert client.get(path).status_code == 200
+    return [(statement, query_plan(app, statement, parameters)) for statement, parameters in statements]
+
+
+@pytest.fixture
+def trip_id(client, make_trip):
+    trip = make_trip(people=['Ann', 'Ben'])
+    client.post(f"/api/trips/{trip['id']}/activities/bulk", json=[
+        {'name': f'Stop {i}', 'date': f'2026-05-0{1 + i % 3}T1{i}:00:00'} for i in range(6)
+    ])
+    make_trip(name='Second trip', people=['Ann'])
+    return trip['id']
+
+
+def assert_indexed(plans, table, index):
+    """Every lookup runs on an index and ``table`` is read through ``index``."""
+    steps = [step for _, plan in plans for step in plan]
+    for step in steps:
+        if step.startswith(('SCAN', 'SEARCH')) and not step.startswith('SCAN CONSTANT ROW'):
+            assert re.search(r'USING (COVERING INDEX|INDEX|INTEGER PRIMARY KEY)', step), step
+    assert any(
+        re.match(rf'SEARCH {table} USING (COVERING )?INDEX {index} ', step) for step in steps
+    ), steps
+
+
+def test_keyset_page_uses_created_at_index(app, client, count_queries, trip_id):
+    cursor = client.get('/api/trips?limit=1').get_json()['next_cursor']
+    plans = plans_for(app, client, count_queries, f'/api/trips?limit=1&cursor={cursor}')
+    assert_indexed(plans, 'trip', 'ix_trip_created_at_id')
+
+
+def test_participant_filter_uses_name_index(app, client, count_queries, trip_id):
+    plans = plans_for(app, client, count_queries, '/api/trips?limit=10&participant=Ann')
+    assert_indexed(plans, 'trip_participant', 'ix_trip_participant_name')
+    assert_indexed(plans, 'trip_participant', 'ix_trip_participant_trip_id')
+
+
+@pytest.mark.parametrize('path', ['/api/trips/{id}/calendar', '/api/trips/{id}/calendar/2026-05-02'])
+def test_calendar_uses_trip_date_index(app, client, count_queries, trip_id, path):
+    plans = plans_for(app, client, count_queries, path.format(id=trip_id))
+    assert_indexed(plans, 'activity', 'ix_activity_trip_id_date')
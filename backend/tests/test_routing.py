@@ -0,0 +1,128 @@
+import itertools
+import random
+
+import pytest
+
+import geo
+import routing
+from geo import haversine_matrix
+from routing import plan_route
+
+
+def _length(coords):
+    dist = haversine_matrix([lat for lat, _ in coords], [lng for _, lng in coords])
+    return sum(float(dist[i][i + 1]) for i in range(len(coords) - 1))
+
+
+def _brute_force(points, start, end):
+    """Length of the shortest path, trying every order (the first point is fixed without ``start``)."""
+    free = list(range(1, len(points))) if start is None else list(range(len(points)))
+    fixed = [0] if start is None else []
+    return min(
+        _length(([start] if start else []) + [points[i] for i in fixed + list(order)] + ([end] if end else []))
+        for order in itertools.permutations(free)
+    )
+
+
+def _random_case(seed):
+    rng = random.Random(seed)
+    point = lambda: (48.5 + rng.random(), 2 + rng.random())
+    points = [point() for _ in range(rng.randint(1, 7))]
+    return points, point() if seed % 3 else None, point() if seed % 2 else None
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'python':
+        monkeypatch.setattr(geo, 'load_numpy', lambda: None)
+        monkeypatch.setattr(routing, 'load_numpy', lambda: None)
+    return request.param
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_small_days_get_the_shortest_order(backend, seed):
+    points, start, end = _random_case(seed)
+    order, legs, _ = plan_route(points, start, end)
+    assert sorted(order) == list(range(len(points)))
+    if start is None:
+        assert order[0] == 0
+    coords = ([start] if start else []) + [points[i] for i in order] + ([end] if end else [])
+    assert sum(legs) == pytest.approx(_length(coords))
+    assert sum(legs) == pytest.approx(_brute_force(points, start, end))
+
+
+def test_large_days_have_no_improving_reversal(backend):
+    rng = random.Random(7)
+    points = [(48.5 + rng.random(), 2 + rng.random()) for _ in range(40)]
+    start = end = (48.85, 2.35)
+    order, legs, baseline = plan_route(points, start, end)
+    assert sorted(order) == list(range(len(points)))
+    assert sum(legs) <= baseline
+    path = [start] + [points[i] for i in order] + [end]
+    for i, j in itertools.combinations(range(1, len(path) - 1), 2):
+        assert _length(path[:i] + path[i:j + 1][::-1] + path[j + 1:]) >= sum(legs) - 1e-9
+
+
+def test_empty_and_single_point():
+    assert plan_route([]) == ([], [], 0.0)
+    order, legs, baseline = plan_route([(48.0, 2.0)], (48.0, 2.0), None)
+    assert order == [0] and legs == [0.0] and baseline == 0.0
+
+
+def _located_trip(make_trip, client, round_trip):
+    fields = {'is_round_trip': True, 'destination_lat': None, 'destination_lng': None} if round_trip else {}
+    trip = make_trip(origin_lat=48.8566, origin_lng=2.3522, **fields)
+    stops = [
+        {'name': 'Far', 'location_lat': 48.90, 'location_lng': 2.60},
+        {'name': 'Near', 'location_lat': 48.86, 'location_lng': 2.36},
+        {'name': 'Middle', 'location_lat': 48.88, 'location_lng': 2.45},
+        {'name': 'Nowhere'},
+    ]
+    for hour, stop in enumerate(stops):
+        stop['date'] = f'2026-05-01T{9 + hour:02d}:00:00'
+    response = client.post(f"/api/trips/{trip['id']}/activities/bulk", json={'activities': stops})
+    assert response.status_code == 201
+    return trip
+
+
+def test_round_trip_route_returns_to_the_origin(client, make_trip):
+    trip = _located_trip(make_trip, client, round_trip=True)
+    route = client.get(f"/api/trips/{trip['id']}/route?date=2026-05-01").get_json()
+    assert route['start']['kind'] == 'origin' and route['end']['kind'] == 'origin'
+    assert [stop['name'] for stop in route['stops']] in (['Near', 'Middle', 'Far'], ['Far', 'Middle', 'Near'])
+    assert [a['name'] for a in route['unlocated']] == ['Nowhere']
+    assert route['distance_km'] <= route['baseline_distance_km']
+    legs = [stop['leg_km'] for stop in route['stops']] + [route['end']['leg_km']]
+    assert sum(legs) == pytest.approx(route['distance_km'], abs=0.01)
+
+
+def test_one_way_route_ends_at_the_destination(client, make_trip):
+    trip = _located_trip(make_trip, client, round_trip=False)
+    route = client.get(f"/api/trips/{trip['id']}/route?date=2026-05-01").get_json()
+    assert route['end']['kind'] == 'destination'
+    # Lyon lies south-east, so the route should sweep east towards it.
+    assert [stop['name'] for stop in route['stops']] == ['Near', 'Middle', 'Far']
+
+    open_end = client.get(f"/api/trips/{trip['id']}/route?date=2026-05-01&start=none&end=none").get_json()
+    assert open_end['start'] is None and open_end['end'] is None
+    assert open_end['stops'][0]['leg_km'] is None
+    assert client.get(f"/api/trips/{trip['id']}/route?date=2026-05-01&end=moon").status_code == 400
+    assert client.get(f"/api/trips/{trip['id']}/route?date=May").status_code == 400
+    assert client.get('/api/trips/999/route?date=2026-05-01').status_code == 404
+
+
+def test_route_etag(client, make_trip):
+    trip = _located_trip(make_trip, client, round_trip=True)
+    url = f"/api/trips/{trip['id']}/route?date=2026-05-01"
+    response = client.get(url)
+    etag = response.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    # Another day or another end is a different resource.
+    assert client.get(url + '&end=none', headers={'If-None-Match': etag}).status_code == 200
+
+    far = next(stop for stop in response.get_json()['stops'] if stop['name'] == 'Far')
+    client.put(f"/api/activities/{far['id']}", json={'location_lat': 48.87, 'location_lng': 2.40})
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert next(s for s in changed.get_json()['stops'] if s['name'] == 'Far')['location_lng'] == 2.40
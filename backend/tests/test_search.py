@@ -0,0 +1,112 @@
+import pytest
+
+import routes.search
+
+
+def _search(client, q, **params):
+    response = client.get('/api/search', query_string=dict(params, q=q))
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['results']
+
+
+def _ids(results, kind):
+    return [result['id'] for result in results if result['type'] == kind]
+
+
+def test_index_follows_trip_inserts_updates_and_deletes(client, make_trip):
+    trip = make_trip(name='Eiffel weekend', summary='Towers and bridges')
+    assert _ids(_search(client, 'eiffel'), 'trip') == [trip['id']]
+    assert _ids(_search(client, 'bridg'), 'trip') == [trip['id']]
+
+    client.put(f"/api/trips/{trip['id']}", json={'name': 'Louvre weekend'})
+    assert _search(client, 'eiffel') == []
+    assert _ids(_search(client, 'louvre'), 'trip') == [trip['id']]
+    # Version bumps touch no indexed column and leave the index alone.
+    client.post(f"/api/trips/{trip['id']}/activities", json={'name': 'Dinner'})
+    assert _ids(_search(client, 'louvre'), 'trip') == [trip['id']]
+
+    client.delete(f"/api/trips/{trip['id']}")
+    assert _search(client, 'louvre') == []
+    assert _search(client, 'dinner') == []
+
+
+def test_index_follows_activity_changes(client, make_trip):
+    trip = make_trip()
+    response = client.post(f"/api/trips/{trip['id']}/activities/bulk", json=[
+        {'name': 'Croissant tasting', 'notes': 'Near the market'},
+        {'name': 'Opera', 'location': 'Palais Garnier'},
+    ])
+    croissant, opera = [activity['id'] for activity in response.get_json()['activities']]
+    assert _ids(_search(client, 'croissant'), 'activity') == [croissant]
+    assert _ids(_search(client, 'garnier'), 'activity') == [opera]
+
+    client.put(f'/api/activities/{opera}', json={'location': 'Bastille'})
+    assert _search(client, 'garnier') == []
+    assert _ids(_search(client, 'bastille'), 'activity') == [opera]
+
+    client.delete(f"/api/trips/{trip['id']}/activities", json={'ids': [croissant]})
+    assert _search(client, 'croissant') == []
+    client.delete(f'/api/activities/{opera}')
+    assert _search(client, 'bastille') == []
+
+
+def test_name_matches_rank_first(client, make_trip):
+    in_summary = make_trip(name='Spring break', summary='Mostly Lisbon, some Porto')
+    in_name = make_trip(name='Lisbon', summary='Sun')
+    results = _search(client, 'lisbon')
+    assert _ids(results, 'trip') == [in_name['id'], in_summary['id']]
+    assert results[0]['score'] > results[1]['score']
+
+
+def test_matching_is_by_prefix_and_ignores_diacritics(client, make_trip):
+    trip = make_trip(name='Café crawl in São Paulo')
+    assert _ids(_search(client, 'cafe sao'), 'trip') == [trip['id']]
+    assert _ids(_search(client, 'PAUL'), 'trip') == [trip['id']]
+    # Every word must match.
+    assert _search(client, 'cafe rome') == []
+
+
+def test_snippets_are_escaped(client, make_trip):
+    make_trip(name='Safe', summary='<script>alert("x")</script> & bagels in <b>Montreal</b>')
+    [result] = _search(client, 'bagels')
+    assert '<script>' not in result['snippet'] and '<b>' not in result['snippet']
+    assert '&lt;script&gt;' in result['snippet']
+    assert '&amp;' in result['snippet']
+    assert '<mark>bagels</mark>' in result['snippet']
+
+
+def test_filters(client, make_trip):
+    first = make_trip(name='Museum trip')
+    second = make_trip(name='Other')
+    first_activity = client.post(f"/api/trips/{first['id']}/activities", json={'name': 'Museum'}).get_json()
+    client.post(f"/api/trips/{second['id']}/activities", json={'name': 'Museum'})
+
+    assert {r['type'] for r in _search(client, 'museum', type='trip')} == {'trip'}
+    assert len(_search(client, 'museum', type='activity')) == 2
+    assert _ids(_search(client, 'museum', trip_id=first['id']), 'activity') == [first_activity['id']]
+    assert _ids(_search(client, 'museum', trip_id=first['id']), 'trip') == []
+    assert len(_search(client, 'museum', limit=1)) == 1
+
+
+@pytest.mark.parametrize('params', [
+    {'q': ''}, {'q': '*()'}, {'q': 'x', 'type': 'place'}, {'q': 'x', 'limit': 'ten'},
+    {'q': 'x', 'limit': '0'}, {'q': 'x', 'trip_id': 'one'},
+])
+def test_invalid_parameters(client, params):
+    assert client.get('/api/search', query_string=params).status_code == 400
+
+
+@pytest.mark.parametrize('q', ['"unbalanced', 'NEAR(', 'a:b', '^x', '-x', 'name:paris', 'x AND', 'a"b'])
+def test_fts_syntax_in_the_query_is_plain_text(client, make_trip, q):
+    make_trip(name='Paris')
+    assert client.get('/api/search', query_string={'q': q}).status_code == 200
+
+
+def test_malformed_match_expression_is_a_400(client, make_trip, monkeypatch):
+    make_trip(name='Paris')
+    # Bypasses the quoting to send raw FTS5 syntax to MATCH.
+    monkeypatch.setattr(routes.search, 'fts_query', lambda text: text)
+    response = client.get('/api/search', query_string={'q': 'NEAR(paris'})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid search query.'}
+    assert client.get('/api/search', query_string={'q': 'paris'}).status_code == 200
@@ -0,0 +1,93 @@
+"""JSONProvider: orjson and JSON_BACKEND=stdlib write the same bytes."""
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+from flask import jsonify
+
+from app import create_app
+from serialization import orjson
+
+PAYLOAD = {
+    'day': date(2026, 5, 1),
+    'aware': datetime(2026, 5, 1, 12, 30, tzinfo=timezone.utc),
+    'naive': datetime(2026, 5, 1, 12, 30, 5, 123),
+    'iso': '2026-05-01T12:30:05.000123',
+    'none': None,
+    'text': 'Zürich — 東京 "quoted"\n\t ',
+    'nested': {'z': [1, 2.5, True, False], 'a': {'b': None}},
+}
+
+
+@pytest.fixture
+def provider(tmp_path):
+    """``make(backend)`` returns an app whose JSON provider uses that backend."""
+    def make(backend, **config):
+        return create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'json.db'),
+            'METRICS_ENABLED': False,
+            'MIGRATIONS_ENABLED': False,
+            'JSON_BACKEND': backend,
+            **config,
+        })
+    return make
+
+
+def both(provider, **config):
+    if orjson is None:
+        pytest.skip('orjson is not installed')
+    fast, stdlib = provider('auto', **config), provider('stdlib', **config)
+    assert fast.json.use_orjson and not stdlib.json.use_orjson
+    return fast, stdlib
+
+
+def test_dumps_match(provider):
+    fast, stdlib = both(provider)
+    expected = fast.json.dumps(PAYLOAD)
+    assert stdlib.json.dumps(PAYLOAD) == expected
+    assert '"none":null' in expected
+    assert '"day":"Fri, 01 May 2026 00:00:00 GMT"' in expected
+    assert '"aware":"Fri, 01 May 2026 12:30:00 GMT"' in expected
+    assert 'Zürich — 東京' in expected
+    assert json.loads(expected)['text'] == PAYLOAD['text']
+    assert list(json.loads(expected)) == sorted(PAYLOAD)
+
+
+def test_fallback_for_values_orjson_rejects_matches(provider):
+    fast, stdlib = both(provider)
+    for payload, expected in (
+        ({'big': 2 ** 70, 'text': 'é'}, '{"big":1180591620717411303424,"text":"é"}'),
+        ({2: 'two', 1: 'one'}, '{"1":"one","2":"two"}'),
+    ):
+        assert fast.json.dumps(payload) == stdlib.json.dumps(payload) == expected
+
+
+@pytest.mark.parametrize('debug', [False, True])
+def test_responses_match(provider, debug):
+    fast, stdlib = both(provider, DEBUG=debug)
+    bodies = []
+    for app in (fast, stdlib):
+        with app.test_request_context():
+            responses = [jsonify(PAYLOAD), jsonify(a=1, b='é'), jsonify([1, None]), jsonify(1, 2), jsonify()]
+            for response in responses:
+                assert response.mimetype == 'application/json'
+            bodies.append([response.get_data() for response in responses])
+    assert bodies[0] == bodies[1]
+    body = bodies[0][1].decode()
+    assert body == ('{\n  "a": 1,\n  "b": "é"\n}\n' if debug else '{"a":1,"b":"é"}\n')
+    assert [json.loads(body) for body in bodies[0][2:]] == [[1, None], [1, 2], None]
+
+
+def test_response_rejects_args_and_kwargs(provider):
+    app = provider('auto')
+    with app.test_request_context(), pytest.raises(TypeError):
+        jsonify(1, a=2)
+
+
+def test_loads_match(provider):
+    fast, stdlib = both(provider)
+    document = '{"text":"Zürich \\u6771","none":null,"n":[1,2.5]}'
+    assert fast.json.loads(document) == stdlib.json.loads(document) == {
+        'text': 'Zürich 東', 'none': None, 'n': [1, 2.5],
+    }
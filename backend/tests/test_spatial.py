@@ -0,0 +1,26 @@
+import pytest
+
+
+@pytest.mark.parametrize('path, error', [
+    ('/api/trips/nearby?lat=48.85&lng=2.35&limit=0', 'limit must be positive.'),
+    ('/api/trips/nearby?lat=48.85&lng=2.35&limit=many', 'limit must be an integer.'),
+    ('/api/trips/nearby?lat=north&lng=2.35', 'lat, lng and radius_km must be numbers.'),
+    ('/api/trips/in_bbox?bbox=2,48,3,49&limit=-1', 'limit must be positive.'),
+    ('/api/trips/in_bbox?bbox=2,48,3', 'bbox must be four numbers (west,south,east,north).'),
+])
+def test_argument_errors(client, path, error):
+    response = client.get(path)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+
+
+def test_nearby_orders_by_distance(client, make_trip):
+    near = make_trip(name='Near')
+    far = make_trip(name='Far', origin_place_name='Lille', origin_lat=50.6292, origin_lng=3.0573,
+                    destination_place_name='Lille', destination_lat=50.6292, destination_lng=3.0573)
+    make_trip(name='Elsewhere', origin_place_name='Rome', origin_lat=41.9, origin_lng=12.5,
+              destination_place_name='Rome', destination_lat=41.9, destination_lng=12.5)
+
+    trips = client.get('/api/trips/nearby?lat=48.85&lng=2.35&radius_km=300&limit=5').get_json()['trips']
+    assert [trip['id'] for trip in trips] == [near['id'], far['id']]
+    assert trips[0]['distance_km'] < 1
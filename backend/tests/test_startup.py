@@ -0,0 +1,86 @@
+"""create_app: APP_BLUEPRINTS selection, MIGRATIONS_ENABLED and what startup imports."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import BLUEPRINTS, create_app
+from benchmarks.load import BACKEND_DIR
+from benchmarks.startup import run_client_once
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    """Environment for apps built from environment variables alone, on a throwaway database."""
+    values = {
+        'DATABASE_URL': 'sqlite:///' + str(tmp_path / 'startup.db'),
+        'PLACES_CACHE_PATH': str(tmp_path / 'places_cache.db'),
+        'METRICS_ENABLED': 'false',
+    }
+    for name, value in values.items():
+        monkeypatch.setenv(name, value)
+    for name in ('APP_BLUEPRINTS', 'MIGRATIONS_ENABLED'):
+        monkeypatch.delenv(name, raising=False)
+    return dict(os.environ)
+
+
+def loaded_modules(env, names):
+    """Which of ``names`` a fresh interpreter has imported after ``create_app()``."""
+    script = f'import json, sys\nimport app\napp.create_app()\nprint(json.dumps([n for n in {names!r} if n in sys.modules]))'
+    result = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_all_blueprints_by_default(env):
+    app = create_app()
+    assert set(app.blueprints) == set(BLUEPRINTS)
+    assert 'migrate' in app.extensions
+
+
+def test_selected_blueprints_only(env, monkeypatch):
+    monkeypatch.setenv('APP_BLUEPRINTS', ' trips, calendar ,')
+    app = create_app()
+    assert set(app.blueprints) == {'trips', 'calendar'}
+
+    endpoints = {rule.endpoint.split('.')[0] for rule in app.url_map.iter_rules()}
+    assert endpoints == {'trips', 'calendar', 'static', 'hello'}
+    client = app.test_client()
+    assert client.get('/api/export').status_code == 404
+    assert client.get('/metrics').status_code == 404
+
+
+def test_unknown_blueprint_is_rejected(env, monkeypatch):
+    monkeypatch.setenv('APP_BLUEPRINTS', 'trips,trip,exports')
+    with pytest.raises(ValueError, match='Unknown blueprints: exports, trip'):
+        create_app()
+    with pytest.raises(ValueError, match='Unknown blueprints: nope'):
+        create_app({'BLUEPRINTS': ('nope',)})
+
+
+def test_migrations_can_be_disabled(env, monkeypatch):
+    monkeypatch.setenv('MIGRATIONS_ENABLED', 'false')
+    assert 'migrate' not in create_app().extensions
+    assert 'migrate' not in create_app({'MIGRATIONS_ENABLED': False}).extensions
+
+
+def test_unselected_modules_are_not_imported(env):
+    names = ['routes.trips', 'routes.calendar', 'routes.export', 'routes.places', 'mapbox', 'flask_migrate']
+    assert loaded_modules(env, names) == ['routes.trips', 'routes.calendar', 'routes.export', 'routes.places',
+                                          'mapbox', 'flask_migrate']
+    # Selecting activities and routing must not pull in the calendar blueprint.
+    env.update(APP_BLUEPRINTS='trips,activities,routing', MIGRATIONS_ENABLED='false')
+    assert loaded_modules(env, names) == ['routes.trips']
+
+
+def test_startup_benchmark_runs_with_a_smaller_app(env):
+    subprocess.run(
+        [sys.executable, '-c', 'from app import app, db\nwith app.app_context(): db.create_all()'],
+        cwd=BACKEND_DIR, env=env, check=True,
+    )
+    full = run_client_once(env)
+    minimal = run_client_once(dict(env, APP_BLUEPRINTS='trips', MIGRATIONS_ENABLED='false'))
+    assert set(full) == {'import_ms', 'create_app_ms', 'first_request_ms', 'modules', 'process_ms'}
+    assert minimal['modules'] < full['modules']
@@ -0,0 +1,106 @@
+import base64
+import json
+import os
+from datetime import datetime
+
+import flask_migrate
+import pytest
+from sqlalchemy import insert, text, update
+from sqlalchemy.exc import IntegrityError
+
+from app import basedir, create_app
+from extensions import db
+from models import Trip
+from routes.trips import _encode_cursor
+
+
+def _pages(client, query, max_pages=50):
+    ids, cursor = [], None
+    for _ in range(max_pages):
+        url = f'/api/trips?{query}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        ids.extend(trip['id'] for trip in page['trips'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids
+    raise AssertionError(f'The cursor did not advance: {ids}')
+
+
+def test_cursor_walks_every_trip_once_with_tied_created_at(app, client, make_trip):
+    ids = [make_trip(name=f'Trip {i}')['id'] for i in range(7)]
+    tied = datetime(2026, 1, 1, 12, 0, 0)
+    with app.app_context():
+        db.session.execute(update(Trip).where(Trip.id.in_(ids[1:6])).values(created_at=tied))
+        db.session.commit()
+
+    expected = [ids[6], ids[0]] + sorted(ids[1:6], reverse=True)
+    assert [trip['id'] for trip in client.get('/api/trips').get_json()] == expected
+    for limit in (1, 2, 3, 7, 8):
+        assert _pages(client, f'limit={limit}') == expected
+
+
+def test_fields_projection_and_count(client, make_trip):
+    make_trip(name='First', people=['Alice'])
+    make_trip(name='Second')
+    page = client.get('/api/trips?fields=name,people&limit=1&count=true').get_json()
+    assert page['trips'] == [{'name': 'Second', 'people': []}]
+    assert page['total'] == 2
+    assert page['next_cursor'] is not None
+    assert 'total' not in client.get('/api/trips?limit=1').get_json()
+
+    response = client.get('/api/trips?fields=name,password')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Unknown field(s): password'
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-a-cursor',
+    base64.urlsafe_b64encode(b'[1]').decode(),
+    base64.urlsafe_b64encode(json.dumps([None, 1]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps(['yesterday', 1]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps(['2026-01-01T00:00:00', 'one']).encode()).decode(),
+])
+def test_invalid_cursor_is_rejected(client, cursor):
+    response = client.get(f'/api/trips?limit=5&cursor={cursor}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor.'}
+
+
+def test_cursor_encoding_round_trips(client, make_trip):
+    trips = [make_trip(name=f'Trip {i}') for i in range(3)]
+    listed = client.get('/api/trips?limit=3&fields=id,created_at').get_json()['trips']
+    cursor = _encode_cursor(datetime.fromisoformat(listed[0]['created_at']), listed[0]['id'])
+    rest = client.get(f'/api/trips?limit=3&fields=id&cursor={cursor}').get_json()['trips']
+    assert [trip['id'] for trip in rest] == [trips[1]['id'], trips[0]['id']]
+
+
+def test_created_at_is_required(app):
+    with app.app_context():
+        with pytest.raises(IntegrityError):
+            db.session.execute(insert(Trip).values(name='No date', created_at=None))
+        db.session.rollback()
+
+
+def test_migration_backfills_null_created_at(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'migrated.db'),
+        'PLACES_CACHE_PATH': str(tmp_path / 'places_cache.db'),
+        'METRICS_ENABLED': False,
+        'MIGRATIONS_ENABLED': True,
+    })
+    directory = os.path.join(basedir, 'migrations')
+    with app.app_context():
+        flask_migrate.upgrade(directory, revision='prune_reused_trip_changes')
+        db.session.execute(text(
+            "INSERT INTO trip (name, is_round_trip, version, created_at) VALUES ('Old', 0, 1, '2025-01-01 00:00:00.250000')"
+        ))
+        db.session.execute(text("INSERT INTO trip (name, is_round_trip, version) VALUES ('Legacy', 0, 1)"))
+        db.session.commit()
+        flask_migrate.upgrade(directory)
+        rows = db.session.execute(text('SELECT name, created_at FROM trip ORDER BY id')).all()
+        db.engine.dispose()
+    assert rows == [('Old', '2025-01-01 00:00:00.250000'), ('Legacy', '2025-01-01 00:00:00.250000')]
+    with app.test_client() as client:
+        assert _pages(client, 'limit=1') == [2, 1]
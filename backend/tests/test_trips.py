@@ -0,0 +1,138 @@
+from sqlalchemy import update
+
+from extensions import db
+from models import Trip
+from payload_cache import PayloadCache, get_trip_cache
+
+
+def test_trip_ids_are_not_reused(client, make_trip):
+    trip = make_trip()
+    client.put(f"/api/trips/{trip['id']}", json={'summary': 'Updated'})
+    etag = client.get(f"/api/trips/{trip['id']}").headers['ETag']
+    assert client.delete(f"/api/trips/{trip['id']}").status_code == 200
+
+    recreated = make_trip(name='Another trip')
+    assert recreated['id'] != trip['id']
+    assert client.get(f"/api/trips/{trip['id']}", headers={'If-None-Match': etag}).status_code == 404
+
+
+def test_activity_ids_are_not_reused(client, make_trip):
+    trip = make_trip()
+    activity = client.post(f"/api/trips/{trip['id']}/activities", json={'name': 'Museum'}).get_json()
+    client.delete(f"/api/activities/{activity['id']}")
+    again = client.post(f"/api/trips/{trip['id']}/activities", json={'name': 'Museum'}).get_json()
+    assert again['id'] != activity['id']
+
+
+def _etag(client, trip_id):
+    response = client.get(f'/api/trips/{trip_id}')
+    assert response.status_code == 200
+    return response.headers['ETag'], response.get_json()
+
+
+def _activity_id(client, trip_id, name):
+    activities = client.get(f'/api/trips/{trip_id}').get_json()['activities']
+    return next(a['id'] for a in activities if a['name'] == name)
+
+
+def test_matching_etag_returns_304(client, make_trip):
+    trip = make_trip()
+    response = client.get(f"/api/trips/{trip['id']}")
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    cached = client.get(f"/api/trips/{trip['id']}", headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+    assert client.get(f"/api/trips/{trip['id']}", headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_every_mutation_changes_the_etag_and_payload(client, make_trip):
+    trip = make_trip()
+    trip_id = trip['id']
+    etags = set()
+
+    def check(expected):
+        etag, body = _etag(client, trip_id)
+        assert etag not in etags
+        etags.add(etag)
+        assert expected(body), body
+        # The previous ETag no longer matches.
+        for previous in etags - {etag}:
+            assert client.get(f'/api/trips/{trip_id}', headers={'If-None-Match': previous}).status_code == 200
+
+    check(lambda body: body['activities'] == [])
+    client.put(f'/api/trips/{trip_id}', json={'summary': 'Edited'})
+    check(lambda body: body['summary'] == 'Edited')
+    activity = client.post(f'/api/trips/{trip_id}/activities', json={'name': 'Museum'}).get_json()
+    check(lambda body: [a['name'] for a in body['activities']] == ['Museum'])
+    client.put(f"/api/activities/{activity['id']}", json={'name': 'Louvre'})
+    check(lambda body: [a['name'] for a in body['activities']] == ['Louvre'])
+    client.post(f'/api/trips/{trip_id}/activities/bulk', json={'activities': [{'name': 'Park'}, {'name': 'Cafe'}]})
+    check(lambda body: len(body['activities']) == 3)
+    client.patch(f'/api/trips/{trip_id}/activities', json={'status': 'done', 'filter': {}})
+    check(lambda body: {a['status'] for a in body['activities']} == {'done'})
+    client.delete(f'/api/trips/{trip_id}/activities', json={'ids': [activity['id']]})
+    check(lambda body: [a['name'] for a in body['activities']] == ['Park', 'Cafe'])
+    client.delete(f"/api/activities/{_activity_id(client, trip_id, 'Park')}")
+    check(lambda body: [a['name'] for a in body['activities']] == ['Cafe'])
+
+
+def test_stale_cached_payload_is_not_served(app, client, make_trip):
+    trip = make_trip()
+    etag, _ = _etag(client, trip['id'])
+    cache = get_trip_cache(app)
+    assert cache.get((trip['id'], 1)) is not None
+
+    # Another worker commits a change: this process's cache is not invalidated.
+    with app.app_context():
+        db.session.execute(update(Trip).where(Trip.id == trip['id']).values(summary='From elsewhere'))
+        Trip.bump_version(trip['id'])
+        db.session.commit()
+
+    new_etag, body = _etag(client, trip['id'])
+    assert new_etag != etag
+    assert body['summary'] == 'From elsewhere'
+    assert client.get(f"/api/trips/{trip['id']}", headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_payload_cache_is_bounded_and_invalidated_per_trip():
+    cache = PayloadCache(max_bytes=10)
+    cache.set((1, 1), b'aaaa')
+    cache.set((2, 1), b'bbbb')
+    cache.get((1, 1))
+    cache.set((3, 1), b'cccc')
+    # The least recently used entry is evicted first.
+    assert cache.get((2, 1)) is None
+    assert cache.get((1, 1)) == b'aaaa'
+    assert cache.size == 8
+
+    cache.set((1, 1, 'route'), b'rr')
+    cache.invalidate(1)
+    assert cache.get((1, 1)) is None and cache.get((1, 1, 'route')) is None
+    assert cache.get((3, 1)) == b'cccc'
+    assert cache.size == 4
+    cache.set((4, 1), b'x' * 11)
+    assert cache.get((4, 1)) is None
+
+
+def test_unchanged_update_keeps_the_version(app, client, make_trip):
+    trip = make_trip(people=['Ana', 'Ben'])
+    etag, _ = _etag(client, trip['id'])
+
+    for body in ({}, {'name': trip['name'], 'people': ['Ana', 'Ben'], 'start_date': '2026-05-01'}):
+        response = client.put(f"/api/trips/{trip['id']}", json=body)
+        assert response.status_code == 200
+        assert response.get_json() == trip
+
+    assert get_trip_cache(app).get((trip['id'], 1)) is not None
+    assert client.get(f"/api/trips/{trip['id']}", headers={'If-None-Match': etag}).status_code == 304
+    log = client.get(f"/api/trips/{trip['id']}/changes").get_json()
+    assert log['version'] == 1
+    assert [c['op'] for c in log['changes']] == ['create']
+
+    response = client.put(f"/api/trips/{trip['id']}", json={'name': 'Renamed'})
+    assert client.get(f"/api/trips/{trip['id']}/changes?since=1").get_json()['changes'][0]['data'] == {
+        'name': 'Renamed', 'updated_at': response.get_json()['updated_at'],
+    }
@@ -51,13 +51,16 @@ export default function TripDashboard() {
     const [isDateModalOpen, setIsDateModalOpen] = useState(false);
 
     useEffect(() => {
-        const fetchTrip = async () => {
+        const fetchTrip = async (initial: boolean) => {
             try {
                 const response = await fetch(`http://localhost:5000/api/trips/${params.id}`);
                 if (response.ok) {
                     const data = await response.json();
                     setTrip(data);
-                    setSummaryText(data.summary || "");
+                    // Live refreshes must not overwrite a summary being edited.
+                    if (initial) {
+                        setSummaryText(data.summary || "");
+                    }
                 }
             } catch (error) {
                 console.error("Error fetching trip:", error);
@@ -67,7 +70,14 @@ export default function TripDashboard() {
         };
 
         if (params.id) {
-            fetchTrip();
+            fetchTrip(true);
+
+            // Reload when a collaborator changes the trip.
+            const events = new EventSource(`http://localhost:5000/api/trips/${params.id}/events`);
+            const refresh = () => fetchTrip(false);
+            events.addEventListener("change", refresh);
+            events.addEventListener("reset", refresh);
+            return () => events.close();
         }
     }, [params.id]);
 
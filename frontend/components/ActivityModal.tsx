@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from "react";
 import Modal from "./Modal";
+import DestinationSearch, { DestinationOption } from "./DestinationSearch";
 
 interface Activity {
     id: number;
@@ -9,6 +10,10 @@ interface Activity {
     type: string;
     date: string;
     location: string;
+    location_place_name?: string | null;
+    location_lat?: number | null;
+    location_lng?: number | null;
+    location_mapbox_id?: string | null;
     notes: string;
     status: string;
 }
@@ -37,6 +42,27 @@ export default function ActivityModal({ activity, tripId, isOpen, onClose, onUpd
 
     const [formData, setFormData] = useState<Activity>(activity || initialFormState);
 
+    const mapLocation: DestinationOption | null =
+        formData.location_lat != null && formData.location_lng != null
+            ? {
+                id: formData.location_mapbox_id ?? "",
+                place_name: formData.location_place_name || formData.location,
+                latitude: formData.location_lat,
+                longitude: formData.location_lng
+            }
+            : null;
+
+    const handleMapLocationChange = (option: DestinationOption | null) => {
+        setFormData((current) => ({
+            ...current,
+            location: current.location || option?.place_name || "",
+            location_place_name: option?.place_name ?? null,
+            location_lat: option?.latitude ?? null,
+            location_lng: option?.longitude ?? null,
+            location_mapbox_id: option?.id ?? null
+        }));
+    };
+
     useEffect(() => {
         if (isOpen) {
             if (activity) {
@@ -169,6 +195,14 @@ export default function ActivityModal({ activity, tripId, isOpen, onClose, onUpd
                     )}
                 </div>
 
+                {isEditing && (
+                    <DestinationSearch
+                        label="Map location"
+                        value={mapLocation}
+                        onChange={handleMapLocationChange}
+                    />
+                )}
+
                 <div>
                     <label className="block text-sm font-medium text-gray-700 mb-1">Notes</label>
                     {isEditing ? (
@@ -77,7 +77,7 @@ export default function TripForm() {
                 return;
             }
 
-            // 1. Create Trip with validated destination
+            // Create the trip and its activities in a single request
             const tripResponse = await fetch("http://localhost:5000/api/trips", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
@@ -97,7 +97,17 @@ export default function TripForm() {
                     start_date: formData.start_date,
                     end_date: formData.end_date,
                     summary: formData.summary,
-                    people: formData.people.split(",").map(p => p.trim()).filter(Boolean)
+                    people: formData.people.split(",").map(p => p.trim()).filter(Boolean),
+                    activities: formData.activities
+                        .filter(activity => activity.name)
+                        .map(activity => ({
+                            name: activity.name,
+                            type: activity.type,
+                            date: activity.date || undefined,
+                            location: activity.location || undefined,
+                            notes: activity.notes || undefined,
+                            status: activity.status || "planned"
+                        }))
                 })
             });
 
@@ -109,30 +119,6 @@ export default function TripForm() {
 
             const trip = await tripResponse.json();
 
-            // 2. Create Activities
-            for (const activity of formData.activities) {
-                if (activity.name) {
-                    const activityResponse = await fetch(`http://localhost:5000/api/trips/${trip.id}/activities`, {
-                        method: "POST",
-                        headers: { "Content-Type": "application/json" },
-                        body: JSON.stringify({
-                            name: activity.name,
-                            type: activity.type,
-                            date: activity.date || undefined,
-                            location: activity.location || undefined,
-                            notes: activity.notes || undefined,
-                            status: activity.status || "planned"
-                        })
-                    });
-
-                    if (!activityResponse.ok) {
-                        const errorPayload = await activityResponse.json().catch(() => ({}));
-                        const message = errorPayload.error || errorPayload.details || "Failed to create activity";
-                        throw new Error(message);
-                    }
-                }
-            }
-
             router.push(`/trips/${trip.id}`);
         } catch (error) {
             console.error("Error creating trip:", error);